@@ -0,0 +1,8 @@
+import sys
+import multiprocessing
+
+from src.cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
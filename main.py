@@ -1,26 +1,22 @@
 import sys
-import time
-from PySide6.QtWidgets import QApplication, QMenu
-from PySide6.QtGui import QAction
-from PySide6.QtCore import QLocale
+import multiprocessing
+from PySide6.QtWidgets import QApplication
 from qfluentwidgets import FluentTranslator
 
-from src.core import MyMainWindow, Window
+from src.core import Window
 from src.function import log, loadLanguage
 from src.module.version import currentVersion
 from src.module.config import readConfig
-from src.module.localDB import localDB
 
 if __name__ == "__main__":
+    # 打包后的程序启动多进程编码引擎时需要
+    multiprocessing.freeze_support()
     log("=============================")
     log("AICodingOfficer lunched")
     log(f"Current version: {currentVersion()}")
 
     app = QApplication(sys.argv)
 
-    db = localDB()
-    db.checkDB()
-
     # 默认加载系统语言
     configLanguage = readConfig().get("Language", "language")
     if configLanguage == "Chinese":
@@ -0,0 +1,71 @@
+"""测量生成提示语（buildPrompts）的耗时随回帖数量的变化
+
+用随机生成的话题和回帖（每个话题约 --per-topic 条回帖，部分回帖回复同一话题中较早的回帖）调用 buildPrompts，
+输出每个规模的耗时、每条回帖的平均耗时和生成的提示语条数，用于确认耗时随回帖数线性增长。
+用法：python scripts/bench_prompts.py [--sizes 10000 100000 1000000] [--budget TOKENS]
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.module.prompt import buildPrompts  # noqa: E402
+from src.module.config import DEFAULT_PACK_TOKEN_BUDGET  # noqa: E402
+
+
+def syntheticData(reply_count, per_topic, seed=0):
+    """生成 (话题表, 回帖表, 编码表)；约一半的回帖是根回帖，其余回复同一话题中较早的随机一条回帖"""
+    rng = np.random.default_rng(seed)
+    topic_count = max(reply_count // per_topic, 1)
+    topic_df = pd.DataFrame({
+        'topic_id': np.arange(topic_count),
+        'topic_title': [f"topic {index}" for index in range(topic_count)],
+        'topic_content': ["topic content " * 10] * topic_count,
+    })
+
+    reply_ids = np.arange(1, reply_count + 1)
+    topic_ids = np.sort(rng.integers(0, topic_count, reply_count))
+    # 同一话题的回帖连续排列，position 为回帖在所属话题中的序号
+    topic_start = np.searchsorted(topic_ids, topic_ids, side='left')
+    position = np.arange(reply_count) - topic_start
+    parent_offset = (rng.random(reply_count) * position).astype(np.int64)
+    is_root = (position == 0) | (rng.random(reply_count) < 0.5)
+    to_reply_ids = np.where(is_root, 0, reply_ids[topic_start + parent_offset])
+    reply_df = pd.DataFrame({
+        'user_name': [f"u{index % 1000}" for index in range(reply_count)],
+        'reply_content': ["reply content " * 5] * reply_count,
+        'topic_id': topic_ids,
+        'reply_id': reply_ids,
+        'to_reply_id': to_reply_ids,
+    })
+    coding_scheme_df = pd.DataFrame({'code': ['A', 'B', 'C'], 'meaning': ['first', 'second', 'third']})
+    return topic_df, reply_df, coding_scheme_df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time buildPrompts on synthetic topics and replies")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="numbers of replies to generate")
+    parser.add_argument("--per-topic", type=int, default=20, help="average replies per topic")
+    parser.add_argument("--budget", type=int, default=DEFAULT_PACK_TOKEN_BUDGET,
+                        help="packing token budget passed to buildPrompts (0: one prompt per thread)")
+    parser.add_argument("--language", default="Chinese", help="prompt language")
+    args = parser.parse_args()
+
+    print(f"{'replies':>10} {'seconds':>9} {'us/reply':>9} {'prompts':>9}")
+    for size in args.sizes:
+        topic_df, reply_df, coding_scheme_df = syntheticData(size, args.per_topic)
+        started = time.perf_counter()
+        prompts, _ = buildPrompts(topic_df, reply_df, coding_scheme_df, args.language, token_budget=args.budget)
+        elapsed = time.perf_counter() - started
+        print(f"{size:>10} {elapsed:>9.2f} {elapsed / size * 1e6:>9.1f} {len(prompts):>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
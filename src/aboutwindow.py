@@ -0,0 +1,91 @@
+import requests
+
+from PySide6.QtWidgets import QDialog
+
+from src.gui.about import AboutWindow
+from src.gui.worker import loadMetadata
+from src.module.config import readConfig
+
+GITHUB_OWNER = "etShaw-zh"
+GITHUB_REPO = "AICodingAssistant-Pro"
+
+# 请求的超时（连接, 读取）
+REQUEST_TIMEOUT = (3, 10)
+
+PING_HOSTS = {
+    "ping:www.moonshot.cn": "www.moonshot.cn",  # TODO: 替换API
+    "ping:aicodingassistant.cn": "aicodingassistant.cn",  # TODO: 替换API
+}
+
+
+def get_repo_info(username, repo_name):
+    url = f"https://api.github.com/repos/{username}/{repo_name}"
+    response = requests.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    repo_data = response.json()
+    return {
+        "star_count": repo_data["stargazers_count"],
+        "fork_count": repo_data["forks_count"],
+        "watch_count": repo_data["watchers_count"]
+    }
+
+
+def get_releases_info(username, repo_name):
+    url = f"https://api.github.com/repos/{username}/{repo_name}/releases"
+    response = requests.get(url, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+
+def count_downloads(releases):
+    total_downloads = 0
+    for release in releases:
+        for asset in release.get('assets', []):
+            total_downloads += asset['download_count']
+    return total_downloads
+
+
+def fetchGithubStats():
+    repo_data = get_repo_info(GITHUB_OWNER, GITHUB_REPO)
+    releases = get_releases_info(GITHUB_OWNER, GITHUB_REPO)
+    return {"star_count": repo_data["star_count"], "download_count": count_downloads(releases)}
+
+
+def ping(url):
+    for retry in range(3):
+        try:
+            response = requests.get(f"http://{url}/", timeout=REQUEST_TIMEOUT)
+            if response.status_code == 200:
+                return "Online"
+        except requests.RequestException:
+            pass
+    return "Offline"
+
+
+class MyAboutWindow(QDialog, AboutWindow):
+    def __init__(self):
+        super().__init__()
+        self.setupUI(self)
+        self.config = readConfig()
+        self.pingLabels = {"ping:www.moonshot.cn": self.anilistPing, "ping:aicodingassistant.cn": self.bangumiPing}
+        self.checkPing()
+        self.loadConfig()
+
+    def loadConfig(self):
+        # 先显示缓存的统计数据，过期时在后台刷新
+        loadMetadata("github_stats", fetchGithubStats, self.showGithubStats)
+        # self.openTimes.setText(self.config.get("Counter", "open_times"))
+        # self.analysisTimes.setText(self.config.get("Counter", "analysis_times"))
+
+    def showGithubStats(self, key, stats):
+        self.downloadTimes.setText(str(stats["download_count"]))
+        self.starCount.setText(str(stats["star_count"]))
+
+    def checkPing(self):
+        for key, host in PING_HOSTS.items():
+            loadMetadata(key, lambda host=host: ping(host), self.showPing)
+
+    def showPing(self, key, state):
+        label = self.pingLabels[key]
+        label.setText(state)
+        label.setStyleSheet("" if state == "Online" else "color: #F44336")
@@ -0,0 +1,302 @@
+import sys
+import time
+import signal
+import sqlite3
+import argparse
+import threading
+
+from src.function import log
+from src.module.logger import getLogger, setRunId
+from src.module.progress import PROGRESS_INTERVAL, getProgressTracker, formatProgress
+from src.module.config import readConfig, localDBFilePath, exportCodingResultPath
+from src.module.localDB import localDB
+
+
+class ConsoleSignal:
+    """与 Qt 信号相同的 emit 接口，把编码过程中的日志输出到终端"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.lock = threading.Lock()
+
+    def emit(self, message):
+        with self.lock:
+            print(message, file=self.stream, flush=True)
+
+
+def loadCommand(args, language):
+    """读取 CSV 文件，保存到本地数据库并生成提示语"""
+    from src.module.prompt import readDataFiles, saveDataFiles, preparePrompts, packingMessage
+    topics, replys, coding_scheme = readDataFiles(args.topics, args.replies, args.scheme)
+    conn = sqlite3.connect(localDBFilePath())
+    try:
+        pack_stats = preparePrompts(conn, topics, replys, coding_scheme, language)
+        saveDataFiles(conn, topics, replys, coding_scheme)
+    finally:
+        conn.close()
+    message = packingMessage(pack_stats, language)
+    if message:
+        print(message)
+    log(f"数据加载成功：{len(topics)} 个话题，{len(replys)} 条回帖，{pack_stats['requests']} 条提示语")
+    return 0
+
+
+def promptCommand(args, language):
+    """按当前配置，用上次加载的数据重新生成提示语（会清空已有的编码结果）"""
+    from src.module.prompt import loadDataFromDB, preparePrompts, packingMessage
+    conn = sqlite3.connect(localDBFilePath())
+    try:
+        topics, replys, coding_scheme = loadDataFromDB(conn)
+        pack_stats = preparePrompts(conn, topics, replys, coding_scheme, language)
+    finally:
+        conn.close()
+    message = packingMessage(pack_stats, language)
+    if message:
+        print(message)
+    log(f"提示语生成成功：{pack_stats['requests']} 条")
+    return 0
+
+
+def waitForCoding(thread, output_signal, language, interval):
+    """等待编码线程结束，每隔 interval 秒输出一次进度（0 表示不输出）"""
+    tracker = getProgressTracker()
+    next_report = time.monotonic() + interval
+    while thread.is_alive():
+        thread.join(timeout=0.5)
+        if interval > 0 and time.monotonic() >= next_report and thread.is_alive():
+            next_report = time.monotonic() + interval
+            if tracker.running:
+                tag = "[进度]" if language == "Chinese" else "[Progress]"
+                output_signal.emit(f"{tag} {formatProgress(tracker.snapshot(), language)}")
+
+
+def runCoding(limit, thread_count, engine, only_failed, process_count=None, language="Chinese", progress_interval=0):
+    """在后台线程中编码，主线程等待并响应 Ctrl-C；中断时已完成的结果会写入数据库，未完成的数据留待下次继续"""
+    from src.module.coding import main_coding
+    stop_event = threading.Event()
+    output_signal = ConsoleSignal()
+    getLogger("coding").info(f"开始编码：引擎 {engine}，批次 {setRunId()}")
+    args = (stop_event, output_signal, {}, thread_count, localDBFilePath(), "prompt", "prompt_code", limit, "", only_failed)
+    kwargs = {}
+    if engine == "process":
+        from src.module.processes import run_process_coding
+        target = run_process_coding
+        kwargs['PROCESS_COUNT'] = process_count
+    elif engine == "async":
+        # 延迟导入，未安装 aiohttp 时不影响线程模式
+        from src.module.asynccoding import run_async_coding
+        target = run_async_coding
+    else:
+        target = main_coding
+    thread = threading.Thread(target=target, args=args, kwargs=kwargs, name="aico-cli-coding", daemon=True)
+    thread.start()
+    try:
+        waitForCoding(thread, output_signal, language, progress_interval)
+    except KeyboardInterrupt:
+        output_signal.emit("正在停止编码，等待已完成的结果写入数据库…… / Stopping, flushing finished results...")
+        stop_event.set()
+        thread.join()
+        return 130
+    return 0
+
+
+def codeCommand(args, language):
+    config = readConfig()
+    thread_count = args.threads or config.getint("Thread", "thread_count", fallback=1)
+    engine = args.engine or config.get("Engine", "mode", fallback="thread")
+    return runCoding(args.limit, max(thread_count, 1), engine, args.failed, args.processes, language, args.progress)
+
+
+def exportCommand(args, language):
+    from src.module.export import exportCodingResult, exportMessages, exportFormat, exportFilePath, EXPORT_CHUNK_SIZE
+    if args.output:
+        save_path = args.output
+        export_format = exportFormat(save_path, args.format)
+    else:
+        export_format = args.format or "csv"
+        save_path = exportFilePath(exportCodingResultPath(), export_format)
+    conn = sqlite3.connect(localDBFilePath())
+    try:
+        success_count, fail_count = exportCodingResult(conn, save_path, export_format=export_format,
+                                                       incremental=args.incremental, chunk_size=max(args.chunk_size or EXPORT_CHUNK_SIZE, 1))
+    finally:
+        conn.close()
+    for message in exportMessages(success_count, fail_count, save_path, language):
+        print(message)
+    return 0
+
+
+def planCommand(args, language):
+    from src.module.planner import planCoding, formatPlan
+    plan = planCoding(localDBFilePath(), limit=args.limit, concurrency=args.concurrency)
+    for line in formatPlan(plan, language):
+        print(line)
+    return 0
+
+
+def requeueCommand(args, language):
+    from src.module.jobs import requeueFailed
+    count = requeueFailed(localDBFilePath())
+    if language == "Chinese":
+        print(f"[提示] {count} 条失败的数据已放回待编码列表")
+    else:
+        print(f"[Notice] {count} failed items moved back to the pending list")
+    return 0
+
+
+def statusCommand(args, language):
+    from src.module.coding import count_status
+    counts = count_status(localDBFilePath())
+    for status, count in sorted(counts.items()):
+        print(f"{status}\t{count}")
+    return 0
+
+
+def interruptHandler(signum, frame):
+    raise KeyboardInterrupt
+
+
+def serveCommand(args, language):
+    """运行协调服务，直到 Ctrl-C"""
+    from src.module.coordinator import createCoordinatorServer, getCoordinatorConfig
+    from src.module.dbwriter import ResultWriteError
+    host, port, token = getCoordinatorConfig()
+    server = createCoordinatorServer(localDBFilePath(), args.host or host, args.port or port,
+                                     token if args.token is None else args.token)
+    if language == "Chinese":
+        print(f"[提示] 协调服务已启动：http://{server.server_address[0]}:{server.server_address[1]}，数据库 {localDBFilePath()}")
+    else:
+        print(f"[Notice] Coordinator listening on http://{server.server_address[0]}:{server.server_address[1]}, database {localDBFilePath()}")
+    # 作为服务运行时通常由 SIGTERM 停止，同样写完已收到的结果再退出
+    signal.signal(signal.SIGTERM, interruptHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    try:
+        server.coordinator.close()
+    except ResultWriteError as e:
+        if language == "Chinese":
+            print(f"[错误] {len(e.results)} 条编码结果未能写入数据库，这些数据将在租约到期后重新编码")
+        else:
+            print(f"[Error] {len(e.results)} coding results could not be saved; they will be re-coded after their leases expire")
+        return 1
+    return 0
+
+
+def workerCommand(args, language):
+    """作为远程节点连接协调服务编码"""
+    from src.module.coordinator import run_remote_coding, getCoordinatorConfig
+    host, port, token = getCoordinatorConfig()
+    url = args.coordinator or f"http://{host}:{port}"
+    thread_count = args.threads or readConfig().getint("Thread", "thread_count", fallback=1)
+    stop_event = threading.Event()
+    getLogger("coding").info(f"远程节点开始编码：{url}，批次 {setRunId()}")
+    output_signal = ConsoleSignal()
+    thread = threading.Thread(
+        target=run_remote_coding,
+        args=(stop_event, output_signal, url, max(thread_count, 1), args.limit, token if args.token is None else args.token),
+        name="aico-cli-remote", daemon=True
+    )
+    thread.start()
+    try:
+        waitForCoding(thread, output_signal, language, args.progress)
+    except KeyboardInterrupt:
+        stop_event.set()
+        thread.join()
+        return 130
+    return 0
+
+
+def fakeServerCommand(args, language):
+    """运行本地测试用的补全服务"""
+    from src.module.fakeapi import FakeCompletionServer
+    server = FakeCompletionServer(args.host, args.port, latency=args.latency, rpm=args.rpm)
+    print(f"[Notice] Fake completion server on http://{args.host}:{args.port}/v1 (set AICO/base_url to this address)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"[Notice] {server.completed} completions, {server.rate_limited} rate limited")
+    return 0
+
+
+def buildParser():
+    parser = argparse.ArgumentParser(prog="aicoding", description="AICodingOfficer command line (no GUI required)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load = subparsers.add_parser("load", help="load topic, reply and coding scheme CSV files and build prompts")
+    load.add_argument("--topics", required=True, help="topic CSV file")
+    load.add_argument("--replies", required=True, help="reply CSV file")
+    load.add_argument("--scheme", required=True, help="coding scheme CSV file")
+    load.set_defaults(handler=loadCommand)
+
+    prompt = subparsers.add_parser("prompt", help="rebuild prompts from the last loaded data (clears previous results)")
+    prompt.set_defaults(handler=promptCommand)
+
+    code = subparsers.add_parser("code", help="code pending prompts; Ctrl-C stops and keeps finished results")
+    code.add_argument("--limit", type=int, default=-1, help="code at most this many prompts (default: all)")
+    code.add_argument("--threads", type=int, default=None, help="worker threads / async concurrency (default: config)")
+    code.add_argument("--engine", choices=("thread", "async", "process"), default=None, help="coding engine (default: config)")
+    code.add_argument("--processes", type=int, default=None, help="worker processes for the process engine (default: config)")
+    code.add_argument("--failed", action="store_true", help="only re-code items in the failed list")
+    code.add_argument("--progress", type=float, default=PROGRESS_INTERVAL,
+                      help="print progress, throughput and ETA every N seconds (0: off)")
+    code.set_defaults(handler=codeCommand)
+
+    export = subparsers.add_parser("export", help="export coding results to CSV, JSONL, Parquet or Feather")
+    export.add_argument("--output", "-o", default=None, help="output file path (default: export folder)")
+    export.add_argument("--format", choices=("csv", "jsonl", "parquet", "feather"), default=None,
+                        help="output format (default: by file extension, otherwise csv); parquet/feather need pyarrow")
+    export.add_argument("--incremental", action="store_true",
+                        help="only export replies coded since the last export")
+    export.add_argument("--chunk-size", type=int, default=None,
+                        help="rows read and written per batch; memory use depends only on this (default: 5000)")
+    export.set_defaults(handler=exportCommand)
+
+    plan = subparsers.add_parser("plan", help="estimate requests, tokens, cost and wall time without sending requests")
+    plan.add_argument("--limit", type=int, default=-1, help="only estimate the first N pending prompts")
+    plan.add_argument("--concurrency", type=int, default=None, help="override the configured concurrency")
+    plan.set_defaults(handler=planCommand)
+
+    requeue = subparsers.add_parser("requeue", help="move failed items back to the pending list")
+    requeue.set_defaults(handler=requeueCommand)
+
+    status = subparsers.add_parser("status", help="show the number of prompts in each status")
+    status.set_defaults(handler=statusCommand)
+
+    serve = subparsers.add_parser("serve", help="run the coordinator that hands out prompts to remote workers")
+    serve.add_argument("--host", default=None, help="listen address (default: config)")
+    serve.add_argument("--port", type=int, default=None, help="listen port (default: config)")
+    serve.add_argument("--token", default=None, help="shared token required from workers (default: config)")
+    serve.set_defaults(handler=serveCommand)
+
+    remote = subparsers.add_parser("worker", help="code prompts leased from a coordinator")
+    remote.add_argument("--coordinator", default=None, help="coordinator URL, e.g. http://10.0.0.2:8765 (default: config)")
+    remote.add_argument("--threads", type=int, default=None, help="worker threads (default: config)")
+    remote.add_argument("--limit", type=int, default=-1, help="code at most this many prompts (default: all)")
+    remote.add_argument("--token", default=None, help="coordinator token (default: config)")
+    remote.add_argument("--progress", type=float, default=PROGRESS_INTERVAL,
+                        help="print progress, throughput and ETA every N seconds (0: off)")
+    remote.set_defaults(handler=workerCommand)
+
+    fake = subparsers.add_parser("fake-server", help="run a local OpenAI-compatible server that returns NULL codes, for testing")
+    fake.add_argument("--host", default="127.0.0.1")
+    fake.add_argument("--port", type=int, default=8766)
+    fake.add_argument("--latency", type=float, default=0.5, help="average response time in seconds")
+    fake.add_argument("--rpm", type=int, default=0, help="return 429 above this many requests per minute (0: never)")
+    fake.set_defaults(handler=fakeServerCommand)
+    return parser
+
+
+def main(argv=None):
+    args = buildParser().parse_args(argv)
+    language = readConfig().get("Language", "language", fallback="Chinese")
+    db = localDB()
+    db.checkDB()
+    db.conn.close()
+    return args.handler(args, language)
@@ -1,37 +1,42 @@
 import os
-import time
-import threading
-import shutil
 import arrow
-import json
-import requests
-import pandas as pd
 import sqlite3
 
-from PySide6.QtWidgets import QMainWindow, QTableWidgetItem, QDialog, QListWidgetItem, QToolBar, QLabel, QWidget, QHBoxLayout, QApplication, QVBoxLayout, QStackedWidget, QMenu
-from PySide6.QtCore import Qt, QEvent, QUrl, Signal, QPoint
-from PySide6.QtGui import QDesktopServices, QIcon, QFontDatabase, QFont
+from PySide6.QtWidgets import QMainWindow, QLabel, QWidget, QHBoxLayout, QApplication, QStackedWidget
+from PySide6.QtCore import Qt, QEvent, QUrl, QTimer, Signal
+from PySide6.QtGui import QDesktopServices, QIcon
 
-from qfluentwidgets import InfoBar, InfoBarPosition, Flyout, InfoBarIcon, RoundMenu, Action, FluentIcon, NavigationToolButton, NavigationPanel, NavigationItemPosition, MessageBox, Theme, setTheme, isDarkTheme
-from qfluentwidgets import (NavigationInterface, setThemeColor, PushButton, ToolButton, TableWidget, PrimaryPushButton,
-                            ProgressRing, ListWidget, NavigationAvatarWidget)
+from qfluentwidgets import (InfoBar, InfoBarPosition, NavigationToolButton, NavigationPanel, NavigationItemPosition, MessageBox,
+                            NavigationInterface, setThemeColor, NavigationAvatarWidget)
 from qfluentwidgets import FluentIcon as FIF
-from qfluentwidgets.common.style_sheet import styleSheetManager
 from qframelesswindow import FramelessWindow, StandardTitleBar
 
-from src.gui.mainwindow import MainWindow
-from src.gui.about import AboutWindow
-from src.gui.setting import SettingWindow
-from src.gui.dialog import NameEditBox
 from src.gui.autocodingwindow import AutoCodingWindow
 
-from src.function import log, readCSV, initList, addTimes, openFolder, loadLanguage
-from src.module.coding import AICodingWorkerThread, fetch_data_from_database, worker
-from src.module.config import configFile, localDBFilePath, logFolder, readConfig, oldConfigCheck, exportCodingResultPath
+from src.function import log, addTimes, openFolder
+from src.gui.worker import AICodingWorkerThread, VersionCheckThread, ExportWorkerThread, LocalDataCheckThread
+from src.gui.logpane import LogPane
+from src.module.progress import getProgressTracker, formatProgress, progressPercent
+from src.module.config import localDBFilePath, readConfig, oldConfigCheck, exportCodingResultPath, onConfigChanged, offConfigChanged
 from src.module.localDB import localDB
-from src.module.version import newVersion, currentVersion
+from src.module.planner import planCoding, formatPlan
+from src.module.version import currentVersion
 from src.module.resource import getResource
 
+
+def __getattr__(name):
+    # 手动编码、关于和设置窗口在首次使用时才导入，保留 src.core 中原有的名称
+    if name == "MyMainWindow":
+        from src.mainwindow import MyMainWindow
+        return MyMainWindow
+    if name == "MyAboutWindow":
+        from src.aboutwindow import MyAboutWindow
+        return MyAboutWindow
+    if name == "MySettingWindow":
+        from src.settingwindow import MySettingWindow
+        return MySettingWindow
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 class Widget(QWidget):
 
     def __init__(self, text: str, parent=None):
@@ -197,10 +202,12 @@ class Window(FramelessWindow):
         self.stackWidget.setCurrentWidget(widget)
     
     def openAbout(self):
+        from src.aboutwindow import MyAboutWindow
         about = MyAboutWindow()
         about.exec()
 
     def openSetting(self):
+        from src.settingwindow import MySettingWindow
         setting = MySettingWindow()
         setting.save_notice.connect(self.closeSetting)
         setting.exec()
@@ -241,221 +248,34 @@ class Window(FramelessWindow):
         if w.exec():
             QDesktopServices.openUrl(QUrl("https://xiaojianjun.cn"))
 
-class MyMainWindow(QMainWindow, MainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setupUI(self)
-        self.initConnect()
-        self.initList()
-        self.checkVersion()
-
-        self.localDBFunc = localDB()
-
-        oldConfigCheck()
-        addTimes("open_times")
-        self.config = readConfig()
-        self.local_db_file_path = localDBFilePath()
-
-    def initConnect(self):
-        self.table.setContextMenuPolicy(Qt.CustomContextMenu)  # 自定义右键菜单
-        self.table.customContextMenuRequested.connect(self.showRightClickMenu)
-        self.table.itemSelectionChanged.connect(self.selectTable)
-
-        self.searchList.setContextMenuPolicy(Qt.CustomContextMenu)  # 自定义右键菜单 - 编码代码，方便修改
-        self.searchList.customContextMenuRequested.connect(self.showRightClickMenu2)
-
-        self.newVersionButton.clicked.connect(self.openRelease)
-        self.aboutButton.clicked.connect(self.openAbout)
-        self.settingButton.clicked.connect(self.openSetting)
-
-        self.singleCodingButton.clicked.connect(self.singleCoding)
-    
-    def initList(self, clean_all=True):
-        if clean_all:
-            self.list_id = 0
-            self.anime_list = [] # 存储所有文本的列表
-            self.file_list = [] # 存储所有拖入文件夹的路径
-            self.df = pd.DataFrame() # 存储所有文本的DataFrame
-            self.table.setRowCount(0)
-
-        self.table.clearContents()
-        self.progress.setValue(0)
-        self.searchList.clear()
-        for text in ['编码1', '编码2', '编码3']:
-            self.searchList.addItem(QListWidgetItem(text))
-
-        self.typeLabel.setText("Currently selected text:")
-        self.image.updateImage(getResource("src/image/empty.png"))
-
-    def showState(self, state):
-        self.stateLabel.setText(state)
-
-    def editTableState(self, state):
-        list_id, coding_state = state
-        self.table.setItem(list_id, 2, QTableWidgetItem(coding_state))
-
-    def showProgressBar(self):
-        self.progress.setVisible(True)
-        step = 6 if len(self.anime_list) < 6 else 7 # TODO: 优化进度条
-        self.progress.setMaximum(len(self.anime_list) * step)
-
-    def addProgressBar(self, count):
-        now_count = self.progress.value()
-        self.progress.setValue(now_count + count)
-
-    def checkVersion(self):
-        thread = threading.Thread(target=self.ThreadCheckVersion)
-        thread.start()
-        thread.join()
-
-    def ThreadCheckVersion(self):
-        if newVersion():
-            self.newVersionButton.setVisible(True)
-            log("New version found")
-
-    def openRelease(self):
-        url = QUrl("https://github.com/etShaw-zh/AICodingAssistant-Pro/releases/latest")
-        QDesktopServices.openUrl(url)
-
-    def openAbout(self):
-        about = MyAboutWindow()
-        about.exec()
-
-    def openSetting(self):
-        setting = MySettingWindow()
-        setting.save_notice.connect(self.closeSetting)
-        setting.exec()
-
-    def closeSetting(self, title):
-        self.selectTable()
-        self.showInfo("success", title, "Configuration saved successfully")
-
-    def RowInTable(self):
-        for selected in self.table.selectedRanges():
-            row = selected.topRow()
-            return row
-
-    def dragEnterEvent(self, event):
-        event.acceptProposedAction()
-
-    def dropEvent(self, event):
-        # 获取并格式化本地路径，可以多个
-        raw_list = event.mimeData().urls() 
-        self.df, self.file_list = readCSV(self.df, self.file_list, raw_list)
-        print(self.df)
-
-        log("————")
-        log(f"拖入了{len(raw_list)}个文本：")
-        for file_path in raw_list:
-            log(file_path)
-
-        self.showInTableFromDf()
-
-    def showInTableFromDf(self):
-        self.table.setRowCount(len(self.df))
-
-        _keys = self.df.keys()
-        for index, row in self.df.iterrows():
-            for i, key in enumerate(_keys):
-                self.table.setItem(index, i, QTableWidgetItem(str(row[key])))
-
-    def selectTable(self):
-        row = self.RowInTable()
-        if row is None:
-            self.typeLabel.setText("请选择一个文本！")
-            return
-        print(self.df.loc[row, '原始文本'])
-        self.typeLabel.setText(f"当前选中的文本：\n {self.df.loc[row, '原始文本']}")
-
-    def showRightClickMenu(self, pos):
-        edit_init_name = Action(FluentIcon.EDIT, "修改编码结果")
-        open_this_folder = Action(FluentIcon.FOLDER, "打开此文件夹")
-
-        menu = RoundMenu(parent=self)
-        menu.addAction(edit_init_name)
-        menu.addSeparator()
-        menu.addAction(open_this_folder)
-
-        # 必须选中单元格才会显示
-        if self.table.itemAt(pos) is not None:
-            menu.exec(self.table.mapToGlobal(pos) + QPoint(0, 30), ani=True)  # 在微调菜单位置
-
-            # 不使用RowInTable函数，使用当前pos点位计算行数
-            # 目的是避免点击右键时，当前行若未选中，会报错
-            # row = self.RowInTable()
-            clicked_item = self.table.itemAt(pos)  # 计算坐标
-            row = self.table.row(clicked_item)  # 计算行数
-
-            edit_init_name.triggered.connect(lambda: self.editInitName(row))
-            open_this_folder.triggered.connect(lambda: self.openThisFolder(row))
-
-    # 显示右键菜单 - 编码代码 - 方便修改
-    def showRightClickMenu2(self, pos):
-        instead_this_anime = Action(FluentIcon.LABEL, "手动编码此文本")
-
-        menu = RoundMenu(parent=self)
-        menu.addAction(instead_this_anime)
-
-        # 必须选中才会显示
-        if self.searchList.itemAt(pos) is not None:
-            # 计算子表格行
-            clicked_item = self.searchList.itemAt(pos)  # 计算坐标
-            list_row = self.searchList.row(clicked_item)  # 计算行数
-
-            # 计算主表格行，不需要考虑选中问题，可直接使用RowInTable函数
-            table_row = self.RowInTable()
-            
-            menu.exec(self.searchList.mapToGlobal(pos), ani=True)
-            instead_this_anime.triggered.connect(lambda: self.correctThisAnime(table_row))
-                
-    def correctThisAnime(self, table_row):
-        label = self.searchList.currentRow()
-        self.df.loc[table_row, '编码结果'] = self.searchList.currentItem().text()
-        self.showInTableFromDf()
-
-    # 显示提示信息
-    def showInfo(self, state, title, content):
-        info_state = {
-            "info": InfoBar.info,
-            "success": InfoBar.success,
-            "warning": InfoBar.warning,
-            "error": InfoBar.error
-        }
-
-        if state in info_state:
-            info_state[state](
-                title=title, content=content,
-                orient=Qt.Horizontal, isClosable=True,
-                position=InfoBarPosition.TOP,
-                duration=2000, parent=self
-            )
-
-    def singleCoding(self):
-        print("单个编码")
-        pass
-
 class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
+    # 配置变化的回调可能在编码工作线程中执行，经由信号转到界面线程处理
+    config_changed = Signal(object)
+
     def __init__(self):
         super().__init__()
         self.config = readConfig()
         self.language = self.config.get("Language", "language")
         self.setupUI(self)
+        self.logPane = LogPane(self.logContent, self, language=self.language)
+        # 在设置中切换语言后，之后的提示使用新的语言
+        self.config_changed.connect(self.configChanged)
+        config_listener = self.config_changed.emit
+        onConfigChanged(config_listener)
+        self.destroyed.connect(lambda: offConfigChanged(config_listener))
+        # 编码过程中定时刷新进度条
+        self.progressTimer = QTimer(self)
+        self.progressTimer.setInterval(500)
+        self.progressTimer.timeout.connect(self.updateProgress)
+        self.exportWorker = None
         self.initConnect()
+        self.checkVersion()
         oldConfigCheck()
         addTimes("open_times")
 
         self.localDBFunc = localDB()
-
-        # 检查本地数据
-        self.localDBFunc.checkDB()
-        self.has_coding_count, self.no_coding_count = len(self.localDBFunc.readPromptFromLocalDB(True)), len(self.localDBFunc.readPromptFromLocalDB(False))
-
-        if self.language == 'Chinese':
-            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 加载了{}条本地数据".format(self.has_coding_count + self.no_coding_count))
-            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 已编码{}条，未编码{}条".format(self.has_coding_count, self.no_coding_count))
-        else:
-            self.updateLogContent('[Notice] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Check local data]: Loaded {} pieces of local data".format(self.has_coding_count + self.no_coding_count))
-            self.updateLogContent('[Notice] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Check local data]: Coded {} pieces, uncoded {} pieces".format(self.has_coding_count, self.no_coding_count))
+        self.has_coding_count, self.no_coding_count = 0, 0
+        self.checkLocalData()
 
         self.local_db_file_path = localDBFilePath()
         self.topicFilePath = self.topicInfo.text()
@@ -465,9 +285,9 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
         self.doingCoding = False
 
         # 数据
-        self.topics = pd.DataFrame()
-        self.replys = pd.DataFrame()
-        self.codingScheme = pd.DataFrame()
+        self.topics = None
+        self.replys = None
+        self.codingScheme = None
 
         self.db_path = self.local_db_file_path
         self.conn = sqlite3.connect(self.db_path)
@@ -480,6 +300,43 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
         ]
         self.limit = 10 # 默认编码10条测试数据
 
+    def dataButtons(self):
+        return (self.loadDataButton, self.testCodingButton, self.standardCodingButton, self.retryFailedButton,
+                self.exportCodingResultButton, self.dryRunButton)
+
+    def checkLocalData(self):
+        # 检查（必要时迁移）本地数据库可能较慢，在窗口显示后于后台进行，完成前不能加载数据、编码或导出
+        for button in self.dataButtons():
+            button.setEnabled(False)
+        self.localDataThread = LocalDataCheckThread()
+        self.localDataThread.checked.connect(self.localDataChecked)
+        self.localDataThread.failed.connect(self.localDataCheckFailed)
+        QTimer.singleShot(0, self.localDataThread.start)
+
+    def localDataChecked(self, has_coding_count, no_coding_count):
+        self.has_coding_count, self.no_coding_count = has_coding_count, no_coding_count
+        for button in self.dataButtons():
+            button.setEnabled(True)
+        if self.language == 'Chinese':
+            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 加载了{}条本地数据".format(self.has_coding_count + self.no_coding_count))
+            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 已编码{}条，未编码{}条".format(self.has_coding_count, self.no_coding_count))
+        else:
+            self.updateLogContent('[Notice] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Check local data]: Loaded {} pieces of local data".format(self.has_coding_count + self.no_coding_count))
+            self.updateLogContent('[Notice] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Check local data]: Coded {} pieces, uncoded {} pieces".format(self.has_coding_count, self.no_coding_count))
+
+    def localDataCheckFailed(self, error):
+        # 数据库无法读取时仍允许重新加载数据
+        for button in self.dataButtons():
+            button.setEnabled(True)
+        if self.language == 'Chinese':
+            self.updateLogContent('[错误] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 失败，请重新加载数据（{}）".format(error))
+        else:
+            self.updateLogContent('[Error] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Check local data]: Failed, please load the data again ({})".format(error))
+
+    def configChanged(self, config):
+        self.language = config.get("Language", "language", fallback=self.language)
+        self.logPane.language = self.language
+
     def initConnect(self):
         self.newVersionButton.clicked.connect(self.openRelease)
         self.aboutButton.clicked.connect(self.openAbout)
@@ -490,6 +347,8 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
         self.stopCodingButton.clicked.connect(self.stopCoding)
         self.exportCodingResultButton.clicked.connect(self.exportCodingResult)
         self.testCodingButton.clicked.connect(self.testCoding)
+        self.dryRunButton.clicked.connect(self.dryRun)
+        self.retryFailedButton.clicked.connect(self.retryFailedCoding)
 
         if self.language == 'Chinese':
             self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [初始化]: 初始化成功")
@@ -514,19 +373,14 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
             self.showInfo("error", "Error", "Please select a coding scheme file first")
             return
         
-        self.topics = pd.read_csv(self.topicFilePath, encoding='utf-8', index_col=0)
-        self.replys = pd.read_csv(self.replyFilePath, encoding='utf-8', index_col=0)
-        self.codingScheme = pd.read_csv(self.codingSchemePath, encoding='utf-8')
-        _keys = self.codingScheme['code'].to_list()
-        for key in _keys:
-            self.replys[key] = ''
+        # pandas 在首次加载数据时才导入
+        from src.module.prompt import readDataFiles, saveDataFiles
+        self.topics, self.replys, self.codingScheme = readDataFiles(self.topicFilePath, self.replyFilePath, self.codingSchemePath)
         self.prepare_prompt()
         self.showInfo("success", "Success", "Data load successful")
         self.standardCodingButton.setEnabled(True)
 
-        self.topics.to_sql('topics', self.conn, if_exists='replace', index=True)
-        self.replys.to_sql('replys', self.conn, if_exists='replace', index=True)
-        self.codingScheme.to_sql('coding_scheme', self.conn, if_exists='replace')
+        saveDataFiles(self.conn, self.topics, self.replys, self.codingScheme)
 
     def prepare_prompt(self):
         # self.topic_df = pd.read_sql('select * from topics', self.conn, index_col=0)
@@ -536,73 +390,32 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
         self.reply_df = self.replys
         self.coding_scheme_df = self.codingScheme
         
-        code_keys = self.coding_scheme_df['code'].to_list()
-        code_temp_df = pd.DataFrame(0, index=self.reply_df.index.to_list(), columns=code_keys)
-        self.coding_result_df = pd.merge(self.reply_df, code_temp_df, left_index=True, right_index=True)
-
-        topic_reply_tree_dict = {}
-        has_process_reply_id_lst = []
-        check_reply_count = 0
-        for index, row in self.topic_df.iterrows():
-            topic_id = row['topic_id']
-            topic_desc = row['topic_title'] + row['topic_content']
-            topic_reply_tree_dict[topic_id] = {'topic_desc': topic_desc,'reply_tree': []}
-            for index, row in self.reply_df[self.reply_df['topic_id'] == topic_id].iterrows():
-                reply_id = row['reply_id']
-                if reply_id in has_process_reply_id_lst:
-                    continue
-                reply_desc = '- ' + row['user_name'] + '(reply_id:' + str(reply_id) + ')：' + row['reply_content']
-                topic_reply_tree_dict[topic_id]['reply_tree'].append({'reply_id': reply_id, 'reply_desc': reply_desc, 'reply_tree': []})
-                check_reply_count += 1
-                has_process_reply_id_lst.append(reply_id)
-                for index, row in self.reply_df[self.reply_df['to_reply_id'] == reply_id].iterrows():
-                    reply_id = row['reply_id']
-                    if reply_id in has_process_reply_id_lst:
-                        continue
-                    reply_desc = '- ' + row['user_name'] + '(reply_id:' + str(reply_id) + ')：' + row['reply_content']
-                    topic_reply_tree_dict[topic_id]['reply_tree'][-1]['reply_tree'].append({'reply_id': reply_id, 'reply_desc': reply_desc})
-                    check_reply_count += 1
-                    has_process_reply_id_lst.append(reply_id)
-
-        prompt_dict = {
-            'prompt_content': [],
-        }
-
-        for topic_id in topic_reply_tree_dict:
-            for reply_tree in topic_reply_tree_dict[topic_id]['reply_tree']:
-                if self.language == 'Chinese':
-                    prompt_content = r"""您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签“codes”（只有当编码表中没有合适的标签时才输出“NULL”），并以中文举例说明提取标签的理由，注意将理由翻译为中文列出。结果以JSON格式的数组输出：[{"reply_id":"1234","tags":[],"reason":[]},{"reply_id":"2345","tags":[],"reason":[]}]，注意只输出JSON，不要包括其他内容!tags和reason中的内容一一对应，请根据实际情况填写，不要直接复制粘贴。
-                    编码表：\n
-                    """
-                elif self.language == 'English':
-                    prompt_content = r"""您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签“codes”（只有当编码表中没有合适的标签时才输出“NULL”），并以英文举例说明提取标签的理由，注意将理由翻译为英文列出。结果以JSON格式的数组输出：[{"reply_id":"1234","tags":[],"reason":[]},{"reply_id":"2345","tags":[],"reason":[]}]，注意只输出JSON，不要包括其他内容!tags和reason中的内容一一对应，请根据实际情况填写，不要直接复制粘贴。
-                    编码表：\n
-                    """
-                prompt_content += r"""
-                {encode_table_latex}
-                \n\n话题：\n
-                """.format(encode_table_latex=self.coding_scheme_df.to_latex(index=False))
-                topic_desc = topic_reply_tree_dict[topic_id]['topic_desc']
-                prompt_content += topic_desc + '\n\n回帖：\n'
-                if len(reply_tree['reply_tree']) == 0:
-                    prompt_content += reply_tree['reply_desc'] + '\n\n'
-                else:
-                    prompt_content += reply_tree['reply_desc'] + '\n'
-                    for reply_tree_2 in reply_tree['reply_tree']:
-                        prompt_content += reply_tree_2['reply_desc'] + '\n'
-                    prompt_content += '\n'
-                prompt_dict['prompt_content'].append(prompt_content)
-
-        self.prompt_df = pd.DataFrame(prompt_dict)
-        self.prompt_df['prompt_code'] = 'None'
-        self.prompt_df['prompt_code_orign'] = 'None'
-        self.prompt_df.to_sql('prompt', self.conn, if_exists='replace', index=True)
+        from src.module.prompt import preparePrompts, packingMessage
+        pack_stats = preparePrompts(self.conn, self.topic_df, self.reply_df, self.coding_scheme_df, self.language)
+        message = packingMessage(pack_stats, self.language)
+        if message:
+            self.updateLogContent(message)
+
+    def dryRun(self):
+        # 只在本地估算，不发送任何请求
+        try:
+            plan = planCoding(self.db_path)
+        except Exception as e:
+            log(f"预估失败: {e}")
+            if self.language == 'Chinese':
+                self.showInfo("error", "错误", "预估失败，请先加载数据")
+            else:
+                self.showInfo("error", "Error", "Estimation failed, please load data first")
+            return
+        timestamp = arrow.now().format("YYYY-MM-DD HH:mm:ss")
+        tag = '[提示]' if self.language == 'Chinese' else '[Notice]'
+        for line in formatPlan(plan, self.language):
+            self.updateLogContent('{} [{}] {}'.format(tag, timestamp, line))
 
     def testCoding(self):
         if not self.doingCoding:
             self.limit = 10 # 批量编码测试数据
-            self.worker = AICodingWorkerThread(self.limit)
-            self.worker.output_signal.connect(self.updateLogContent)
+            self.worker = AICodingWorkerThread(self.limit, output=self.logPane.buffer)
             self.worker.running_signal.connect(self.lisenToWorker)
             if self.language == 'Chinese':
                 t = '[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [开始编码] 10条测试数据"
@@ -622,8 +435,7 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
     def standardCoding(self):
         if not self.doingCoding:
             self.limit = -1 # 批量编码所有数据
-            self.worker = AICodingWorkerThread(self.limit)
-            self.worker.output_signal.connect(self.updateLogContent)
+            self.worker = AICodingWorkerThread(self.limit, output=self.logPane.buffer)
             self.worker.running_signal.connect(self.lisenToWorker)
             if self.language == 'Chinese':
                 t = '[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [开始编码] 所有数据"
@@ -640,14 +452,41 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
             else:
                 self.showInfo("warning", "Warning", "Coding is in progress, please do not reload data")
 
+    def retryFailedCoding(self):
+        if not self.doingCoding:
+            self.limit = -1
+            self.worker = AICodingWorkerThread(self.limit, only_failed=True, output=self.logPane.buffer)
+            self.worker.running_signal.connect(self.lisenToWorker)
+            if self.language == 'Chinese':
+                t = '[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [开始编码] 失败列表中的数据"
+            else:
+                t = '[Notice] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Start coding] failed items"
+            self.updateLogContent(t)
+            self.doingCoding = True
+            self.stopCodingButton.setEnabled(True)
+            self.retryFailedButton.setEnabled(False)
+            self.worker.start()
+        else:
+            if self.language == 'Chinese':
+                self.showInfo("warning", "警告", "编码正在进行中，请勿重载数据")
+            else:
+                self.showInfo("warning", "Warning", "Coding is in progress, please do not reload data")
+
     def lisenToWorker(self, state):
         self.doingCoding = state
         self.stopCodingButton.setEnabled(state)
         self.standardCodingButton.setEnabled(not state)
         self.testCodingButton.setEnabled(not state)
-        if not state:
-            has_coding_count = len(self.localDBFunc.readPromptFromLocalDB(True))
-            no_coding_count = len(self.localDBFunc.readPromptFromLocalDB(False))
+        self.retryFailedButton.setEnabled(not state)
+        if state:
+            self.showProgressBar()
+        else:
+            self.progressTimer.stop()
+            self.updateProgress()
+            self.progress.setVisible(False)
+            self.logPane.finish()
+            has_coding_count = self.localDBFunc.countPrompts(True)
+            no_coding_count = self.localDBFunc.countPrompts(False)
             if self.language == 'Chinese':
                 self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [编码完成]")
                 self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [检查本地数据]: 已编码{}条，未编码{}条".format(has_coding_count, no_coding_count))
@@ -670,41 +509,38 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
             else:
                 self.showInfo("warning", "Warning", "Coding is in progress, please wait for coding to complete before exporting")
             return
-        coding_result_df = pd.read_sql('select * from prompt', self.conn)
-        coding_result_df.index = coding_result_df['index']
-        reply_df = pd.read_sql('select * from replys', self.conn)
-        reply_df.index = reply_df['reply_id']
-        # 解析编码结果
-        success_count = 0
-        fail_count = 0
-        for index, row in coding_result_df.iterrows():
-            if row['prompt_code'] != 'None':
-                try:
-                    code_response_lst = json.loads(row['prompt_code'])
-                    for code_response in code_response_lst:
-                        code_res = code_response
-                        reply_id = int(code_res['reply_id'])
-                        tags_lst = code_res['tags']
-                        reasons_lst = code_res['reason']
-                        reason_str = " | ".join(reasons_lst)
-                        for i in range(len(tags_lst)):
-                            tag = tags_lst[i]
-                            reply_df.loc[reply_id, tag] = 1
-                            reply_df.loc[reply_id, 'reason'] = reason_str
-                            success_count += 1
-                except Exception as e:
-                    print(f"编码结果解析失败: {e}")
-                    fail_count += 1
-        log(f"编码结果解析成功: {success_count} 条, 失败: {fail_count} 条")
-        save_path = exportCodingResultPath()
+        if self.exportWorker is not None and self.exportWorker.isRunning():
+            return
+        # 在后台线程中解析和写入，界面只显示进度
+        self.exportWorker = ExportWorkerThread(self.local_db_file_path, exportCodingResultPath())
+        self.exportWorker.progress_signal.connect(self.showExportProgress)
+        self.exportWorker.finished_signal.connect(self.exportFinished)
+        self.exportWorker.error_signal.connect(self.exportFailed)
+        self.exportCodingResultButton.setEnabled(False)
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("")
+        self.progressFrame.setVisible(True)
+        self.exportWorker.start()
+
+    def showExportProgress(self, percent):
+        self.progressBar.setValue(percent)
+        self.progressLabel.setText(("导出编码结果 {}%" if self.language == 'Chinese' else "Exporting coding results {}%").format(percent))
+
+    def exportFailed(self, error):
+        self.exportCodingResultButton.setEnabled(True)
         if self.language == 'Chinese':
-            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [编码结果解析成功: {} 条成功, {} 条失败]".format(success_count, fail_count))
-            self.updateLogContent('[提示] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [导出路径]: {}".format(save_path))
+            self.updateLogContent('[错误] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [导出失败]: {}".format(error))
         else:
-            self.updateLogContent("[Notice] [{}] [Coding results parsed successfully: {} succeeded, {} failed]".format(arrow.now().format('YYYY-MM-DD HH:mm:ss'), success_count, fail_count))
-            self.updateLogContent("[Notice] [{}] [Export path]: {}".format(arrow.now().format('YYYY-MM-DD HH:mm:ss'), save_path))
-        reply_df.to_csv(save_path, encoding='utf-8-sig')
-        if os.path.exists(save_path):
+            self.updateLogContent('[Error] [' + arrow.now().format("YYYY-MM-DD HH:mm:ss") + "] [Export failed]: {}".format(error))
+        self.exportFinished(0, 0, "")
+
+    def exportFinished(self, success_count, fail_count, save_path):
+        from src.module.export import exportMessages
+        self.exportCodingResultButton.setEnabled(True)
+        if save_path:
+            for message in exportMessages(success_count, fail_count, save_path, self.language):
+                self.updateLogContent(message)
+        if save_path and os.path.exists(save_path):
             if self.language == 'Chinese':
                 self.showInfo("success", "成功", "导出编码结果成功")
             else:
@@ -719,22 +555,48 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
         self.standardCodingButton.setEnabled(True)
 
     def updateLogContent(self, message):
-        self.logContent.append(message)
-        self.logContent.verticalScrollBar().setValue(self.logContent.verticalScrollBar().maximum())
+        # 由 logPane 定时批量显示
+        self.logPane.append(message)
 
     def showProgressBar(self):
         self.progress.setVisible(True)
-        self.progress.setMaximum(len(self.texts) * 3)
+        self.progress.setMaximum(100)
+        self.progressBar.setValue(0)
+        self.progressLabel.setText("")
+        self.progressFrame.setVisible(True)
+        self.progressTimer.start()
+
+    def updateProgress(self):
+        snapshot = getProgressTracker().snapshot()
+        # 新的编码尚未开始时，进度仍是上一次的
+        if not snapshot['running'] and self.doingCoding:
+            return
+        percent = progressPercent(snapshot)
+        self.progressBar.setValue(percent)
+        self.progress.setValue(percent)
+        self.progressLabel.setText(formatProgress(snapshot, self.language))
+
+    def checkVersion(self):
+        # 不阻塞界面，检查完成后通过信号显示新版本按钮
+        self.versionThread = VersionCheckThread()
+        self.versionThread.new_version.connect(self.showNewVersion)
+        self.versionThread.start()
+
+    def showNewVersion(self, latest_version):
+        self.newVersionButton.setVisible(True)
+        log(f"New version found: {latest_version}")
 
     def openRelease(self):
         url = QUrl("https://github.com/etShaw-zh/AICodingAssistant-Pro/releases/latest")
         QDesktopServices.openUrl(url)
 
     def openAbout(self):
+        from src.aboutwindow import MyAboutWindow
         about = MyAboutWindow()
         about.exec()
 
     def openSetting(self):
+        from src.settingwindow import MySettingWindow
         setting = MySettingWindow()
         setting.save_notice.connect(self.closeSetting)
         setting.exec()
@@ -761,119 +623,3 @@ class MyAutoCodingWindow(QMainWindow, AutoCodingWindow):
                 position=InfoBarPosition.TOP,
                 duration=2000, parent=self
             )
-
-class MyAboutWindow(QDialog, AboutWindow):
-    def __init__(self):
-        super().__init__()
-        self.setupUI(self)
-        self.checkPing()
-        self.config = readConfig()
-        self.loadConfig()
-
-    def loadConfig(self):
-        owner = "etShaw-zh"
-        repo = "AICodingAssistant-Pro"
-        try:
-            repo_data = self.get_repo_info(owner, repo)
-            releases = self.get_releases_info(owner, repo)
-            download_times = self.count_downloads(releases)
-            self.downloadTimes.setText(str(download_times))  
-            self.starCount.setText(str(repo_data["star_count"]))  
-        except Exception as e:
-            print(f"加载配置失败: {e}")
-            self.downloadTimes.setText("Error")
-            self.starCount.setText("Error")
-        # self.openTimes.setText(self.config.get("Counter", "open_times"))
-        # self.analysisTimes.setText(self.config.get("Counter", "analysis_times"))
-
-    def get_repo_info(self, username, repo_name):
-        url = f"https://api.github.com/repos/{username}/{repo_name}"
-        response = requests.get(url)
-        if response.status_code == 200:
-            repo_data = response.json()
-            return {
-                "star_count": repo_data["stargazers_count"],
-                "fork_count": repo_data["forks_count"],
-                "watch_count": repo_data["watchers_count"]
-            }
-        else:
-            return f"Error: {response.status_code} - {response.reason}"
-        
-    def get_releases_info(self, username, repo_name):
-        url = f"https://api.github.com/repos/{username}/{repo_name}/releases"
-        response = requests.get(url)
-        if response.status_code == 200:
-            releases_data = response.json()
-            return releases_data
-        else:
-            return f"Error: {response.status_code} - {response.reason}"
-
-    def count_downloads(self, releases):
-        total_downloads = 0
-        for release in releases:
-            for asset in release.get('assets', []):
-                total_downloads += asset['download_count']
-        return total_downloads
-
-    def checkPing(self):
-        thread1 = threading.Thread(target=self.checkPingThread, args=("www.moonshot.cn", self.anilistPing)) # TODO: 替换API
-        thread2 = threading.Thread(target=self.checkPingThread, args=("aicodingassistant.cn", self.bangumiPing)) # TODO: 替换API
-        thread1.start()
-        thread2.start()
-
-    def checkPingThread(self, url, label):
-        for retry in range(3):
-            try:
-                response = requests.get(f"http://{url}/")
-                if response.status_code == 200:
-                    label.setText("Online")
-                    return
-            except requests.ConnectionError:
-                pass
-            time.sleep(0.1)
-        label.setText("Offline")
-        label.setStyleSheet("color: #F44336")
-
-class MySettingWindow(QDialog, SettingWindow):
-    save_notice = Signal(str)
-
-    def __init__(self):
-        super().__init__()
-        self.setupUI(self)
-        self.initConnect()
-        self.config = readConfig()
-        self.loadConfig()
-
-    def initConnect(self):
-        self.localDBButton.clicked.connect(self.openLocalDBFilePath)
-        self.logFolderButton.clicked.connect(self.openLogFolder)
-        self.applyButton.clicked.connect(self.saveConfig)  # 保存配置
-        self.cancelButton.clicked.connect(lambda: self.close())  # 关闭窗口
-
-    def loadConfig(self):
-        self.modelType.setText(self.config.get("AICO", "model"))
-        self.modelApiKey.setText(self.config.get("APIkey", "api_key"))
-        self.language.setText(self.config.get("Language", "language"))
-        self.threadCount.setText(self.config.get("Thread", "thread_count"))
-
-    def saveConfig(self):
-        self.config.set("AICO", "model", self.modelType.currentText())
-        self.config.set("APIkey", "api_key", self.modelApiKey.text())
-        self.config.set("Language", "language", self.language.currentText())
-        self.config.set("Thread", "thread_count", self.threadCount.text())
-
-        with open(configFile(), "w", encoding="utf-8") as content:
-            self.config.write(content)
-
-        if self.language.currentText() == 'Chinese':
-            self.save_notice.emit("配置保存成功")
-        else:
-            self.save_notice.emit("Configuration saved successfully")
-        self.close()
-
-    def openLocalDBFilePath(self):
-        openFolder(localDBFilePath())
-
-    def openLogFolder(self):
-        openFolder(logFolder())
-
@@ -3,27 +3,14 @@ import platform
 import subprocess
 import logging
 
-import pandas as pd
-from datetime import datetime
-
-from PySide6.QtCore import QTranslator
-
-from src.module.config import configFile, readConfig, logFolder
+from src.module.config import getConfig, updateConfig
+from src.module.logger import getLogger
 from src.module.resource import getResource
 
 
-def log(content):
-    now = datetime.now()
-    date = now.strftime("%Y-%m-%d")
-    time = now.strftime("%Y-%m-%d %H:%M:%S")
-
-    log_folder = logFolder()
-    log_file = os.path.join(log_folder, f"{date}.log")
-
-    logging.basicConfig(filename=log_file, level=logging.INFO, format="%(message)s")
-    logging.info(f"[{time}] {content}")
-
-    print(f"[{time}] {content}")
+def log(content, level=logging.INFO, item_id=None):
+    # 只放入日志队列，由后台线程写入文件和终端
+    getLogger().log(level, content, extra={'item_id': item_id})
 
 def readCSV(df, file_list, raw_list):
     """
@@ -33,6 +20,8 @@ def readCSV(df, file_list, raw_list):
     :param raw_list: list 从拖入文件中获取的文件列表
     :return: DataFrame, list 读取后的数据
     """
+    import pandas as pd
+
     for raw_path in raw_list:
         # 转换为文件路径
         file_path = raw_path.toLocalFile()
@@ -98,14 +87,9 @@ def initList(list_id, anime_list, raw_list):
 
 
 def addTimes(counter_name):
-    config = readConfig()
-    config_file = configFile()
-
-    counter = int(config.get("Counter", counter_name)) + 1
-    config.set("Counter", counter_name, str(counter))
-
-    with open(config_file, "w") as content:
-        config.write(content)
+    # 计数器不需要立即写入，与其他修改合并写入
+    counter = int(getConfig().get("Counter", counter_name)) + 1
+    updateConfig("Counter", counter_name, str(counter))
 
 
 def openFolder(path):
@@ -117,6 +101,8 @@ def openFolder(path):
         subprocess.call(["xdg-open", path])
 
 def loadLanguage(app, language):
+    from PySide6.QtCore import QTranslator
+
     translator = QTranslator(app)
     _language_path = getResource(f"i18n/{language}.qm")
     print(_language_path)
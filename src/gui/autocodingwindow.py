@@ -1,7 +1,7 @@
 from PySide6.QtCore import QMetaObject
 from PySide6.QtGui import QFontDatabase, QFont, QIcon
 from PySide6.QtWidgets import QWidget, QLabel, QVBoxLayout, QHBoxLayout, QFrame, QTextEdit, QFileDialog
-from qfluentwidgets import (setThemeColor, PushButton, ToolButton, PrimaryPushButton, FluentIcon, ProgressRing, LineEdit)
+from qfluentwidgets import (setThemeColor, PushButton, ToolButton, PrimaryPushButton, FluentIcon, ProgressRing, ProgressBar, LineEdit)
 from src.module.version import currentVersion
 from src.module.resource import getResource
 from src.module.image import RoundedLabel
@@ -134,10 +134,25 @@ class AutoCodingWindow:
         self.logContent.setReadOnly(True)  
         self.logFrameLayout.addWidget(self.logContent)
         
+        # 编码进度：完成数、速度和预计剩余时间
+        self.progressBar = ProgressBar(self)
+        self.progressBar.setRange(0, 100)
+        self.progressLabel = QLabel("")
+        self.progressLabel.setObjectName("progressLabel")
+        self.progressLayout = QHBoxLayout()
+        self.progressLayout.setContentsMargins(0, 0, 0, 0)
+        self.progressLayout.setSpacing(12)
+        self.progressLayout.addWidget(self.progressBar, 1)
+        self.progressLayout.addWidget(self.progressLabel)
+        self.progressFrame = QFrame()
+        self.progressFrame.setLayout(self.progressLayout)
+        self.progressFrame.setVisible(False)
+
         self.logLayout = QVBoxLayout()
         self.logLayout.setContentsMargins(0, 0, 0, 0)
         self.logLayout.addWidget(self.logLabel)
         self.logLayout.addWidget(self.logFrame)  
+        self.logLayout.addWidget(self.progressFrame)
 
         # 操作区域
 
@@ -160,11 +175,15 @@ class AutoCodingWindow:
         self.stopCodingButton = PushButton("Stop Coding", self)
         self.stopCodingButton.setFixedWidth(120)
         self.stopCodingButton.setEnabled(False)
+        self.dryRunButton = PushButton("Estimate", self)
+        self.dryRunButton.setFixedWidth(120)
         self.testCodingButton = PushButton("Test Coding", self)
         self.testCodingButton.setFixedWidth(120)
         # self.testCodingButton.setEnabled(False)
         self.standardCodingButton = PushButton("Batch Coding", self)
         self.standardCodingButton.setFixedWidth(120)
+        self.retryFailedButton = PushButton("Retry Failed", self)
+        self.retryFailedButton.setFixedWidth(120)
         # self.standardCodingButton.setEnabled(False)
         self.loadDataButton = PushButton("Load Data", self)
         self.loadDataButton.setFixedWidth(120)
@@ -177,10 +196,14 @@ class AutoCodingWindow:
         self.buttonLayout.addWidget(self.loadDataButton)
         self.buttonLayout.addWidget(self.buttonSeparator)
         self.buttonLayout.addSpacing(4)
+        self.buttonLayout.addWidget(self.dryRunButton)
+        self.buttonLayout.addSpacing(8)
         self.buttonLayout.addWidget(self.testCodingButton)
         self.buttonLayout.addSpacing(8)
         self.buttonLayout.addWidget(self.standardCodingButton)
         self.buttonLayout.addSpacing(8)
+        self.buttonLayout.addWidget(self.retryFailedButton)
+        self.buttonLayout.addSpacing(8)
         self.buttonLayout.addWidget(self.stopCodingButton)
         self.buttonLayout.addWidget(self.buttonSeparator)
         self.buttonLayout.addSpacing(8)
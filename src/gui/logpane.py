@@ -0,0 +1,110 @@
+import threading
+from collections import deque
+from PySide6.QtCore import QObject, QTimer
+from PySide6.QtGui import QTextCursor
+from src.module.logger import getLogger
+
+# 界面刷新间隔（毫秒），期间收到的日志一次性追加
+LOG_FLUSH_INTERVAL = 100
+
+# 日志区域最多保留的行数，超出后删除最早的行；完整日志见日志文件
+MAX_LOG_LINES = 5000
+
+# 每条数据一行的进度提示，只在日志区域末尾显示最新的一条
+VERBOSE_MARKERS = ("[当前线程]", "[Current thread]", "[异步任务]", "[Async task]")
+
+
+class LogBuffer:
+    """与 Qt 信号相同的 emit 接口，可在任意线程调用；只放入内存，由 LogPane 定时取出显示
+
+    所有日志都写入日志文件，界面中只保留最近 MAX_LOG_LINES 行，逐条的进度提示合并为一条。
+    """
+
+    def __init__(self, max_lines=MAX_LOG_LINES):
+        self.lock = threading.Lock()
+        self.lines = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.summary = None
+        self.logger = getLogger("pane")
+
+    def emit(self, message):
+        message = str(message)
+        self.logger.info(message)
+        with self.lock:
+            if any(marker in message for marker in VERBOSE_MARKERS):
+                self.summary = message
+                return
+            if len(self.lines) == self.lines.maxlen:
+                self.dropped += 1
+            self.lines.append(message)
+
+    def drain(self):
+        """取出待显示的日志，返回 (行列表, 丢弃的行数, 最新的进度提示)"""
+        with self.lock:
+            lines = list(self.lines)
+            self.lines.clear()
+            dropped, self.dropped = self.dropped, 0
+            summary, self.summary = self.summary, None
+        return lines, dropped, summary
+
+
+class LogPane(QObject):
+    """把 LogBuffer 中的日志定时批量追加到文本框，并限制文本框保留的行数"""
+
+    def __init__(self, text_edit, parent=None, interval=LOG_FLUSH_INTERVAL, max_lines=MAX_LOG_LINES, language="Chinese"):
+        super().__init__(parent)
+        self.text_edit = text_edit
+        self.text_edit.document().setMaximumBlockCount(max_lines)
+        self.buffer = LogBuffer(max_lines)
+        self.language = language
+        self.summary = None
+        self.summary_shown = False
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start()
+
+    def append(self, message):
+        self.buffer.emit(message)
+
+    def flush(self):
+        lines, dropped, summary = self.buffer.drain()
+        if not lines and not dropped and summary is None:
+            return
+        if summary is not None:
+            self.summary = summary
+        self._insert(lines, dropped)
+
+    def finish(self):
+        """编码结束时显示剩余的日志；逐条的进度提示已经过时，删除而不保留在统计信息之后"""
+        lines, dropped, _ = self.buffer.drain()
+        self.summary = None
+        if lines or dropped or self.summary_shown:
+            self._insert(lines, dropped)
+
+    def _insert(self, lines, dropped):
+        if dropped:
+            if self.language == "Chinese":
+                lines.insert(0, f"[...] 省略了 {dropped} 行，完整内容见日志文件")
+            else:
+                lines.insert(0, f"[...] {dropped} lines omitted, see the log file")
+
+        scroll_bar = self.text_edit.verticalScrollBar()
+        at_bottom = scroll_bar.value() >= scroll_bar.maximum() - 4
+        cursor = QTextCursor(self.text_edit.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        if self.summary_shown:
+            # 进度提示始终是最后一行，先删除旧的再追加
+            cursor.select(QTextCursor.BlockUnderCursor)
+            cursor.removeSelectedText()
+            self.summary_shown = False
+        if self.summary is not None:
+            lines.append(self.summary)
+        if lines:
+            cursor.insertText("\n" + "\n".join(lines))
+            self.summary_shown = self.summary is not None
+        cursor.endEditBlock()
+        # 用户向上翻看时不强制滚动到底部
+        if at_bottom:
+            scroll_bar.setValue(scroll_bar.maximum())
@@ -1,11 +1,29 @@
+import hashlib
+
 from PySide6.QtCore import Qt
 from PySide6.QtWidgets import QLabel, QVBoxLayout, QHBoxLayout, QFrame, QMessageBox
 from PySide6.QtGui import QIcon
 from qfluentwidgets import LineEdit, PushButton, FluentIcon, PrimaryPushButton, EditableComboBox
 
 from src.module.resource import getResource
-from src.module.config import localDBFilePath, logFolder, readConfig, configFile
+from src.module.config import localDBFilePath, logFolder, readConfig, writeConfig
 from src.module.aihubmix import AiHubMixAPI
+from src.gui.worker import loadMetadata
+
+# 获取模型列表的超时（连接, 读取）
+MODELS_TIMEOUT = (3, 10)
+
+
+def modelsCacheKey():
+    """模型列表按接口地址和 API Key 分别缓存，缓存键中只保存 API Key 的摘要"""
+    api = AiHubMixAPI()
+    key_hash = hashlib.sha256(api.api_key.encode("utf-8")).hexdigest()[:12]
+    return f"models:{api.base_url}:{key_hash}"
+
+
+def fetchAvailableModels():
+    # 返回 None 表示获取失败，缓存继续使用旧的列表
+    return AiHubMixAPI().get_available_models(timeout=MODELS_TIMEOUT) or None
 
 class SettingWindow(object):
     def setupUI(self, this_window):
@@ -84,7 +102,9 @@ class SettingWindow(object):
         # 初始化时加载已保存的模型
         current_model = readConfig().get("AICO", "model")
         self.modelType.setText(current_model)
-        
+        # 打开窗口时只填充下拉列表，不改变已保存的模型
+        loadMetadata(modelsCacheKey(), fetchAvailableModels, self.showCachedModels)
+
         # 添加刷新按钮
         self.refreshModelsButton = PushButton("Refresh", self)
         self.refreshModelsButton.setFixedWidth(80)
@@ -227,14 +247,20 @@ class SettingWindow(object):
             QMessageBox.warning(self, "Error", "Invalid API key. Please check and try again.")
 
     def refreshAvailableModels(self):
-        """刷新可用模型列表"""
-        api = AiHubMixAPI()
-        models = api.get_available_models()
-        
-        if not models:
-            QMessageBox.warning(self, "Error", "Failed to fetch available models. Please check your API key and try again.")
-            return
-            
+        """在后台刷新可用模型列表"""
+        loadMetadata(modelsCacheKey(), fetchAvailableModels, self.showAvailableModels,
+                     force=True, failed_slot=self.showModelsError)
+
+    def showModelsError(self, key):
+        QMessageBox.warning(self, "Error", "Failed to fetch available models. Please check your API key and try again.")
+
+    def showCachedModels(self, key, models):
+        current_model = self.modelType.text()
+        self.modelType.clear()
+        self.modelType.addItems(models)
+        self.modelType.setText(current_model)
+
+    def showAvailableModels(self, key, models):
         current_model = self.modelType.text()
         self.modelType.clear()
         self.modelType.addItems(models)
@@ -268,7 +294,6 @@ class SettingWindow(object):
             config.set("Thread", "thread_count", thread_count)
         
         # 写入配置文件
-        with open(configFile(), "w", encoding="utf-8") as f:
-            config.write(f)
+        writeConfig(config)
             
         QMessageBox.information(self, "Success", "Settings saved successfully!")
@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+from PySide6.QtCore import Signal, QThread
+from src.module.config import localDBFilePath, readConfig
+from src.module.version import checkLatestVersion, currentVersion
+from src.module.metacache import getMetadataCache
+from src.module.localDB import localDB
+from src.module.logger import getLogger, setRunId
+
+
+class AICodingWorkerThread(QThread):
+    output_signal = Signal(str)
+    running_signal = Signal(bool)
+
+    def __init__(self, limit, only_failed=False, output=None):
+        """output 为带 emit 方法的日志接收对象（如 LogBuffer），默认使用 output_signal"""
+        super().__init__()
+        self.output = output
+        self.THREAD_COUNT = readConfig().getint("Thread", "thread_count")
+        self.LIMIT = limit
+        self.thread_results = {}
+        self.local_db_file_path = localDBFilePath()
+        self.DATABASE_PATH = self.local_db_file_path
+        self.TABLE_NAME = "prompt"
+        self.LABEL_COLUMN_NAME = "prompt_code"
+        self.DEFAULT_NODE_RECOGNITION_PROMPT = ""
+        self.ONLY_FAILED = only_failed
+        self._stop_event = threading.Event()
+
+    def run(self):
+        self._stop_event.clear()
+        self.running_signal.emit(True)
+        engine = readConfig().get("Engine", "mode", fallback="thread")
+        output = self.output if self.output is not None else self.output_signal
+        # 每次开始编码使用新的批次编号，便于在日志中区分
+        getLogger("coding").info(f"开始编码：引擎 {engine}，批次 {setRunId()}")
+        if engine == "process":
+            from src.module.processes import run_process_coding
+            run_process_coding(self._stop_event, output, self.thread_results, self.THREAD_COUNT, self.DATABASE_PATH,
+                               self.TABLE_NAME, self.LABEL_COLUMN_NAME, self.LIMIT, self.DEFAULT_NODE_RECOGNITION_PROMPT, self.ONLY_FAILED)
+        elif engine == "async":
+            # 延迟导入，未安装 aiohttp 时不影响线程模式
+            from src.module.asynccoding import run_async_coding
+            run_async_coding(self._stop_event, output, self.thread_results, self.THREAD_COUNT, self.DATABASE_PATH,
+                             self.TABLE_NAME, self.LABEL_COLUMN_NAME, self.LIMIT, self.DEFAULT_NODE_RECOGNITION_PROMPT, self.ONLY_FAILED)
+        else:
+            from src.module.coding import main_coding
+            main_coding(self._stop_event, output, self.thread_results, self.THREAD_COUNT, self.DATABASE_PATH, 
+                       self.TABLE_NAME, self.LABEL_COLUMN_NAME, self.LIMIT, self.DEFAULT_NODE_RECOGNITION_PROMPT, self.ONLY_FAILED)
+        self.running_signal.emit(False)
+
+    def stop(self):
+        self._stop_event.set()
+        self.wait()
+
+    def __del__(self):
+        self.stop()
+
+
+class ExportWorkerThread(QThread):
+    """在后台导出编码结果，进度（0-100）通过 progress_signal 通知界面"""
+    progress_signal = Signal(int)
+    finished_signal = Signal(int, int, str)
+    error_signal = Signal(str)
+
+    def __init__(self, db_path, save_path):
+        super().__init__()
+        self.db_path = db_path
+        self.save_path = save_path
+
+    def run(self):
+        from src.module.export import exportCodingResult
+        # SQLite 连接不能跨线程使用，导出线程使用自己的连接
+        conn = sqlite3.connect(self.db_path)
+        try:
+            success_count, fail_count = exportCodingResult(conn, self.save_path, progress=self.progress_signal.emit)
+            self.finished_signal.emit(success_count, fail_count, self.save_path)
+        except Exception as e:
+            getLogger("export").exception("导出编码结果失败")
+            self.error_signal.emit(str(e))
+        finally:
+            conn.close()
+
+
+class LocalDataCheckThread(QThread):
+    """在后台检查（必要时迁移）本地数据库并统计已编码、未编码的条数，完成后通过 checked 信号通知界面"""
+    checked = Signal(int, int)
+    failed = Signal(str)
+
+    def run(self):
+        # SQLite 连接不能跨线程使用，检查线程使用自己的连接
+        db = localDB()
+        try:
+            db.checkDB()
+            self.checked.emit(db.countPrompts(True), db.countPrompts(False))
+        except Exception as e:
+            getLogger("localdb").exception("检查本地数据失败")
+            self.failed.emit(str(e))
+        finally:
+            db.conn.close()
+
+
+class VersionCheckThread(QThread):
+    """在后台检查新版本，发现新版本时通过 new_version 信号通知界面"""
+    new_version = Signal(str)
+
+    def run(self):
+        latest_version = checkLatestVersion()
+        if latest_version is not None and latest_version != currentVersion():
+            self.new_version.emit(latest_version)
+
+
+# 正在运行的刷新线程，窗口关闭后线程仍可安全结束
+_refresh_threads = set()
+
+
+class MetadataRefreshThread(QThread):
+    """在后台获取远程信息并写入缓存，完成后通过 refreshed 信号通知界面"""
+    refreshed = Signal(str, object)
+    failed = Signal(str)
+
+    def __init__(self, key, fetch, force=False):
+        super().__init__()
+        self.key = key
+        self.fetch = fetch
+        self.force = force
+
+    def run(self):
+        value = getMetadataCache().fetch(self.key, self.fetch, force=self.force)
+        if value is not None:
+            self.refreshed.emit(self.key, value)
+        else:
+            self.failed.emit(self.key)
+
+
+def loadMetadata(key, fetch, slot, force=False, failed_slot=None):
+    """先用缓存的值（即使已过期）调用 slot，缓存过期、不存在或 force 时在后台刷新，完成后再次调用 slot
+
+    slot(key, value) 应为窗口的方法，窗口关闭后不再被调用；获取失败且没有旧值时调用 failed_slot(key)。
+    """
+    value, fresh = getMetadataCache().get(key)
+    if value is not None:
+        slot(key, value)
+    if fresh and not force:
+        return
+    thread = MetadataRefreshThread(key, fetch, force)
+    thread.refreshed.connect(slot)
+    if failed_slot is not None:
+        thread.failed.connect(failed_slot)
+    thread.finished.connect(lambda: _refresh_threads.discard(thread))
+    _refresh_threads.add(thread)
+    thread.start()
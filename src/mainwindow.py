@@ -0,0 +1,209 @@
+import pandas as pd
+
+from PySide6.QtWidgets import QMainWindow, QTableWidgetItem, QListWidgetItem
+from PySide6.QtCore import Qt, QUrl, QPoint
+from PySide6.QtGui import QDesktopServices
+
+from qfluentwidgets import InfoBar, InfoBarPosition, RoundMenu, Action, FluentIcon
+
+from src.gui.mainwindow import MainWindow
+from src.function import log, readCSV, addTimes
+from src.module.config import localDBFilePath, readConfig, oldConfigCheck
+from src.module.localDB import localDB
+from src.gui.worker import VersionCheckThread
+from src.module.resource import getResource
+
+class MyMainWindow(QMainWindow, MainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setupUI(self)
+        self.initConnect()
+        self.initList()
+        self.checkVersion()
+
+        self.localDBFunc = localDB()
+
+        oldConfigCheck()
+        addTimes("open_times")
+        self.config = readConfig()
+        self.local_db_file_path = localDBFilePath()
+
+    def initConnect(self):
+        self.table.setContextMenuPolicy(Qt.CustomContextMenu)  # 自定义右键菜单
+        self.table.customContextMenuRequested.connect(self.showRightClickMenu)
+        self.table.itemSelectionChanged.connect(self.selectTable)
+
+        self.searchList.setContextMenuPolicy(Qt.CustomContextMenu)  # 自定义右键菜单 - 编码代码，方便修改
+        self.searchList.customContextMenuRequested.connect(self.showRightClickMenu2)
+
+        self.newVersionButton.clicked.connect(self.openRelease)
+        self.aboutButton.clicked.connect(self.openAbout)
+        self.settingButton.clicked.connect(self.openSetting)
+
+        self.singleCodingButton.clicked.connect(self.singleCoding)
+    
+    def initList(self, clean_all=True):
+        if clean_all:
+            self.list_id = 0
+            self.anime_list = [] # 存储所有文本的列表
+            self.file_list = [] # 存储所有拖入文件夹的路径
+            self.df = pd.DataFrame() # 存储所有文本的DataFrame
+            self.table.setRowCount(0)
+
+        self.table.clearContents()
+        self.progress.setValue(0)
+        self.searchList.clear()
+        for text in ['编码1', '编码2', '编码3']:
+            self.searchList.addItem(QListWidgetItem(text))
+
+        self.typeLabel.setText("Currently selected text:")
+        self.image.updateImage(getResource("src/image/empty.png"))
+
+    def showState(self, state):
+        self.stateLabel.setText(state)
+
+    def editTableState(self, state):
+        list_id, coding_state = state
+        self.table.setItem(list_id, 2, QTableWidgetItem(coding_state))
+
+    def showProgressBar(self):
+        self.progress.setVisible(True)
+        step = 6 if len(self.anime_list) < 6 else 7 # TODO: 优化进度条
+        self.progress.setMaximum(len(self.anime_list) * step)
+
+    def addProgressBar(self, count):
+        now_count = self.progress.value()
+        self.progress.setValue(now_count + count)
+
+    def checkVersion(self):
+        # 不阻塞界面，检查完成后通过信号显示新版本按钮
+        self.versionThread = VersionCheckThread()
+        self.versionThread.new_version.connect(self.showNewVersion)
+        self.versionThread.start()
+
+    def showNewVersion(self, latest_version):
+        self.newVersionButton.setVisible(True)
+        log(f"New version found: {latest_version}")
+
+    def openRelease(self):
+        url = QUrl("https://github.com/etShaw-zh/AICodingAssistant-Pro/releases/latest")
+        QDesktopServices.openUrl(url)
+
+    def openAbout(self):
+        from src.aboutwindow import MyAboutWindow
+        about = MyAboutWindow()
+        about.exec()
+
+    def openSetting(self):
+        from src.settingwindow import MySettingWindow
+        setting = MySettingWindow()
+        setting.save_notice.connect(self.closeSetting)
+        setting.exec()
+
+    def closeSetting(self, title):
+        self.selectTable()
+        self.showInfo("success", title, "Configuration saved successfully")
+
+    def RowInTable(self):
+        for selected in self.table.selectedRanges():
+            row = selected.topRow()
+            return row
+
+    def dragEnterEvent(self, event):
+        event.acceptProposedAction()
+
+    def dropEvent(self, event):
+        # 获取并格式化本地路径，可以多个
+        raw_list = event.mimeData().urls() 
+        self.df, self.file_list = readCSV(self.df, self.file_list, raw_list)
+        print(self.df)
+
+        log("————")
+        log(f"拖入了{len(raw_list)}个文本：")
+        for file_path in raw_list:
+            log(file_path)
+
+        self.showInTableFromDf()
+
+    def showInTableFromDf(self):
+        self.table.setRowCount(len(self.df))
+
+        _keys = self.df.keys()
+        for index, row in self.df.iterrows():
+            for i, key in enumerate(_keys):
+                self.table.setItem(index, i, QTableWidgetItem(str(row[key])))
+
+    def selectTable(self):
+        row = self.RowInTable()
+        if row is None:
+            self.typeLabel.setText("请选择一个文本！")
+            return
+        print(self.df.loc[row, '原始文本'])
+        self.typeLabel.setText(f"当前选中的文本：\n {self.df.loc[row, '原始文本']}")
+
+    def showRightClickMenu(self, pos):
+        edit_init_name = Action(FluentIcon.EDIT, "修改编码结果")
+        open_this_folder = Action(FluentIcon.FOLDER, "打开此文件夹")
+
+        menu = RoundMenu(parent=self)
+        menu.addAction(edit_init_name)
+        menu.addSeparator()
+        menu.addAction(open_this_folder)
+
+        # 必须选中单元格才会显示
+        if self.table.itemAt(pos) is not None:
+            menu.exec(self.table.mapToGlobal(pos) + QPoint(0, 30), ani=True)  # 在微调菜单位置
+
+            # 不使用RowInTable函数，使用当前pos点位计算行数
+            # 目的是避免点击右键时，当前行若未选中，会报错
+            # row = self.RowInTable()
+            clicked_item = self.table.itemAt(pos)  # 计算坐标
+            row = self.table.row(clicked_item)  # 计算行数
+
+            edit_init_name.triggered.connect(lambda: self.editInitName(row))
+            open_this_folder.triggered.connect(lambda: self.openThisFolder(row))
+
+    # 显示右键菜单 - 编码代码 - 方便修改
+    def showRightClickMenu2(self, pos):
+        instead_this_anime = Action(FluentIcon.LABEL, "手动编码此文本")
+
+        menu = RoundMenu(parent=self)
+        menu.addAction(instead_this_anime)
+
+        # 必须选中才会显示
+        if self.searchList.itemAt(pos) is not None:
+            # 计算子表格行
+            clicked_item = self.searchList.itemAt(pos)  # 计算坐标
+            list_row = self.searchList.row(clicked_item)  # 计算行数
+
+            # 计算主表格行，不需要考虑选中问题，可直接使用RowInTable函数
+            table_row = self.RowInTable()
+            
+            menu.exec(self.searchList.mapToGlobal(pos), ani=True)
+            instead_this_anime.triggered.connect(lambda: self.correctThisAnime(table_row))
+                
+    def correctThisAnime(self, table_row):
+        label = self.searchList.currentRow()
+        self.df.loc[table_row, '编码结果'] = self.searchList.currentItem().text()
+        self.showInTableFromDf()
+
+    # 显示提示信息
+    def showInfo(self, state, title, content):
+        info_state = {
+            "info": InfoBar.info,
+            "success": InfoBar.success,
+            "warning": InfoBar.warning,
+            "error": InfoBar.error
+        }
+
+        if state in info_state:
+            info_state[state](
+                title=title, content=content,
+                orient=Qt.Horizontal, isClosable=True,
+                position=InfoBarPosition.TOP,
+                duration=2000, parent=self
+            )
+
+    def singleCoding(self):
+        print("单个编码")
+        pass
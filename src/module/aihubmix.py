@@ -1,15 +1,86 @@
+import time
+import gzip
+import json
+import asyncio
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
 import requests
-from src.module.config import readConfig
+from requests.adapters import HTTPAdapter
+from src.module.config import getConfig
+from src.module.logger import getLogger
+from src.module.tokens import estimate_messages_tokens, DEFAULT_COMPLETION_TOKENS
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# 全局共享的 HTTP 会话，所有工作线程复用同一个连接池，避免每次请求都重新进行 TCP/TLS 握手
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+# 请求体超过该字节数时才进行 gzip 压缩
+GZIP_MIN_SIZE = 1024
+
+
+def poolSize():
+    """根据线程数计算连接池大小"""
+    config = getConfig()
+    thread_count = config.getint("Thread", "thread_count", fallback=1)
+    return max(thread_count, 1) + 2
+
+
+def getSession(pool_size=None):
+    """获取共享的 HTTP 会话，连接池大小随线程数增长"""
+    global _session, _session_pool_size
+    if pool_size is None:
+        pool_size = poolSize()
+
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers.update({'Connection': 'keep-alive'})
+        if pool_size > _session_pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session_pool_size = pool_size
+        return _session
+
+def parseRetryAfter(headers):
+    """解析 Retry-After（秒数或 HTTP 日期）/ retry-after-ms 响应头，返回秒数"""
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(float(value) / 1000.0, 0.0)
+        except ValueError:
+            pass
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
 
 class APIError(Exception):
     """API错误的自定义异常类"""
-    def __init__(self, status_code, error_type, message):
+    def __init__(self, status_code, error_type, message, retry_after=None):
         self.status_code = status_code
         self.error_type = error_type
         self.message = message
+        self.retry_after = retry_after
         super().__init__(self.message)
 
-class AiHubMixAPI:
+class BaseAPI:
     BASE_URL = "https://api.aihubmix.com/v1"
 
     # HTTP状态码及其对应的错误描述
@@ -24,21 +95,36 @@ class AiHubMixAPI:
         503: "服务器暂时不可用。这可能是由于OpenAI正在进行维护或者服务器过载。"
     }
 
-    def __init__(self):
-        self.api_key = readConfig().get("APIkey", "api_key")
+    # 连接超时与读取超时（秒）
+    TIMEOUT = (10, 300)
+
+    def __init__(self, rate_limiter=None, stop_event=None, retry_policy=None, circuit_breaker=None):
+        config = getConfig()
+        # 模型和 API Key 在创建客户端时读取一次，同一次编码中不再重复读取配置
+        self.api_key = config.get("APIkey", "api_key")
+        self.model = config.get("AICO", "model", fallback="")
+        # 允许在配置中覆盖接口地址，便于接入其他兼容 OpenAI 的服务或本地测试服务
+        self.base_url = (config.get("AICO", "base_url", fallback="") or self.BASE_URL).rstrip('/')
+        self.gzip_request = config.getboolean("Network", "gzip_request", fallback=False)
         self.headers = {
             'Content-Type': 'application/json',
             'Authorization': f'Bearer {self.api_key}'
         }
+        # 共享的限流器、重试策略和熔断器（均为可选），以及用于中断等待的停止信号
+        self.rate_limiter = rate_limiter
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.stop_event = stop_event
 
-    def _handle_error_response(self, response):
-        """处理API错误响应"""
-        status_code = response.status_code
-        try:
-            error_data = response.json().get('error', {})
+    def _build_error(self, status_code, payload, headers=None):
+        """根据HTTP状态码和响应内容构造APIError"""
+        if isinstance(payload, dict):
+            error_data = payload.get('error', {})
+            if not isinstance(error_data, dict):
+                error_data = {'message': str(error_data)}
             error_type = error_data.get('type', 'unknown_error')
             error_message = error_data.get('message', '未知错误')
-        except ValueError:
+        else:
             error_type = 'parse_error'
             error_message = '无法解析错误响应'
 
@@ -48,31 +134,138 @@ class AiHubMixAPI:
         # 组合完整的错误信息
         full_error_message = f"HTTP {status_code}: {error_description}\n具体错误: {error_message}"
         
-        raise APIError(status_code, error_type, full_error_message)
+        return APIError(status_code, error_type, full_error_message, parseRetryAfter(headers))
+
+    def _prepare_body(self, kwargs):
+        """序列化请求体，较大的请求体按需进行 gzip 压缩"""
+        headers = dict(self.headers)
+        if 'json' in kwargs:
+            body = json.dumps(kwargs.pop('json'), ensure_ascii=False).encode('utf-8')
+            if self.gzip_request and len(body) >= GZIP_MIN_SIZE:
+                body = gzip.compress(body, compresslevel=5)
+                headers['Content-Encoding'] = 'gzip'
+            kwargs['data'] = body
+        return headers, kwargs
+
+    def _chat_data(self, model, messages, temperature, max_tokens):
+        """构造聊天完成接口的请求数据"""
+        data = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature
+        }
+        if max_tokens is not None:
+            data["max_tokens"] = max_tokens
+        return data
+
+    def _reserve_tokens(self, data):
+        """估算一次聊天请求占用的 token 配额（输入 + 预留输出）"""
+        return estimate_messages_tokens(data["messages"]) + (data.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+    def _after_attempt(self, reserved_tokens, attempt, result=None, error=None):
+        """把一次请求的结果反馈给限流器和熔断器，失败时返回重试前的等待秒数，None 表示不再重试"""
+        if error is None:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.record_success()
+            if self.rate_limiter is not None and reserved_tokens is not None:
+                usage = result.get('usage') if isinstance(result, dict) else None
+                used_tokens = usage.get('total_tokens') if isinstance(usage, dict) else None
+                self.rate_limiter.on_success(reserved_tokens, used_tokens)
+            return None
+
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record_failure(error)
+        if self.rate_limiter is not None and error.status_code == 429:
+            self.rate_limiter.on_rate_limited(error.retry_after)
+        if self.retry_policy is None:
+            return None
+        return self.retry_policy.next_delay(error, attempt)
+
+    def _error_result(self, error):
+        """将APIError转换为接口返回值"""
+        return {"error": error.message, "status_code": error.status_code, "retry_after": error.retry_after}
+
+class AiHubMixAPI(BaseAPI):
+    def __init__(self, pool_size=None, rate_limiter=None, stop_event=None, retry_policy=None, circuit_breaker=None):
+        super().__init__(rate_limiter, stop_event, retry_policy, circuit_breaker)
+        self.session = getSession(pool_size)
+
+    def _handle_error_response(self, response):
+        """处理API错误响应"""
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = None
+        raise self._build_error(response.status_code, payload, response.headers)
 
-    def _make_request(self, method, endpoint, **kwargs):
-        """统一的请求处理方法"""
+    def _send(self, method, endpoint, headers, **kwargs):
+        """发送一次请求"""
         try:
-            url = f"{self.BASE_URL}/{endpoint.lstrip('/')}"
-            response = requests.request(method, url, headers=self.headers, **kwargs)
+            url = f"{self.base_url}/{endpoint.lstrip('/')}"
+            response = self.session.request(method, url, headers=headers, **kwargs)
             
             if response.status_code != 200:
                 self._handle_error_response(response)
                 
             return response.json()
+        except APIError:
+            raise
         except requests.exceptions.RequestException as e:
             raise APIError(0, 'network_error', f"网络请求错误: {str(e)}")
         except Exception as e:
             raise APIError(0, 'unknown_error', f"未知错误: {str(e)}")
 
-    def get_available_models(self):
-        """获取当前API Key支持的所有模型列表"""
+    def _wait_turn(self, reserved_tokens):
+        """等待熔断器放行并取得限流配额，收到停止信号时返回 False"""
+        if self.circuit_breaker is not None and not self.circuit_breaker.wait(self.stop_event):
+            return False
+        if self.rate_limiter is not None and reserved_tokens is not None:
+            return self.rate_limiter.acquire(reserved_tokens, self.stop_event)
+        return True
+
+    def _sleep(self, seconds):
+        """可被停止信号打断的等待，被打断时返回 True"""
+        if self.stop_event is not None:
+            return self.stop_event.wait(seconds)
+        time.sleep(seconds)
+        return False
+
+    def _make_request(self, method, endpoint, reserved_tokens=None, on_latency=None, **kwargs):
+        """统一的请求处理方法，按重试策略对网络错误、5xx 和 429 进行重试
+
+        on_latency(seconds) 为可选的回调，传入成功的那次请求本身的耗时（不含限流、熔断和重试的等待）。
+        """
+        headers, kwargs = self._prepare_body(kwargs)
+        kwargs.setdefault('timeout', self.TIMEOUT)
+        attempt = 0
+        while True:
+            if not self._wait_turn(reserved_tokens):
+                raise APIError(0, 'cancelled', "请求已取消")
+            try:
+                started = time.monotonic()
+                result = self._send(method, endpoint, headers, **kwargs)
+            except APIError as e:
+                delay = self._after_attempt(reserved_tokens, attempt, error=e)
+                if delay is None or self._sleep(delay):
+                    raise
+                attempt += 1
+                continue
+            if on_latency is not None:
+                on_latency(time.monotonic() - started)
+            self._after_attempt(reserved_tokens, attempt, result=result)
+            return result
+
+    def get_available_models(self, timeout=None):
+        """获取当前API Key支持的所有模型列表，timeout 为 None 时使用默认超时"""
         try:
-            response = self._make_request('GET', '/models')
+            if timeout is None:
+                response = self._make_request('GET', '/models')
+            else:
+                response = self._make_request('GET', '/models', timeout=timeout)
             models = response.get('data', [])
             return [model['id'] for model in models if model.get('available', True)]
         except APIError as e:
-            print(f"获取模型列表失败: {e.message}")
+            getLogger("api").warning(f"获取模型列表失败: {e.message}")
             return []
 
     def get_model_info(self, model_id):
@@ -81,9 +274,17 @@ class AiHubMixAPI:
             response = self._make_request('GET', f'/models/{model_id}')
             return response.get('data', {})
         except APIError as e:
-            print(f"获取模型信息失败: {e.message}")
+            getLogger("api").warning(f"获取模型信息失败: {e.message}")
             return {}
 
+    def warm_up(self):
+        """预热连接池，在编码开始前完成 TCP/TLS 握手"""
+        try:
+            self.session.head(self.base_url, headers=self.headers, timeout=self.TIMEOUT[0])
+            return True
+        except requests.exceptions.RequestException:
+            return False
+
     def validate_api_key(self):
         """验证API Key是否有效"""
         try:
@@ -92,17 +293,100 @@ class AiHubMixAPI:
         except APIError:
             return False
 
-    def chat_completion(self, model, messages, temperature=0.7, max_tokens=None):
-        """统一的聊天完成接口"""
+    def chat_completion(self, model, messages, temperature=0.7, max_tokens=None, on_latency=None):
+        """统一的聊天完成接口，on_latency 见 _make_request"""
+        data = self._chat_data(model, messages, temperature, max_tokens)
         try:
-            data = {
-                "model": model,
-                "messages": messages,
-                "temperature": temperature
-            }
-            if max_tokens is not None:
-                data["max_tokens"] = max_tokens
-
-            return self._make_request('POST', '/chat/completions', json=data)
+            return self._make_request('POST', '/chat/completions', reserved_tokens=self._reserve_tokens(data),
+                                      on_latency=on_latency, json=data)
         except APIError as e:
-            return {"error": e.message}
+            return self._error_result(e)
+
+class AsyncAiHubMixAPI(BaseAPI):
+    """基于 aiohttp 的异步客户端，供异步编码引擎使用"""
+
+    def __init__(self, concurrency=100, rate_limiter=None, stop_event=None, retry_policy=None, circuit_breaker=None):
+        if aiohttp is None:
+            raise ImportError("异步编码引擎需要安装 aiohttp")
+        super().__init__(rate_limiter, stop_event, retry_policy, circuit_breaker)
+        self.concurrency = concurrency
+        self.session = None
+
+    def _get_session(self):
+        """在事件循环内惰性创建会话，连接池大小与并发数一致"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            timeout = aiohttp.ClientTimeout(sock_connect=self.TIMEOUT[0], total=self.TIMEOUT[1])
+            self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self.session
+
+    async def _send(self, method, endpoint, headers, **kwargs):
+        """异步发送一次请求"""
+        try:
+            url = f"{self.base_url}/{endpoint.lstrip('/')}"
+            async with self._get_session().request(method, url, headers=headers, **kwargs) as response:
+                if response.status != 200:
+                    try:
+                        payload = await response.json(content_type=None)
+                    except ValueError:
+                        payload = None
+                    raise self._build_error(response.status, payload, response.headers)
+                return await response.json(content_type=None)
+        except APIError:
+            raise
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            raise APIError(0, 'network_error', f"网络请求错误: {str(e)}")
+        except Exception as e:
+            raise APIError(0, 'unknown_error', f"未知错误: {str(e)}")
+
+    async def _wait_turn(self, reserved_tokens):
+        """等待熔断器放行并取得限流配额，收到停止信号时返回 False"""
+        if self.circuit_breaker is not None and not await self.circuit_breaker.wait_async(self.stop_event):
+            return False
+        if self.rate_limiter is not None and reserved_tokens is not None:
+            return await self.rate_limiter.acquire_async(reserved_tokens, self.stop_event)
+        return True
+
+    async def _make_request(self, method, endpoint, reserved_tokens=None, on_latency=None, **kwargs):
+        """统一的异步请求处理方法，重试逻辑和 on_latency 与同步客户端一致"""
+        headers, kwargs = self._prepare_body(kwargs)
+        attempt = 0
+        while True:
+            if not await self._wait_turn(reserved_tokens):
+                raise APIError(0, 'cancelled', "请求已取消")
+            try:
+                started = time.monotonic()
+                result = await self._send(method, endpoint, headers, **kwargs)
+            except APIError as e:
+                delay = self._after_attempt(reserved_tokens, attempt, error=e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if on_latency is not None:
+                on_latency(time.monotonic() - started)
+            self._after_attempt(reserved_tokens, attempt, result=result)
+            return result
+
+    async def warm_up(self):
+        """预热连接池"""
+        try:
+            async with self._get_session().head(self.base_url, headers=self.headers):
+                return True
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            return False
+
+    async def chat_completion(self, model, messages, temperature=0.7, max_tokens=None, on_latency=None):
+        """异步聊天完成接口，返回值与同步接口一致"""
+        data = self._chat_data(model, messages, temperature, max_tokens)
+        try:
+            return await self._make_request('POST', '/chat/completions', reserved_tokens=self._reserve_tokens(data),
+                                            on_latency=on_latency, json=data)
+        except APIError as e:
+            return self._error_result(e)
+
+    async def close(self):
+        """关闭会话并释放连接"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,243 @@
+import asyncio
+import json
+import arrow
+from src.module.config import getConfig
+from src.module.dbwriter import DBWriter
+from src.module.jobs import createJobQueue
+from src.module.aihubmix import AsyncAiHubMixAPI, aiohttp
+from src.module.ratelimit import getRateLimiter
+from src.module.retry import createRetryComponents
+from src.module.cache import getCompletionCache
+from src.module.tokens import estimate_messages_tokens
+from src.module.splitting import getMaxPromptTokens, isContextOverflow, split_prompt, merge_codes
+from src.module.planner import getLatencyRecorder, countReplies
+from src.module.logger import getLogger
+from src.module.progress import getProgressTracker
+from src.module.coding import (build_messages, parse_gpt_response, main_coding, emit_statistics, emit_encoding_failed,
+                               breaker_notifier, db_error_notifier, close_db_writer, emit_split_notice, prompt_token_budget, language, RateLimitedError,
+                               PromptTooLargeError, MIN_SPLIT_TOKENS, TEMPERATURE, MAX_TOKENS)
+
+def run_async_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED=False,
+                     SHOW_STATISTICS=True, CONCURRENCY=None):
+    """异步编码引擎入口，参数与 main_coding 保持一致；CONCURRENCY 为 None 时使用配置中的并发数"""
+    if aiohttp is None:
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if language == "Chinese":
+            output_signal.emit(f"[警告] [{timestamp}] 未安装 aiohttp，已切换为多线程引擎")
+        else:
+            output_signal.emit(f"[Warning] [{timestamp}] aiohttp is not installed, falling back to the thread engine")
+        main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME,
+                    LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED, SHOW_STATISTICS)
+        return
+    asyncio.run(async_main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME,
+                                  LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED,
+                                  SHOW_STATISTICS, CONCURRENCY))
+
+async def async_code_prompt(output_signal, api, model, prompt_content, cache=None):
+    """异步请求并解析单条提示语，返回值与 code_prompt 一致"""
+    messages = build_messages(prompt_content)
+
+    async def fetch():
+        latencies = []
+        response = await api.chat_completion(model, messages, TEMPERATURE, MAX_TOKENS, on_latency=latencies.append)
+        if 'error' not in response:
+            if latencies:
+                getLatencyRecorder().add(latencies[-1], estimate_messages_tokens(messages),
+                                         countReplies(prompt_content), response)
+            getProgressTracker().add_usage(response)
+        return response
+
+    if cache is not None:
+        key = cache.make_key(model, messages, TEMPERATURE, MAX_TOKENS)
+        response = await cache.get_or_fetch_async(key, fetch)
+    else:
+        response = await fetch()
+    if response.get('status_code') == 429:
+        raise RateLimitedError(response['error'], response.get('retry_after'))
+    if isContextOverflow(response):
+        raise PromptTooLargeError(response['error'])
+    if 'error' in response:
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if language == "Chinese":
+            output_signal.emit(f"[错误] [{timestamp}] {response['error']}")
+        else:
+            output_signal.emit(f"[Error] [{timestamp}] {response['error']}")
+        return None, None
+    return parse_gpt_response(response), response
+
+async def async_encode_split(output_signal, api, model, prompt_content, max_tokens, cache=None):
+    """encode_split 的异步版本，各分段依次请求"""
+    while max_tokens >= MIN_SPLIT_TOKENS:
+        chunks = split_prompt(prompt_content, max_tokens)
+        if not chunks:
+            return None, None
+        emit_split_notice(output_signal, len(chunks))
+        chunk_codes = []
+        responses = []
+        try:
+            for chunk, coded_ids in chunks:
+                prompt_code, response = await async_code_prompt(output_signal, api, model, chunk, cache)
+                if not prompt_code:
+                    return None, None
+                chunk_codes.append((prompt_code, coded_ids))
+                responses.append(response)
+        except PromptTooLargeError:
+            max_tokens //= 2
+            continue
+        return merge_codes(chunk_codes), json.dumps(responses)
+    return None, None
+
+async def async_encode_data(output_signal, api, model, record, cache=None):
+    """异步编码单条数据，返回值与 encode_data 一致"""
+    try:
+        prompt_content = record[1]
+        max_prompt_tokens = getMaxPromptTokens()
+        if max_prompt_tokens > 0 and estimate_messages_tokens(build_messages(prompt_content)) > max_prompt_tokens:
+            return await async_encode_split(output_signal, api, model, prompt_content,
+                                            prompt_token_budget(max_prompt_tokens), cache)
+        try:
+            prompt_code, response = await async_code_prompt(output_signal, api, model, prompt_content, cache)
+        except PromptTooLargeError:
+            budget = estimate_messages_tokens(build_messages(prompt_content)) // 2
+            if max_prompt_tokens > 0:
+                budget = min(budget, prompt_token_budget(max_prompt_tokens))
+            return await async_encode_split(output_signal, api, model, prompt_content, budget, cache)
+        if prompt_code:
+            return prompt_code, json.dumps(response)
+    except RateLimitedError:
+        raise
+    except Exception as e:
+        getLogger("coding").warning(f"编码失败: {str(e)}", extra={'item_id': record[0]})
+    return None, None
+
+async def async_worker(output_signal, api, model, db_writer, job_queue, stop_event, record, state, cache=None):
+    """处理单条记录：请求模型并提交写入"""
+    loop = asyncio.get_running_loop()
+    tracker = getProgressTracker()
+    tracker.item_started()
+    try:
+        while True:
+            try:
+                prompt_code, prompt_code_orign = await async_encode_data(output_signal, api, model, record, cache)
+                break
+            except RateLimitedError:
+                # 被限流时原地重试，由共享限流器决定等待时间
+                timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+                if language == "Chinese":
+                    output_signal.emit(f"[警告] [{timestamp}] 请求被限流，稍后重试")
+                else:
+                    output_signal.emit(f"[Warning] [{timestamp}] Rate limited, retrying later")
+    except asyncio.CancelledError:
+        # 收到停止信号被取消：记录下来，所有任务结束后在线程池中统一归还，不在事件循环中写数据库
+        state['cancelled'].append(record[0])
+        tracker.item_released()
+        raise
+    finally:
+        state['in_flight'] -= 1
+    state['remaining'] -= 1
+
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if prompt_code and prompt_code_orign:
+        db_writer.submit(prompt_code, prompt_code_orign, record[0])
+        tracker.item_finished(True)
+        getLogger("coding").debug("编码完成", extra={'item_id': record[0]})
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{timestamp}] [异步任务]：进行中 {state['in_flight']} 项，剩余 {state['remaining']} 项待处理")
+        else:
+            output_signal.emit(f"[Notice] [{timestamp}] [Async task]: {state['in_flight']} in flight, {state['remaining']} items remaining")
+    elif stop_event.is_set():
+        await loop.run_in_executor(None, job_queue.release, [record[0]])
+        tracker.item_released()
+    else:
+        dead = await loop.run_in_executor(None, job_queue.fail, record[0], "encoding failed")
+        # 未移入失败列表的数据回到待处理，稍后会被重新领取，不计入失败
+        if dead:
+            tracker.item_finished(False)
+        else:
+            tracker.item_released()
+        getLogger("coding").warning("编码失败" + ("，移入失败列表" if dead else ""), extra={'item_id': record[0]})
+        emit_encoding_failed(output_signal, dead)
+
+async def watch_stop_event(stop_event, tasks):
+    """监听停止信号，触发后取消所有进行中的请求"""
+    while not stop_event.is_set():
+        await asyncio.sleep(0.2)
+    for task in list(tasks):
+        task.cancel()
+
+async def async_main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED=False,
+                            SHOW_STATISTICS=True, CONCURRENCY=None):
+    """异步编码主函数：按批领取数据，用信号量限制同时进行的请求数"""
+    loop = asyncio.get_running_loop()
+    job_queue = createJobQueue(DATABASE_PATH, dead_letter=ONLY_FAILED)
+    total = await loop.run_in_executor(None, job_queue.available)
+    if LIMIT >= 0:
+        total = min(total, LIMIT)
+    if not total:
+        job_queue.close()
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] 没有需要处理的数据")
+        else:
+            output_signal.emit(f"[Notice] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] No data to process")
+        return
+
+    config = getConfig()
+    model = config.get("AICO", "model")
+    if not model:
+        job_queue.close()
+        error_msg = "未选择AI模型" if language == "Chinese" else "No AI model selected"
+        output_signal.emit(f"[Error] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] {error_msg}")
+        return
+    concurrency = max(CONCURRENCY or config.getint("Engine", "async_concurrency", fallback=100), 1)
+    # 每次领取的条数：信号量只允许 concurrency 个请求同时进行，多领取的数据只是短暂持有租约
+    batch_size = min(concurrency, 50)
+
+    rate_limiter = getRateLimiter()
+    retry_policy, circuit_breaker = createRetryComponents(breaker_notifier(output_signal))
+    api = AsyncAiHubMixAPI(concurrency=concurrency, rate_limiter=rate_limiter, stop_event=stop_event,
+                           retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+    db_writer = DBWriter(DATABASE_PATH, on_error=db_error_notifier(output_signal))
+    cache = getCompletionCache()
+    semaphore = asyncio.Semaphore(concurrency)
+    state = {'in_flight': 0, 'remaining': total, 'cancelled': []}
+    getProgressTracker().start(total)
+    tasks = set()
+    watcher = asyncio.create_task(watch_stop_event(stop_event, tasks))
+
+    try:
+        await api.warm_up()
+        claimed = 0
+        while not stop_event.is_set():
+            size = batch_size if LIMIT < 0 else min(batch_size, LIMIT - claimed)
+            records = await loop.run_in_executor(None, job_queue.claim, size)
+            if not records:
+                break
+            claimed += len(records)
+            for index, record in enumerate(records):
+                await semaphore.acquire()
+                if stop_event.is_set():
+                    semaphore.release()
+                    await loop.run_in_executor(None, job_queue.release, [item[0] for item in records[index:]])
+                    break
+                state['in_flight'] += 1
+                task = asyncio.create_task(async_worker(output_signal, api, model, db_writer, job_queue, stop_event,
+                                                        record, state, cache))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: semaphore.release())
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        watcher.cancel()
+        if state['cancelled']:
+            await loop.run_in_executor(None, job_queue.release, state['cancelled'])
+        await api.close()
+        # 在线程池中等待写入线程写完剩余结果，避免阻塞事件循环
+        await loop.run_in_executor(None, close_db_writer, db_writer, output_signal)
+        job_queue.close()
+        getLatencyRecorder().save(DATABASE_PATH)
+        getProgressTracker().finish()
+
+    # 只有在正常完成时才显示统计信息
+    if SHOW_STATISTICS and not stop_event.is_set():
+        emit_statistics(output_signal, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, rate_limiter, retry_policy, circuit_breaker, cache)
@@ -0,0 +1,211 @@
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from src.module.config import getConfig, onConfigChanged, completionCacheFilePath
+
+# 全局共享的补全结果缓存
+_completion_cache = None
+_completion_cache_lock = threading.Lock()
+
+
+def getCompletionCache():
+    """获取全局共享的补全结果缓存"""
+    global _completion_cache
+    with _completion_cache_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache(completionCacheFilePath(), **cacheSettings(getConfig()))
+            # 创建缓存时才注册，只导入本模块不会读取或创建配置文件
+            onConfigChanged(cacheConfigChanged)
+        return _completion_cache
+
+
+def cacheSettings(config):
+    return {
+        'max_size_mb': config.getfloat("Cache", "max_size_mb", fallback=512),
+        'max_age_days': config.getfloat("Cache", "max_age_days", fallback=30),
+        'bypass': config.getboolean("Cache", "bypass", fallback=False),
+    }
+
+
+def cacheConfigChanged(config):
+    """修改 [Cache] 后立即作用于全局缓存，包括正在进行的编码"""
+    cache = _completion_cache
+    if cache is not None:
+        cache.configure(**cacheSettings(config))
+
+
+class _Flight:
+    """一次进行中的请求，相同键的其他调用者等待其结果"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+
+
+class CompletionCache:
+    """以模型、消息和参数的哈希为键，在本地 SQLite 中缓存模型的补全结果
+
+    - 按时间（max_age_days）和总大小（max_size_mb，淘汰最久未使用的条目）清理
+    - bypass 为 True 时不读取缓存，但仍写入新的结果
+    - 相同键的并发请求只发送一次（single-flight）
+    """
+
+    # 每写入多少条检查一次容量
+    EVICT_EVERY = 200
+
+    def __init__(self, path, max_size_mb=512, max_age_days=30, bypass=False):
+        self.path = path
+        self.configure(max_size_mb, max_age_days, bypass)
+        self.lock = threading.Lock()
+        self.inflight = {}
+        self.inflight_async = {}
+        self.puts_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS completion_cache (
+            'key' TEXT PRIMARY KEY,
+            'response' TEXT,
+            'size' INTEGER,
+            'created_at' REAL,
+            'accessed_at' REAL
+        )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_completion_cache_accessed ON completion_cache (accessed_at)")
+        self.conn.commit()
+        self.evict()
+
+    def configure(self, max_size_mb=512, max_age_days=30, bypass=False):
+        """设置容量、有效期和是否跳过读取，可在运行中修改"""
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.max_age = max_age_days * 86400
+        self.bypass = bypass
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        """根据模型、消息、temperature 和 max_tokens 生成缓存键"""
+        payload = json.dumps([model, messages, temperature, max_tokens], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """读取缓存，未命中或已过期时返回 None"""
+        if self.bypass:
+            return None
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM completion_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE completion_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, response):
+        """写入缓存，只缓存成功的响应"""
+        if not isinstance(response, dict) or 'error' in response:
+            return
+        text = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO completion_cache (key, response, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, text, len(text.encode('utf-8')), now, now)
+            )
+            self.conn.commit()
+            self.puts_since_evict += 1
+            need_evict = self.puts_since_evict >= self.EVICT_EVERY
+        if need_evict:
+            self.evict()
+
+    def evict(self):
+        """删除过期条目，并在超出容量时按最近访问时间淘汰"""
+        with self.lock:
+            self.puts_since_evict = 0
+            self.conn.execute("DELETE FROM completion_cache WHERE created_at < ?", (time.time() - self.max_age,))
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM completion_cache").fetchone()[0]
+            if total > self.max_bytes:
+                # 淘汰到容量的 90%，避免每次写入都触发淘汰
+                excess = total - int(self.max_bytes * 0.9)
+                removed = 0
+                keys = []
+                for key, size in self.conn.execute("SELECT key, size FROM completion_cache ORDER BY accessed_at"):
+                    keys.append((key,))
+                    removed += size
+                    if removed >= excess:
+                        break
+                self.conn.executemany("DELETE FROM completion_cache WHERE key = ?", keys)
+            self.conn.commit()
+
+    def get_or_fetch(self, key, fetch):
+        """先查缓存，未命中时调用 fetch；相同键的并发调用共享同一次请求"""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            flight = self.inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.inflight[key] = _Flight()
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.event.wait()
+            # 发起请求的调用方出现异常时，自行重新请求
+            return flight.result if flight.result is not None else fetch()
+
+        try:
+            flight.result = fetch()
+            self.put(key, flight.result)
+            return flight.result
+        finally:
+            with self.lock:
+                self.inflight.pop(key, None)
+            flight.event.set()
+
+    async def get_or_fetch_async(self, key, fetch):
+        """get_or_fetch 的异步版本，fetch 为返回协程的函数"""
+        loop = asyncio.get_running_loop()
+        cached = await loop.run_in_executor(None, self.get, key)
+        if cached is not None:
+            return cached
+
+        future = self.inflight_async.get(key)
+        if future is not None:
+            with self.lock:
+                self.shared += 1
+            return await asyncio.shield(future)
+
+        future = self.inflight_async[key] = loop.create_future()
+        try:
+            result = await fetch()
+            await loop.run_in_executor(None, self.put, key, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 避免没有等待者时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self.inflight_async.pop(key, None)
+
+    def stats(self):
+        """命中、未命中以及与进行中请求合并的次数"""
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'shared': self.shared}
@@ -1,60 +1,48 @@
 import re
-import time
 import arrow
 import json
 import sqlite3
 import threading
-from PySide6.QtCore import QObject, Signal, QThread
-from queue import Queue, Empty
-from src.module.config import localDBFilePath, readConfig
+from src.module.config import getConfig
+from src.module.localDB import PROMPT_PENDING, PROMPT_LEASED, PROMPT_FAILED
 from src.module.aihubmix import AiHubMixAPI
+from src.module.ratelimit import getRateLimiter
+from src.module.retry import createRetryComponents, CircuitBreaker
+from src.module.cache import getCompletionCache
+from src.module.tokens import estimate_messages_tokens
+from src.module.splitting import getMaxPromptTokens, isContextOverflow, split_prompt, merge_codes
+from src.module.planner import getLatencyRecorder, countReplies
+from src.module.dbwriter import DBWriter, ResultWriteError
+from src.module.jobs import createJobQueue, JobFeeder
+from src.module.logger import getLogger
+from src.module.progress import getProgressTracker
 
-language = readConfig().get("Language", "language")
-
-class AICodingWorkerThread(QThread):
-    output_signal = Signal(str)
-    running_signal = Signal(bool)
-
-    def __init__(self, limit):
-        super().__init__()
-        self.THREAD_COUNT = readConfig().getint("Thread", "thread_count")
-        self.LIMIT = limit
-        self.thread_results = {}
-        self.local_db_file_path = localDBFilePath()
-        self.DATABASE_PATH = self.local_db_file_path
-        self.TABLE_NAME = "prompt"
-        self.LABEL_COLUMN_NAME = "prompt_code"
-        self.DEFAULT_NODE_RECOGNITION_PROMPT = ""
-        self._stop_event = threading.Event()
-
-    def run(self):
-        self._stop_event.clear()
-        self.running_signal.emit(True)
-        main_coding(self._stop_event, self.output_signal, self.thread_results, self.THREAD_COUNT, self.DATABASE_PATH, 
-                   self.TABLE_NAME, self.LABEL_COLUMN_NAME, self.LIMIT, self.DEFAULT_NODE_RECOGNITION_PROMPT)
-        self.running_signal.emit(False)
-
-    def stop(self):
-        self._stop_event.set()
-        self.wait()
-
-    def __del__(self):
-        self.stop()
-
-def get_code_from_gpt(output_signal, prompt_content):
-    """调用AI模型进行代码生成"""
-    api = AiHubMixAPI()
-    model = readConfig().get("AICO", "model")
-    
-    if not model:
-        error_msg = "未选择AI模型" if language == "Chinese" else "No AI model selected"
-        output_signal.emit(f"[Error] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] {error_msg}")
-        return None
+language = getConfig().get("Language", "language")
+
+class RateLimitedError(Exception):
+    """请求被限流（HTTP 429），该条数据需要稍后重新处理"""
+    def __init__(self, message, retry_after=None):
+        self.retry_after = retry_after
+        super().__init__(message)
 
-    messages = [
+class PromptTooLargeError(Exception):
+    """请求体过大（HTTP 413）或超出模型上下文，需要拆分后重新请求"""
+
+# 拆分后仍超长时，每次将预算减半，低于该值后放弃
+MIN_SPLIT_TOKENS = 256
+
+# 请求参数，同时参与缓存键的计算
+TEMPERATURE = 0.7
+MAX_TOKENS = None
+
+SYSTEM_PROMPT = "您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签，并在一组 JSON 对象中输出。"
+
+def build_messages(prompt_content):
+    """构造发送给AI模型的消息列表"""
+    return [
         {
             "role": "system",
-            "content": "您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签，并在一组 JSON 对象中输出。",
+            "content": SYSTEM_PROMPT,
         },
         {
             "role": "user", 
@@ -62,7 +50,43 @@ def get_code_from_gpt(output_signal, prompt_content):
         }
     ]
 
-    response = api.chat_completion(model, messages)
+def get_code_from_gpt(output_signal, prompt_content, api=None, cache=None):
+    """调用AI模型进行代码生成，优先读取本地缓存"""
+    if api is None:
+        api = AiHubMixAPI()
+    model = api.model
+
+    if not model:
+        error_msg = "未选择AI模型" if language == "Chinese" else "No AI model selected"
+        output_signal.emit(f"[Error] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] {error_msg}")
+        return None
+
+    messages = build_messages(prompt_content)
+
+    def fetch():
+        # 只记录实际发送的请求本身的耗时，缓存命中以及限流、重试的等待不计入耗时校准
+        latencies = []
+        response = api.chat_completion(model, messages, TEMPERATURE, MAX_TOKENS, on_latency=latencies.append)
+        if 'error' not in response:
+            if latencies:
+                getLatencyRecorder().add(latencies[-1], estimate_messages_tokens(messages),
+                                         countReplies(prompt_content), response)
+            getProgressTracker().add_usage(response)
+        return response
+
+    if cache is not None:
+        key = cache.make_key(model, messages, TEMPERATURE, MAX_TOKENS)
+        response = cache.get_or_fetch(key, fetch)
+    else:
+        response = fetch()
+
+    # 被限流的数据不算编码失败，交由调用方重新排队
+    if response.get('status_code') == 429:
+        raise RateLimitedError(response['error'], response.get('retry_after'))
+
+    # 超长的提示语交由调用方拆分
+    if isContextOverflow(response):
+        raise PromptTooLargeError(response['error'])
     
     if 'error' in response:
         timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
@@ -84,113 +108,179 @@ def parse_gpt_response(response):
         content = re.sub(r'[\n\r\s]+', ' ', str(content)).strip()
         return content if content else None
     except Exception as e:
-        print(f"解析响应失败: {str(e)}")
+        getLogger("coding").warning(f"解析响应失败: {str(e)}")
         return None
 
-def encode_data(output_signal, record, default_node_recognition_prompt, label):
-    """编码数据"""
+def prompt_token_budget(max_prompt_tokens):
+    """扣除系统提示语等开销后，用户提示语可用的 token 数"""
+    return max_prompt_tokens - estimate_messages_tokens(build_messages(''))
+
+def emit_split_notice(output_signal, chunk_count):
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if language == "Chinese":
+        output_signal.emit(f"[提示] [{timestamp}] 提示语过长，已拆分为 {chunk_count} 段分别编码")
+    else:
+        output_signal.emit(f"[Notice] [{timestamp}] Prompt too large, split into {chunk_count} chunks")
+
+def code_prompt(output_signal, prompt_content, api=None, cache=None):
+    """请求并解析单条提示语，返回 (prompt_code, response)"""
+    response = get_code_from_gpt(output_signal, prompt_content, api, cache)
+    if response:
+        return parse_gpt_response(response), response
+    return None, None
+
+def encode_split(output_signal, prompt_content, max_tokens, api=None, cache=None):
+    """拆分超长提示语后逐段编码，合并各回帖的结果；任一段失败时返回 (None, None)"""
+    while max_tokens >= MIN_SPLIT_TOKENS:
+        chunks = split_prompt(prompt_content, max_tokens)
+        if not chunks:
+            return None, None
+        emit_split_notice(output_signal, len(chunks))
+        chunk_codes = []
+        responses = []
+        try:
+            for chunk, coded_ids in chunks:
+                prompt_code, response = code_prompt(output_signal, chunk, api, cache)
+                if not prompt_code:
+                    return None, None
+                chunk_codes.append((prompt_code, coded_ids))
+                responses.append(response)
+        except PromptTooLargeError:
+            # 本地估算偏小，减半后重新拆分
+            max_tokens //= 2
+            continue
+        return merge_codes(chunk_codes), json.dumps(responses)
+    return None, None
+
+def encode_data(output_signal, record, default_node_recognition_prompt, label, api=None, cache=None):
+    """编码数据，超长的提示语拆分后编码"""
     try:
-        prompt_content = record[0]  # 获取 prompt_content 列的值
-        response = get_code_from_gpt(output_signal, prompt_content)
-        if response:
-            prompt_code = parse_gpt_response(response)
-            if prompt_code:
-                return prompt_code, json.dumps(response)  # 使用 json.dumps 确保 response 被正确序列化
+        prompt_content = record[1]  # 记录为 (id, prompt_content)
+        max_prompt_tokens = getMaxPromptTokens()
+        if max_prompt_tokens > 0:
+            budget = prompt_token_budget(max_prompt_tokens)
+            if estimate_messages_tokens(build_messages(prompt_content)) > max_prompt_tokens:
+                return encode_split(output_signal, prompt_content, budget, api, cache)
+        try:
+            prompt_code, response = code_prompt(output_signal, prompt_content, api, cache)
+        except PromptTooLargeError:
+            budget = estimate_messages_tokens(build_messages(prompt_content)) // 2
+            if max_prompt_tokens > 0:
+                budget = min(budget, prompt_token_budget(max_prompt_tokens))
+            return encode_split(output_signal, prompt_content, budget, api, cache)
+        if prompt_code:
+            return prompt_code, json.dumps(response)  # 使用 json.dumps 确保 response 被正确序列化
+    except RateLimitedError:
+        raise
     except Exception as e:
-        print(f"编码失败: {str(e)}")
+        getLogger("coding").warning(f"编码失败: {str(e)}", extra={'item_id': record[0]})
     return None, None
 
-def worker(stop_event, output_signal, input_queue, output_dict, db_path, table_name, label, default_node_recognition_prompt):
-    """工作线程处理函数"""
+def worker(stop_event, output_signal, feeder, job_queue, db_writer, default_node_recognition_prompt, api=None, cache=None):
+    """工作线程处理函数：从预取队列中取数据，完成后提交给写入线程"""
+    tracker = getProgressTracker()
     while not stop_event.is_set():
-        try:
-            # 使用timeout参数，这样可以更频繁地检查stop_event
-            try:
-                record = input_queue.get(timeout=0.1)
-            except Empty:
-                continue
-                
-            # 再次检查stop_event，如果设置了就立即退出
-            if stop_event.is_set():
+        # 使用timeout参数，这样可以更频繁地检查stop_event
+        record = feeder.get(timeout=0.1)
+        if record is None:
+            if feeder.done():
                 break
-                
-            # 输出当前处理进度
-            timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
-            if language == "Chinese":
-                output_signal.emit(f"[提示] [{timestamp}] [当前线程]：{threading.current_thread().name}，剩余 {input_queue.qsize()} 项待处理")
-            else:
-                output_signal.emit(f"[Notice] [{timestamp}] [Current thread]: {threading.current_thread().name}, {input_queue.qsize()} items remaining")
-        except Empty:
-            break
+            continue
 
-        # 如果设置了stop_event，跳过处理直接退出
+        # 如果设置了stop_event，归还数据后直接退出
         if stop_event.is_set():
+            job_queue.release([record[0]])
             break
-            
-        prompt_code, prompt_code_orign = encode_data(output_signal, record, default_node_recognition_prompt, label)
-        
-        # 再次检查stop_event
-        if stop_event.is_set():
-            break
-            
-        if prompt_code and prompt_code_orign:
+
+        # 输出当前处理进度
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{timestamp}] [当前线程]：{threading.current_thread().name}，剩余 {feeder.remaining()} 项待处理")
+        else:
+            output_signal.emit(f"[Notice] [{timestamp}] [Current thread]: {threading.current_thread().name}, {feeder.remaining()} items remaining")
+
+        tracker.item_started()
+        while True:
             try:
-                conn = sqlite3.connect(db_path)
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE prompt SET prompt_code = ?, prompt_code_orign = ? WHERE prompt_content = ?", 
-                    (prompt_code, prompt_code_orign, record[0])
-                )
-                conn.commit()
-                conn.close()
-            except Exception as e:
+                prompt_code, prompt_code_orign = encode_data(output_signal, record, default_node_recognition_prompt, None, api, cache)
+                break
+            except RateLimitedError:
+                # 被限流时原地重试，由共享限流器决定等待时间
                 timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
                 if language == "Chinese":
-                    output_signal.emit(f"[错误] [{timestamp}] 数据库更新失败: {str(e)}")
+                    output_signal.emit(f"[警告] [{timestamp}] 请求被限流，稍后重试")
                 else:
-                    output_signal.emit(f"[Error] [{timestamp}] Database update failed: {str(e)}")
+                    output_signal.emit(f"[Warning] [{timestamp}] Rate limited, retrying later")
+
+        # 已完成的结果即使收到停止信号也要写入，由写入线程批量提交
+        if prompt_code and prompt_code_orign:
+            db_writer.submit(prompt_code, prompt_code_orign, record[0])
+            tracker.item_finished(True)
+            getLogger("coding").debug("编码完成", extra={'item_id': record[0]})
+        elif stop_event.is_set():
+            # 请求被中断，不计入失败次数
+            job_queue.release([record[0]])
+            tracker.item_released()
         else:
-            timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
-            if language == "Chinese":
-                output_signal.emit(f"[警告] [{timestamp}] 编码失败")
+            dead = job_queue.fail(record[0], "encoding failed")
+            # 未移入失败列表的数据回到待处理，稍后会被重新领取，不计入失败
+            if dead:
+                tracker.item_finished(False)
             else:
-                output_signal.emit(f"[Warning] [{timestamp}] Encoding failed")
+                tracker.item_released()
+            getLogger("coding").warning("编码失败" + ("，移入失败列表" if dead else ""), extra={'item_id': record[0]})
+            emit_encoding_failed(output_signal, dead)
+
+def emit_encoding_failed(output_signal, dead=False):
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if language == "Chinese":
+        output_signal.emit(f"[警告] [{timestamp}] 编码失败" + ("，已多次失败，移入失败列表" if dead else ""))
+    else:
+        output_signal.emit(f"[Warning] [{timestamp}] Encoding failed" + (", moved to the failed list after repeated failures" if dead else ""))
 
 def fetch_data_from_database(db_path, table_name, label, limit=-1):
-    """从数据库获取数据"""
+    """从数据库获取未编码的数据，返回 (id, prompt_content) 列表"""
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     try:
-        if limit == -1:
-            cursor.execute("SELECT prompt_content FROM prompt WHERE prompt_code IS NULL OR prompt_code = 'None'")
-        else:
-            cursor.execute("SELECT prompt_content FROM prompt WHERE prompt_code IS NULL OR prompt_code = 'None' LIMIT ?", 
-                         (limit,))
+        # LIMIT -1 表示不限制条数
+        cursor.execute('SELECT "index", prompt_content FROM prompt WHERE status = ? ORDER BY "index" LIMIT ?',
+                       (PROMPT_PENDING, limit))
         records = cursor.fetchall()
         return records
     finally:
         conn.close()
 
-def main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT):
-    """主编码处理函数"""
-    records = fetch_data_from_database(DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT)
-    if not records:
-        if language == "Chinese":
-            output_signal.emit(f"[提示] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] 没有需要处理的数据")
-        else:
-            output_signal.emit(f"[Notice] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] No data to process")
-        return
+def count_status(db_path):
+    """各编码状态的数据条数"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return dict(conn.execute("SELECT status, COUNT(*) FROM prompt GROUP BY status").fetchall())
+    finally:
+        conn.close()
+
+def run_workers(stop_event, output_signal, job_queue, db_writer, rate_limiter, THREAD_COUNT, LIMIT, total, DEFAULT_NODE_RECOGNITION_PROMPT):
+    """启动工作线程处理 job_queue 中的数据，结束后归还未处理的数据，返回 (retry_policy, circuit_breaker, cache)
 
-    input_queue = Queue()
-    for record in records:
-        input_queue.put(record)
+    job_queue、db_writer 和 rate_limiter 可以是本地实现，也可以是连接协调服务的远程实现
+    """
+    getProgressTracker().start(total)
+    # 按批领取数据，内存中最多保留约两倍线程数的提示语
+    feeder = JobFeeder(job_queue, stop_event, prefetch=THREAD_COUNT * 2, batch_size=THREAD_COUNT, limit=LIMIT, total=total)
+
+    # 所有工作线程共享同一个 API 客户端及其连接池，并在开始前预热连接
+    retry_policy, circuit_breaker = createRetryComponents(breaker_notifier(output_signal))
+    api = AiHubMixAPI(pool_size=THREAD_COUNT + 2, rate_limiter=rate_limiter, stop_event=stop_event,
+                      retry_policy=retry_policy, circuit_breaker=circuit_breaker)
+    api.warm_up()
+    cache = getCompletionCache()
+    feeder.start()
 
     threads = []
-    for _ in range(min(THREAD_COUNT, len(records))):
+    for _ in range(min(THREAD_COUNT, total)):
         t = threading.Thread(
             target=worker,
-            args=(stop_event, output_signal, input_queue, thread_results, DATABASE_PATH, 
-                  TABLE_NAME, LABEL_COLUMN_NAME, DEFAULT_NODE_RECOGNITION_PROMPT)
+            args=(stop_event, output_signal, feeder, job_queue, db_writer, DEFAULT_NODE_RECOGNITION_PROMPT, api, cache)
         )
         t.daemon = True  # 设置为守护线程，这样主程序退出时线程会自动结束
         t.start()
@@ -207,10 +297,118 @@ def main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABAS
         if stop_event.is_set():
             break
 
+    # 归还未处理的数据
+    feeder.drain()
+    getProgressTracker().finish()
+    return retry_policy, circuit_breaker, cache
+
+def main_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED=False,
+                SHOW_STATISTICS=True):
+    """主编码处理函数，ONLY_FAILED 为 True 时只重新编码失败列表中的数据；SHOW_STATISTICS 为 False 时由调用方汇总统计"""
+    job_queue = createJobQueue(DATABASE_PATH, dead_letter=ONLY_FAILED)
+    total = job_queue.available()
+    if LIMIT >= 0:
+        total = min(total, LIMIT)
+    if not total:
+        job_queue.close()
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] 没有需要处理的数据")
+        else:
+            output_signal.emit(f"[Notice] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] No data to process")
+        return
+
+    rate_limiter = getRateLimiter()
+    db_writer = DBWriter(DATABASE_PATH, on_error=db_error_notifier(output_signal))
+    retry_policy, circuit_breaker, cache = run_workers(stop_event, output_signal, job_queue, db_writer, rate_limiter,
+                                                       THREAD_COUNT, LIMIT, total, DEFAULT_NODE_RECOGNITION_PROMPT)
+
+    # 在停止或完成时写完所有已完成的结果；仍在进行中的请求由租约到期后回收
+    close_db_writer(db_writer, output_signal)
+    job_queue.close()
+
+    # 保存本次请求的耗时，用于预估
+    getLatencyRecorder().save(DATABASE_PATH)
+
     # 只有在正常完成时才显示统计信息
-    if not stop_event.is_set():
-        remaining = len(fetch_data_from_database(DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME))
+    if SHOW_STATISTICS and not stop_event.is_set():
+        emit_statistics(output_signal, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, rate_limiter, retry_policy, circuit_breaker, cache)
+
+def close_db_writer(db_writer, output_signal):
+    """关闭写入线程；仍有结果未能写入时输出错误，这些数据保持领取状态，租约到期后重新编码"""
+    try:
+        db_writer.close()
+    except ResultWriteError as e:
+        prompt_ids = ", ".join(str(result[3]) for result in e.results)
+        getLogger("dbwriter").error(f"{len(e.results)} 条编码结果未能写入: {prompt_ids}")
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
         if language == "Chinese":
-            output_signal.emit(f"[提示] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] [编码统计]：剩余 {remaining} 项待处理")
+            output_signal.emit(f"[错误] [{timestamp}] {len(e.results)} 条编码结果未能写入，这些数据将在租约到期后重新编码")
         else:
-            output_signal.emit(f"[Notice] [{arrow.now().format('YYYY-MM-DD HH:mm:ss')}] [Coding statistics]：Total {remaining} items remaining to be processed")
\ No newline at end of file
+            output_signal.emit(f"[Error] [{timestamp}] {len(e.results)} coding results could not be saved; they will be re-coded after their leases expire")
+        return False
+    return True
+
+def db_error_notifier(output_signal):
+    """写入线程提交失败时向界面输出提示"""
+    def notify(error):
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if language == "Chinese":
+            output_signal.emit(f"[错误] [{timestamp}] 数据库更新失败: {str(error)}")
+        else:
+            output_signal.emit(f"[Error] [{timestamp}] Database update failed: {str(error)}")
+    return notify
+
+def breaker_notifier(output_signal):
+    """熔断器状态变化时向界面输出提示"""
+    def notify(state, reset_timeout):
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if state == CircuitBreaker.OPEN:
+            if language == "Chinese":
+                output_signal.emit(f"[警告] [{timestamp}] 连续请求失败，暂停所有线程 {reset_timeout:.0f} 秒后探测服务")
+            else:
+                output_signal.emit(f"[Warning] [{timestamp}] Too many consecutive failures, pausing all workers for {reset_timeout:.0f}s before probing")
+        elif state == CircuitBreaker.HALF_OPEN:
+            if language == "Chinese":
+                output_signal.emit(f"[提示] [{timestamp}] 正在探测服务是否恢复")
+            else:
+                output_signal.emit(f"[Notice] [{timestamp}] Probing whether the service has recovered")
+        elif state == CircuitBreaker.CLOSED:
+            if language == "Chinese":
+                output_signal.emit(f"[提示] [{timestamp}] 服务已恢复，继续编码")
+            else:
+                output_signal.emit(f"[Notice] [{timestamp}] Service recovered, resuming coding")
+    return notify
+
+def emit_statistics(output_signal, db_path, table_name, label, rate_limiter=None, retry_policy=None, circuit_breaker=None, cache=None):
+    """输出编码统计信息"""
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    status_counts = count_status(db_path)
+    remaining = status_counts.get(PROMPT_PENDING, 0) + status_counts.get(PROMPT_LEASED, 0)
+    failed = status_counts.get(PROMPT_FAILED, 0)
+    if language == "Chinese":
+        output_signal.emit(f"[提示] [{timestamp}] [编码统计]：剩余 {remaining} 项待处理" + (f"，{failed} 项多次失败" if failed else ""))
+    else:
+        output_signal.emit(f"[Notice] [{timestamp}] [Coding statistics]：Total {remaining} items remaining to be processed" + (f", {failed} items failed repeatedly" if failed else ""))
+    if rate_limiter is not None:
+        stats = rate_limiter.stats()
+        if stats['rate_limited_count']:
+            if language == "Chinese":
+                output_signal.emit(f"[提示] [{timestamp}] [限流统计]：触发 429 共 {stats['rate_limited_count']} 次，当前速率 {stats['current_rpm']} 请求/分钟，{stats['current_tpm']} tokens/分钟")
+            else:
+                output_signal.emit(f"[Notice] [{timestamp}] [Rate limit statistics]: {stats['rate_limited_count']} 429 responses, current rate {stats['current_rpm']} requests/min, {stats['current_tpm']} tokens/min")
+    if retry_policy is not None and circuit_breaker is not None:
+        retry_counts = retry_policy.stats()
+        breaker_stats = circuit_breaker.stats()
+        if retry_counts or breaker_stats['open_count']:
+            retry_detail = ", ".join(f"{key}: {value}" for key, value in sorted(retry_counts.items())) or "0"
+            if language == "Chinese":
+                output_signal.emit(f"[提示] [{timestamp}] [重试统计]：重试 {sum(retry_counts.values())} 次（{retry_detail}），熔断 {breaker_stats['open_count']} 次，共暂停 {breaker_stats['open_seconds']} 秒")
+            else:
+                output_signal.emit(f"[Notice] [{timestamp}] [Retry statistics]: {sum(retry_counts.values())} retries ({retry_detail}), circuit breaker opened {breaker_stats['open_count']} times, paused {breaker_stats['open_seconds']}s in total")
+    if cache is not None:
+        cache_stats = cache.stats()
+        if cache_stats['hits'] or cache_stats['shared']:
+            if language == "Chinese":
+                output_signal.emit(f"[提示] [{timestamp}] [缓存统计]：命中 {cache_stats['hits']} 次，合并重复请求 {cache_stats['shared']} 次")
+            else:
+                output_signal.emit(f"[Notice] [{timestamp}] [Cache statistics]: {cache_stats['hits']} hits, {cache_stats['shared']} duplicate requests merged")
\ No newline at end of file
@@ -1,11 +1,17 @@
 import os
 import re
+import atexit
 import platform
+import threading
 import configparser
 import arrow
 
 from src.module import version
 
+# 同一话题的回帖线程合并到一个请求的默认 token 上限；新建配置和缺少该项的旧配置使用同一个值
+# 默认为 0（每个线程一个请求，与之前的版本相同），需要合并请求时在配置中设置
+DEFAULT_PACK_TOKEN_BUDGET = 0
+
 # 文件夹存在检查
 def newFolder(folder_name):
     if not os.path.exists(folder_name):
@@ -50,6 +56,12 @@ def localDBFilePath():
 
     return local_db_file_path + "/aicoding.db"
 
+def completionCacheFilePath():
+    local_db_file_path = os.path.join(configPath(), "coding_framework")
+    newFolder(local_db_file_path)
+
+    return local_db_file_path + "/completion_cache.db"
+
 
 def logFolder():
     log_folder = os.path.join(configPath(), "logs")
@@ -75,10 +87,60 @@ def initConfig(config_file):
 
     config.add_section("AICO")
     config.set("AICO", "model", "")  # 默认为空，由用户选择
+    config.set("AICO", "base_url", "")  # 默认为空，使用 AiHubMix 官方接口
 
     config.add_section("Thread")
     config.set("Thread", "thread_count", "1")
 
+    config.add_section("Engine")
+    config.set("Engine", "mode", "thread")  # thread: 多线程引擎；async: 异步引擎；process: 多进程引擎
+    config.set("Engine", "async_concurrency", "100")  # 异步引擎的最大并发请求数（多进程时为所有进程合计）
+    config.set("Engine", "processes", "0")  # 多进程引擎的进程数，0 表示与 CPU 核数相同
+    config.set("Engine", "process_engine", "async")  # 每个进程内使用的引擎：async 或 thread
+
+    config.add_section("RateLimit")
+    config.set("RateLimit", "requests_per_minute", "0")  # 0 表示未知，首次遇到 429 后自动适应
+    config.set("RateLimit", "tokens_per_minute", "0")
+
+    config.add_section("Retry")
+    config.set("Retry", "max_retries", "3")  # 网络错误、5xx、429 的最大重试次数
+    config.set("Retry", "base_delay", "1")  # 指数退避的初始等待秒数
+    config.set("Retry", "max_delay", "60")
+    config.set("Retry", "breaker_threshold", "5")  # 连续失败多少次后暂停所有线程
+    config.set("Retry", "breaker_timeout", "30")  # 暂停多少秒后探测服务是否恢复
+
+    config.add_section("Jobs")
+    config.set("Jobs", "lease_seconds", "900")  # 领取的数据超过该时间未完成（如程序崩溃）时重新分配
+    config.set("Jobs", "max_attempts", "3")  # 失败多少次后移入失败列表
+
+    config.add_section("Coordinator")
+    config.set("Coordinator", "host", "127.0.0.1")  # 多节点编码时协调服务监听的地址，允许其他机器连接时设为 0.0.0.0
+    config.set("Coordinator", "port", "8765")
+    config.set("Coordinator", "token", "")  # 节点访问协调服务的令牌，为空时不校验
+    config.set("Coordinator", "max_lease", "100")  # 每个节点一次最多领取的数据条数
+
+    config.add_section("Cache")
+    config.set("Cache", "bypass", "False")  # 为 True 时不读取缓存（仍会写入新的结果）
+    config.set("Cache", "max_size_mb", "512")
+    config.set("Cache", "max_age_days", "30")
+
+    config.add_section("Prompt")
+    config.set("Prompt", "pack_token_budget", str(DEFAULT_PACK_TOKEN_BUDGET))  # 同一话题的回帖线程合并到一个请求的 token 上限，0 表示不合并
+    config.set("Prompt", "max_prompt_tokens", "32000")  # 超过该值的提示语在发送前拆分，0 表示只在服务端报错时拆分
+
+    config.add_section("Pricing")
+    config.set("Pricing", "input_per_million", "0")  # 每百万输入 token 的价格，0 表示不估算费用
+    config.set("Pricing", "output_per_million", "0")
+
+    config.add_section("Network")
+    config.set("Network", "gzip_request", "False")  # 是否压缩较大的请求体
+
+    config.add_section("Log")
+    config.set("Log", "level", "INFO")  # DEBUG 时记录每条数据的编码结果
+    config.set("Log", "format", "text")  # text: 纯文本；json: 每行一条 JSON，带 run_id 和 item_id
+    config.set("Log", "max_size_mb", "10")  # 日志文件超过该大小后轮换
+    config.set("Log", "backup_count", "5")  # 保留的旧日志文件数
+
     config.add_section("Counter")
     config.set("Counter", "open_times", "0")
     config.set("Counter", "analysis_times", "0")
@@ -105,15 +167,174 @@ def oldConfigCheck():
         config = readConfig()
         config.set("Counter", "open_times", open_times)
         config.set("Counter", "analysis_times", analysis_times)
-        with open(config_file, "w", encoding="utf-8") as content:
-            config.write(content)
+        writeConfig(config)
+
+
+# 合并写入的等待时间（秒），期间的多次修改只写一次文件
+CONFIG_WRITE_DELAY = 2.0
+
+_config_store = None
+_config_store_lock = threading.Lock()
+
+
+def copyConfig(config):
+    copied = configparser.ConfigParser()
+    copied.read_dict(config)
+    return copied
+
+
+class ConfigStore:
+    """进程内共享的配置：只在配置文件的修改时间或大小变化时重新读取
+
+    update() 先修改内存中的配置，等待 CONFIG_WRITE_DELAY 秒后合并写入文件；
+    配置变化（本进程修改或其他程序修改了文件）时调用 subscribe() 注册的回调，参数为新的配置。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.config = None
+        self.stamp = None
+        self.pending = {}
+        self.timer = None
+        self.listeners = []
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            initConfig(self.path)
+            stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _reload(self):
+        """文件有变化时重新读取，返回是否重新读取了"""
+        stamp = self._stat()
+        if stamp == self.stamp and self.config is not None:
+            return False
+        config = configparser.ConfigParser()
+        config.read(self.path, encoding="utf-8")
+        # 尚未写入文件的修改不能被覆盖
+        for (section, option), value in self.pending.items():
+            if not config.has_section(section):
+                config.add_section(section)
+            config.set(section, option, value)
+        self.config = config
+        self.stamp = stamp
+        return True
+
+    def get(self):
+        """返回共享的配置对象，只读；需要修改时使用 read() 的副本或 update()"""
+        with self.lock:
+            changed = self.stamp is not None and self._reload()
+            if self.config is None:
+                self._reload()
+            config = self.config
+        if changed:
+            self._notify(config)
+        return config
+
+    def read(self):
+        """返回配置的副本，可以自由修改"""
+        return copyConfig(self.get())
+
+    def update(self, section, option, value, delay=CONFIG_WRITE_DELAY):
+        with self.lock:
+            self.get()
+            if not self.config.has_section(section):
+                self.config.add_section(section)
+            self.config.set(section, option, value)
+            self.pending[(section, option)] = value
+            if self.timer is None:
+                self.timer = threading.Timer(delay, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+            config = self.config
+        self._notify(config)
+
+    def write(self, config):
+        """用完整的配置替换当前配置并立即写入文件"""
+        with self.lock:
+            self.config = copyConfig(config)
+            self.pending.clear()
+            self._write()
+            config = self.config
+        self._notify(config)
+
+    def flush(self):
+        """立即写入尚未写入的修改"""
+        with self.lock:
+            if self.pending:
+                self._write()
+
+    def _write(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        # 先写入临时文件再替换，其他进程不会读到写了一半的配置
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as content:
+            self.config.write(content)
+        os.replace(temp_path, self.path)
+        self.pending.clear()
+        self.stamp = self._stat()
+
+    def subscribe(self, callback):
+        """注册配置变化的回调 callback(config)
+
+        回调在触发变化的线程中同步执行：调用 update()/write() 的线程，或在 get() 中发现配置文件被修改的线程
+        （可能是编码工作线程）。回调应当很快返回；需要修改界面时，通过 Qt 信号转到界面线程处理。
+        """
+        with self.lock:
+            self.listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def _notify(self, config):
+        with self.lock:
+            listeners = list(self.listeners)
+        for callback in listeners:
+            callback(config)
+
+
+def getConfigStore():
+    global _config_store
+    with _config_store_lock:
+        if _config_store is None:
+            _config_store = ConfigStore(configFile())
+            # 退出前写入合并等待中的修改
+            atexit.register(_config_store.flush)
+        return _config_store
+
+
+# 读取配置（副本，可以修改后交给 writeConfig 保存）
+def readConfig():
+    return getConfigStore().read()
 
 
-# 读取配置
-def readConfig():
-    config = configparser.ConfigParser()
-    config_file = configFile()
+def getConfig():
+    """共享的只读配置，适合频繁读取的地方；文件变化后自动重新读取"""
+    return getConfigStore().get()
+
+
+def updateConfig(section, option, value):
+    """修改单个配置项，稍后与其他修改合并写入文件"""
+    getConfigStore().update(section, option, value)
+
+
+def writeConfig(config):
+    """保存完整的配置并立即写入文件"""
+    getConfigStore().write(config)
+
+
+def onConfigChanged(callback):
+    """注册配置变化的回调，参数为新的配置（只读）；回调可能在任意线程中执行，见 ConfigStore.subscribe"""
+    getConfigStore().subscribe(callback)
 
-    config.read(config_file, encoding="utf-8")
 
-    return config
+def offConfigChanged(callback):
+    """取消 onConfigChanged 注册的回调"""
+    getConfigStore().unsubscribe(callback)
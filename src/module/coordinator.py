@@ -0,0 +1,383 @@
+import os
+import json
+import hmac
+import time
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import arrow
+import requests
+from src.module.config import readConfig
+from src.module.dbwriter import DBWriter
+from src.module.jobs import createJobQueue
+from src.module.ratelimit import getRateLimiter
+from src.module.planner import getLatencyRecorder, saveLatencySamples
+from src.module.coding import count_status, run_workers, db_error_notifier, close_db_writer, language
+
+# 远程调用失败时的重试次数和间隔（秒）
+CLIENT_RETRIES = 5
+CLIENT_RETRY_DELAY = 2.0
+
+# 超过该时间（秒）没有请求的节点不再计入在线节点
+WORKER_TIMEOUT = 120
+
+# 每个节点一次最多领取的数据条数（配置中没有 Coordinator/max_lease 时使用）
+DEFAULT_MAX_LEASE = 100
+
+
+def getCoordinatorConfig():
+    """读取协调服务的地址和访问令牌"""
+    config = readConfig()
+    return (config.get("Coordinator", "host", fallback="127.0.0.1"),
+            config.getint("Coordinator", "port", fallback=8765),
+            config.get("Coordinator", "token", fallback=""))
+
+
+class CoordinatorError(Exception):
+    """无法连接协调服务或协调服务返回错误"""
+
+
+class BadRequest(Exception):
+    """节点发送的请求参数不合法，协调服务返回 400"""
+
+
+def intField(payload, name, default, minimum=0):
+    """读取请求中的整数参数，不是整数或小于 minimum 时抛出 BadRequest"""
+    value = payload.get(name, default)
+    if value is None:
+        return default
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value) or value < minimum:
+        raise BadRequest(f"invalid {name}: {value!r}")
+    return int(value)
+
+
+class Coordinator:
+    """协调服务：持有项目数据库，按租约分配数据、接收结果，并为所有节点执行统一的限流
+
+    数据分配直接使用 JobQueue（节点崩溃后租约到期自动回收），结果由唯一的 DBWriter 批量写入，
+    所有节点共用同一个 AdaptiveRateLimiter，因此各节点合计的请求速率不超过配置的上限。
+    """
+
+    def __init__(self, db_path, token="", max_lease=None):
+        self.db_path = db_path
+        self.token = token
+        if max_lease is None:
+            max_lease = readConfig().getint("Coordinator", "max_lease", fallback=DEFAULT_MAX_LEASE)
+        # 限制单次领取的条数，避免一个节点领走全部数据
+        self.max_lease = max(max_lease, 1)
+        self.job_queue = createJobQueue(db_path)
+        self.db_writer = DBWriter(db_path)
+        self.rate_limiter = getRateLimiter()
+        self.lock = threading.Lock()
+        self.workers = {}
+
+    def authorized(self, header):
+        if not self.token:
+            return True
+        return hmac.compare_digest(header or "", f"Bearer {self.token}")
+
+    def seen(self, worker):
+        with self.lock:
+            self.workers[worker or "unknown"] = time.time()
+
+    def lease(self, payload):
+        # 关闭过程中任务表已关闭时没有数据可领取
+        size = min(intField(payload, 'size', 1, minimum=1), self.max_lease)
+        jobs = self.job_queue.claim(size) or []
+        return {'jobs': [list(job) for job in jobs]}
+
+    def complete(self, payload):
+        results = payload.get('results', [])
+        for prompt_code, prompt_code_orign, prompt_id in results:
+            self.db_writer.submit(prompt_code, prompt_code_orign, prompt_id)
+        return {'accepted': len(results)}
+
+    def fail(self, payload):
+        return {'dead': self.job_queue.fail(payload['id'], payload.get('error'))}
+
+    def release(self, payload):
+        self.job_queue.release(payload.get('ids', []))
+        return {}
+
+    def reserve(self, payload):
+        return {'wait': self.rate_limiter.reserve(intField(payload, 'tokens', 0))}
+
+    def success(self, payload):
+        self.rate_limiter.on_success(payload.get('reserved') or 0, payload.get('used'))
+        return {}
+
+    def limited(self, payload):
+        self.rate_limiter.on_rate_limited(payload.get('retry_after'))
+        return {}
+
+    def latency(self, payload):
+        saveLatencySamples(self.db_path, [tuple(sample) for sample in payload.get('samples', [])])
+        return {}
+
+    def status(self, payload=None):
+        # 先写入已收到的结果，使统计与各节点看到的一致
+        self.db_writer.flush()
+        now = time.time()
+        with self.lock:
+            workers = sorted(worker for worker, last_seen in self.workers.items() if now - last_seen < WORKER_TIMEOUT)
+        return {
+            'available': self.job_queue.available(),
+            'counts': count_status(self.db_path),
+            'workers': workers,
+            'rate_limit': self.rate_limiter.stats(),
+        }
+
+    def close(self):
+        """写完已收到的结果；仍有结果未能写入时抛出 ResultWriteError"""
+        try:
+            self.db_writer.close()
+        finally:
+            self.job_queue.close()
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    """把 POST /<endpoint> 的 JSON 请求分发到 Coordinator 的同名方法"""
+
+    ENDPOINTS = ('lease', 'complete', 'fail', 'release', 'reserve', 'success', 'limited', 'latency', 'status')
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        coordinator = self.server.coordinator
+        endpoint = self.path.strip('/')
+        if not coordinator.authorized(self.headers.get('Authorization')):
+            return self._reply(401, {'error': 'unauthorized'})
+        if endpoint not in self.ENDPOINTS:
+            return self._reply(404, {'error': f'unknown endpoint: {endpoint}'})
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            return self._reply(400, {'error': f'invalid request body: {e}'})
+        if not isinstance(payload, dict):
+            return self._reply(400, {'error': 'request body must be a JSON object'})
+        try:
+            coordinator.seen(self.headers.get('X-AICO-Worker'))
+            self._reply(200, getattr(coordinator, endpoint)(payload))
+        except BadRequest as e:
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            self._reply(500, {'error': str(e)})
+
+    def _reply(self, status_code, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def createCoordinatorServer(db_path, host, port, token="", max_lease=None):
+    """创建协调服务（尚未开始监听请求），调用 serve_forever() 运行，shutdown() 后需调用 coordinator.close()"""
+    server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+    server.daemon_threads = True
+    server.coordinator = Coordinator(db_path, token, max_lease)
+    return server
+
+
+class CoordinatorClient:
+    """连接协调服务的 HTTP 客户端，网络错误时按固定间隔重试"""
+
+    def __init__(self, url, token="", worker=None, stop_event=None):
+        self.url = url.rstrip('/')
+        self.worker = worker or f"{socket.gethostname()}-{os.getpid()}"
+        self.stop_event = stop_event
+        self.session = requests.Session()
+        self.session.headers.update({'X-AICO-Worker': self.worker})
+        if token:
+            self.session.headers.update({'Authorization': f'Bearer {token}'})
+
+    def call(self, endpoint, **payload):
+        error = None
+        for attempt in range(CLIENT_RETRIES):
+            if attempt:
+                if self.stop_event is not None and self.stop_event.wait(CLIENT_RETRY_DELAY):
+                    break
+                if self.stop_event is None:
+                    time.sleep(CLIENT_RETRY_DELAY)
+            try:
+                response = self.session.post(f"{self.url}/{endpoint}", json=payload, timeout=(5, 60))
+            except requests.exceptions.RequestException as e:
+                error = e
+                continue
+            if response.status_code == 200:
+                return response.json()
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            if response.status_code < 500:
+                break
+        raise CoordinatorError(f"{endpoint}: {error}")
+
+
+class RemoteJobQueue:
+    """与 JobQueue 接口相同，通过协调服务领取和归还数据"""
+
+    def __init__(self, client, on_error=None):
+        self.client = client
+        self.on_error = on_error
+
+    def _call(self, endpoint, default=None, **payload):
+        try:
+            return self.client.call(endpoint, **payload)
+        except CoordinatorError as e:
+            # 归还或记录失败未送达时，由协调服务在租约到期后回收
+            if self.on_error is not None:
+                self.on_error(e)
+            return default
+
+    def claim(self, limit):
+        if limit <= 0:
+            return []
+        result = self._call('lease', {'jobs': []}, size=limit)
+        return [tuple(job) for job in result['jobs']]
+
+    def release(self, prompt_ids):
+        prompt_ids = list(prompt_ids)
+        if prompt_ids:
+            self._call('release', ids=prompt_ids)
+
+    def fail(self, prompt_id, error=None):
+        result = self._call('fail', {'dead': False}, id=prompt_id, error=str(error) if error else None)
+        return result['dead']
+
+    def available(self):
+        return self.client.call('status')['available']
+
+    def close(self):
+        pass
+
+
+class RemoteResultWriter(DBWriter):
+    """与 DBWriter 相同的批量提交，写入目标换成协调服务"""
+
+    def __init__(self, client, on_error=None):
+        self.client = client
+        super().__init__(None, on_error=on_error)
+
+    def _connect(self):
+        return None
+
+    def _disconnect(self):
+        pass
+
+    def _write(self, batch):
+        # 协调服务不可用时抛出 CoordinatorError，结果保留在本节点，由 DBWriter 稍后重试
+        self.client.call('complete', results=[(code, orign, prompt_id) for code, orign, _, prompt_id in batch])
+        return len(batch)
+
+
+class RemoteRateLimiter:
+    """与 AdaptiveRateLimiter 接口相同，由协调服务统一分配所有节点的配额"""
+
+    def __init__(self, client):
+        self.client = client
+        self.rate_limited_count = 0
+
+    def reserve(self, tokens=0, stop_event=None):
+        """向协调服务申请配额，返回需要等待的秒数；收到停止信号时返回 None
+
+        协调服务不可用时不能绕过全局配额，按 CLIENT_RETRY_DELAY 的间隔一直重试。
+        """
+        stop_event = stop_event or self.client.stop_event
+        while True:
+            try:
+                return self.client.call('reserve', tokens=tokens)['wait']
+            except CoordinatorError:
+                if self._wait(CLIENT_RETRY_DELAY, stop_event):
+                    return None
+
+    def acquire(self, tokens=0, stop_event=None):
+        wait = self.reserve(tokens, stop_event)
+        if wait is None:
+            return False
+        return not self._wait(wait, stop_event)
+
+    @staticmethod
+    def _wait(seconds, stop_event):
+        """可被停止信号打断的等待，被打断时返回 True"""
+        if stop_event is not None:
+            return stop_event.wait(seconds)
+        time.sleep(seconds)
+        return False
+
+    def on_success(self, reserved_tokens=0, used_tokens=None):
+        try:
+            self.client.call('success', reserved=reserved_tokens, used=used_tokens)
+        except CoordinatorError:
+            pass
+
+    def on_rate_limited(self, retry_after=None):
+        self.rate_limited_count += 1
+        try:
+            self.client.call('limited', retry_after=retry_after)
+        except CoordinatorError:
+            pass
+
+    def stats(self):
+        try:
+            stats = dict(self.client.call('status')['rate_limit'])
+        except CoordinatorError:
+            stats = {'current_rpm': None, 'current_tpm': None}
+        stats['rate_limited_count'] = self.rate_limited_count
+        return stats
+
+
+def coordinator_notifier(output_signal):
+    def notify(error):
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        if language == "Chinese":
+            output_signal.emit(f"[警告] [{timestamp}] 协调服务请求失败: {error}")
+        else:
+            output_signal.emit(f"[Warning] [{timestamp}] Coordinator request failed: {error}")
+    return notify
+
+
+def run_remote_coding(stop_event, output_signal, url, THREAD_COUNT, LIMIT=-1, token=""):
+    """远程节点：使用 coding.py 中的工作线程编码，数据、结果和限流配额都来自协调服务"""
+    client = CoordinatorClient(url, token, stop_event=stop_event)
+    job_queue = RemoteJobQueue(client, on_error=coordinator_notifier(output_signal))
+    try:
+        total = job_queue.available()
+    except CoordinatorError as e:
+        coordinator_notifier(output_signal)(e)
+        return
+    if LIMIT >= 0:
+        total = min(total, LIMIT)
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if not total:
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{timestamp}] 没有需要处理的数据")
+        else:
+            output_signal.emit(f"[Notice] [{timestamp}] No data to process")
+        return
+    if language == "Chinese":
+        output_signal.emit(f"[提示] [{timestamp}] [远程节点] {client.worker} 已连接 {client.url}，{THREAD_COUNT} 个线程")
+    else:
+        output_signal.emit(f"[Notice] [{timestamp}] [Remote worker] {client.worker} connected to {client.url}, {THREAD_COUNT} threads")
+
+    db_writer = RemoteResultWriter(client, on_error=db_error_notifier(output_signal))
+    rate_limiter = RemoteRateLimiter(client)
+    run_workers(stop_event, output_signal, job_queue, db_writer, rate_limiter, THREAD_COUNT, LIMIT, total, "")
+    close_db_writer(db_writer, output_signal)
+
+    # 请求耗时交给协调服务保存，用于预估
+    try:
+        client.call('latency', samples=getLatencyRecorder().drain())
+        status = client.call('status')
+    except CoordinatorError as e:
+        coordinator_notifier(output_signal)(e)
+        return
+    if not stop_event.is_set():
+        timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+        counts = ", ".join(f"{key}: {value}" for key, value in sorted(status['counts'].items()))
+        if language == "Chinese":
+            output_signal.emit(f"[提示] [{timestamp}] [编码统计]：本节点写入 {db_writer.written} 项；全部数据 {counts}；在线节点 {len(status['workers'])} 个")
+        else:
+            output_signal.emit(f"[Notice] [{timestamp}] [Coding statistics]: {db_writer.written} items from this worker; all items {counts}; {len(status['workers'])} workers online")
@@ -0,0 +1,187 @@
+import time
+import atexit
+import sqlite3
+import threading
+from queue import Queue, Empty
+from src.module.localDB import tuneConnection, PROMPT_DONE, PROMPT_LEASED, NEXT_CODED_SEQ
+from src.module.logger import getLogger
+
+# 提交方式：攒够 BATCH_SIZE 条或距第一条超过 FLUSH_INTERVAL 秒时提交一次事务
+BATCH_SIZE = 50
+FLUSH_INTERVAL = 1.0
+
+# 数据库被占用时的重试次数
+WRITE_RETRIES = 3
+
+# 一批结果写入失败后保留在内存中，按该间隔（秒）重试，每次失败加倍，最长 RETRY_MAX_INTERVAL
+RETRY_INTERVAL = 1.0
+RETRY_MAX_INTERVAL = 30.0
+
+_FLUSH = object()
+_STOP = object()
+
+
+class ResultWriteError(Exception):
+    """关闭写入线程时仍有编码结果未能写入，results 为未写入的 (prompt_code, prompt_code_orign, status, prompt_id)"""
+
+    def __init__(self, message, results):
+        self.results = results
+        super().__init__(message)
+
+
+class DBWriter:
+    """唯一的数据库写入线程：从队列中取出编码结果，按数量或时间批量提交
+
+    - 所有工作线程（以及异步任务）只向队列提交结果，不再各自打开连接
+    - flush() 等待已提交的结果全部落盘；close() 在停止或退出时写完剩余结果
+    - 写入失败的结果不会丢弃，一直重试到 close()，仍未写入时 close() 抛出 ResultWriteError
+    """
+
+    def __init__(self, db_path, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL, on_error=None):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.on_error = on_error
+        self.queue = Queue()
+        self.lock = threading.Lock()
+        self.conn_lock = threading.Lock()
+        self.closed = False
+        self.written = 0
+        self.skipped = 0
+        self.unwritten = []
+        self.conn = None
+        self.thread = threading.Thread(target=self._run, name="aico-db-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, prompt_code, prompt_code_orign, prompt_id):
+        """提交一条编码结果，立即返回"""
+        with self.lock:
+            if not self.closed:
+                self.queue.put((prompt_code, prompt_code_orign, PROMPT_DONE, prompt_id))
+                return
+        # 写入线程已退出（停止后仍有请求返回），直接写入
+        batch = [(prompt_code, prompt_code_orign, PROMPT_DONE, prompt_id)]
+        try:
+            if not self._commit(batch):
+                raise ResultWriteError(f"编码结果未能写入: {prompt_id}", batch)
+        finally:
+            self._disconnect()
+
+    def flush(self):
+        """阻塞直到此前提交的结果都尝试写入一次，返回是否已全部写入"""
+        with self.lock:
+            if self.closed:
+                return not self.unwritten
+            done = threading.Event()
+            self.queue.put((_FLUSH, done))
+        done.wait()
+        return not self.unwritten
+
+    def close(self):
+        """写完队列中剩余的结果并关闭连接，可重复调用；仍有结果未能写入时抛出 ResultWriteError"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.put(_STOP)
+        self.thread.join()
+        atexit.unregister(self.close)
+        if self.unwritten:
+            raise ResultWriteError(f"{len(self.unwritten)} 条编码结果未能写入", list(self.unwritten))
+
+    def _connect(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            tuneConnection(self.conn)
+        return self.conn
+
+    def _disconnect(self):
+        with self.conn_lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _write(self, batch):
+        """在一个事务中写入一批结果，返回写入的条数；数据库被占用时短暂重试，仍失败时抛出异常
+
+        只更新仍处于租约中的数据：租约过期后已被其他工作线程重新领取或完成的数据不会被迟到的结果覆盖，
+        coded_seq 也不会再次增加（否则增量导出会重复导出）。
+        """
+        for attempt in range(WRITE_RETRIES + 1):
+            try:
+                with self.conn_lock:
+                    conn = self._connect()
+                    with conn:
+                        updated = conn.executemany(
+                            'UPDATE prompt SET prompt_code = ?, prompt_code_orign = ?, status = ?, lease_expires = NULL, '
+                            f'coded_seq = {NEXT_CODED_SEQ} WHERE "index" = ? AND status = ?',
+                            [item + (PROMPT_LEASED,) for item in batch]
+                        ).rowcount
+                if updated < len(batch):
+                    self.skipped += len(batch) - updated
+                    getLogger("dbwriter").warning(f"{len(batch) - updated} 条编码结果对应的数据已不在租约中，未写入")
+                return updated
+            except sqlite3.OperationalError:
+                if attempt == WRITE_RETRIES:
+                    raise
+                time.sleep(0.2 * (attempt + 1))
+
+    def _commit(self, batch):
+        """写入一批结果，返回是否成功；失败时报告错误，结果由调用方保留"""
+        try:
+            written = self._write(batch)
+        except Exception as e:
+            self._report(e)
+            return False
+        self.written += written
+        return True
+
+    def _report(self, error):
+        if self.on_error is not None:
+            self.on_error(error)
+        else:
+            getLogger("dbwriter").error(f"数据库更新失败: {str(error)}")
+
+    def _run(self):
+        batch = []
+        waiters = []
+        deadline = None
+        retry_at = None
+        failures = 0
+        stopping = False
+        while not stopping:
+            wake_at = deadline if retry_at is None else max(deadline, retry_at)
+            timeout = None if wake_at is None else max(wake_at - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except Empty:
+                item = None
+
+            if item is _STOP:
+                stopping = True
+            elif isinstance(item, tuple) and item[0] is _FLUSH:
+                waiters.append(item[1])
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            # 上次写入失败时，等到重试时间（或收到停止信号）再连同新结果一起写入
+            now = time.monotonic()
+            due = bool(batch) and (stopping or waiters or len(batch) >= self.batch_size or now >= deadline)
+            if due and (stopping or retry_at is None or now >= retry_at):
+                if self._commit(batch):
+                    batch = []
+                    deadline = None
+                    retry_at = None
+                    failures = 0
+                else:
+                    failures += 1
+                    retry_at = time.monotonic() + min(RETRY_INTERVAL * 2 ** (failures - 1), RETRY_MAX_INTERVAL)
+                self.unwritten = list(batch)
+            for waiter in waiters:
+                waiter.set()
+            waiters = []
+
+        self._disconnect()
@@ -0,0 +1,404 @@
+import os
+import json
+import time
+import arrow
+import numpy as np
+import pandas as pd
+from src.function import log
+from src.module.localDB import PROMPT_DONE
+
+# orjson 解析速度更快，未安装时使用标准库
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_ERRORS = (orjson.JSONDecodeError, ValueError)
+except ImportError:
+    orjson = None
+    loads = json.loads
+    JSON_ERRORS = (ValueError,)
+
+# 编码表中没有合适的标签时模型输出的标签，单独保留一列
+NULL_CODE = "NULL"
+
+# 分批导出时每批读取的行数，导出占用的内存只与这个值有关
+EXPORT_CHUNK_SIZE = 5000
+
+# 支持的导出格式及对应的扩展名；Parquet / Feather 需要安装 pyarrow
+EXPORT_FORMATS = {'csv': '.csv', 'jsonl': '.jsonl', 'parquet': '.parquet', 'feather': '.feather'}
+EXPORT_COMPRESSION = 'zstd'
+
+# 增量导出的检查点名称（export_checkpoint 表中的一行）
+CHECKPOINT_NAME = 'coding_result'
+
+# 读取编码结果占总进度的百分比，其余为写入回帖
+STAGE_PROGRESS = 40
+
+
+def flattenCodingResults(prompt_codes):
+    """把各条提示语的 JSON 结果展开为 (reply_id, code) 和 (reply_id, reason) 两张表，返回 (编码表, 理由表, 失败条数)
+
+    单条提示语的结果解析失败时整条丢弃，不会只写入其中一部分。
+    """
+    code_reply_ids, codes, reason_reply_ids, reasons = [], [], [], []
+    fail_count = 0
+    for prompt_code in prompt_codes:
+        if prompt_code is None or prompt_code == 'None':
+            continue
+        try:
+            prompt_reply_ids, prompt_codes_flat, prompt_reason_ids, prompt_reasons = [], [], [], []
+            for code_response in loads(prompt_code):
+                reply_id = int(code_response['reply_id'])
+                tags = code_response['tags']
+                if not tags:
+                    continue
+                prompt_reply_ids.extend([reply_id] * len(tags))
+                prompt_codes_flat.extend(str(tag) for tag in tags)
+                prompt_reason_ids.append(reply_id)
+                prompt_reasons.append(" | ".join(code_response['reason']))
+        except JSON_ERRORS + (KeyError, TypeError) as e:
+            log(f"编码结果解析失败: {e}")
+            fail_count += 1
+            continue
+        code_reply_ids.extend(prompt_reply_ids)
+        codes.extend(prompt_codes_flat)
+        reason_reply_ids.extend(prompt_reason_ids)
+        reasons.extend(prompt_reasons)
+
+    codes_df = pd.DataFrame({'reply_id': code_reply_ids, 'code': codes})
+    reasons_df = pd.DataFrame({'reply_id': reason_reply_ids, 'reason': reasons})
+    return codes_df, reasons_df, fail_count
+
+
+def codeColumns(scheme_codes, has_null):
+    """导出结果中的编码列：编码表中的编码，出现 NULL 标签时再加一列"""
+    columns = list(dict.fromkeys(str(code) for code in scheme_codes))
+    if NULL_CODE not in columns and has_null:
+        columns.append(NULL_CODE)
+    return columns
+
+
+def buildCodingMatrix(reply_df, codes_df, reasons_df, scheme_codes, columns=None, report_unknown=True):
+    """按编码表把 (reply_id, code) 一次性写入回帖表的多热编码列，返回 (回帖表, 写入的编码数)
+
+    已编码的回帖在每个编码列中为 1 或 0，未编码的回帖保持为空；编码表之外的标签不生成新列。
+    分批导出时由调用方传入固定的 columns，各批的列保持一致。
+    """
+    if columns is None:
+        columns = codeColumns(scheme_codes, (codes_df['code'] == NULL_CODE).any())
+
+    # reply_id 对应的行号（重复的 reply_id 取第一行），结果中不存在的回帖不会新增行
+    positions = pd.Series(np.arange(len(reply_df)), index=reply_df['reply_id'].to_numpy())
+    positions = positions[~positions.index.duplicated()]
+    rows = positions.reindex(codes_df['reply_id'].to_numpy()).to_numpy()
+    cols = pd.Index(columns).get_indexer(codes_df['code'])
+
+    unknown_replies = int(np.isnan(rows).sum()) if len(rows) else 0
+    unknown_codes = codes_df.loc[cols < 0, 'code']
+    if report_unknown:
+        reportUnknown(unknown_replies, unknown_codes.value_counts())
+
+    known = ~np.isnan(rows)
+    coded_rows = np.unique(rows[known].astype(np.intp))
+    valid = known & (cols >= 0)
+    matrix = np.zeros((len(reply_df), len(columns)), dtype=np.int8)
+    matrix[rows[valid].astype(np.intp), cols[valid]] = 1
+
+    for index, column in enumerate(columns):
+        values = reply_df[column].to_numpy(dtype=object, copy=True) if column in reply_df else np.full(len(reply_df), '', dtype=object)
+        values[coded_rows] = matrix[coded_rows, index]
+        reply_df[column] = values
+
+    # 同一回帖有多条理由时保留最后一条
+    reasons_df = reasons_df.drop_duplicates('reply_id', keep='last')
+    reason_rows = positions.reindex(reasons_df['reply_id'].to_numpy()).to_numpy()
+    reason_known = ~np.isnan(reason_rows)
+    if 'reason' not in reply_df:
+        reply_df['reason'] = np.nan
+    reason_values = reply_df['reason'].to_numpy(dtype=object, copy=True)
+    reason_values[reason_rows[reason_known].astype(np.intp)] = reasons_df['reason'].to_numpy()[reason_known]
+    reply_df['reason'] = reason_values
+    return reply_df, int(valid.sum())
+
+
+def reportUnknown(unknown_replies, unknown_code_counts):
+    """记录被忽略的标签：对应的回帖不存在，或不在编码表中（unknown_code_counts 为按次数降序的 Series）"""
+    if unknown_replies:
+        log(f"编码结果中有 {unknown_replies} 个标签对应的回帖不存在，已忽略")
+    if unknown_code_counts.sum():
+        log(f"编码结果中有 {int(unknown_code_counts.sum())} 个标签不在编码表中，已忽略：{', '.join(unknown_code_counts.index[:10])}")
+
+
+def exportFormat(save_path, export_format=None):
+    """导出格式：指定时直接使用，否则按文件扩展名判断，无法判断时为 CSV"""
+    if export_format is None:
+        extension = os.path.splitext(save_path)[1].lower()
+        export_format = next((name for name, ext in EXPORT_FORMATS.items() if ext == extension), 'csv')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式: {export_format}")
+    return export_format
+
+
+def exportFilePath(save_path, export_format):
+    """把默认导出路径的扩展名换成对应格式的扩展名"""
+    return os.path.splitext(save_path)[0] + EXPORT_FORMATS[export_format]
+
+
+def createExportCheckpointTable(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS export_checkpoint (name TEXT PRIMARY KEY, coded_seq INTEGER, exported_at REAL)")
+
+
+def readExportCheckpoint(conn):
+    """上次导出时已包含的最大 coded_seq，没有导出过时返回 None"""
+    createExportCheckpointTable(conn)
+    row = conn.execute("SELECT coded_seq FROM export_checkpoint WHERE name = ?", (CHECKPOINT_NAME,)).fetchone()
+    return None if row is None else row[0]
+
+
+def saveExportCheckpoint(conn, coded_seq):
+    with conn:
+        createExportCheckpointTable(conn)
+        conn.execute("INSERT OR REPLACE INTO export_checkpoint (name, coded_seq, exported_at) VALUES (?, ?, ?)",
+                     (CHECKPOINT_NAME, coded_seq, time.time()))
+
+
+def stageCodingResults(conn, since_seq, chunk_size, progress):
+    """分批读取已编码的提示语，把展开后的编码和理由写入临时表，返回 (读取到的最大 coded_seq, 失败条数)
+
+    临时表由 SQLite 管理，数据量再大也不会全部留在内存中；同一回帖有多条理由时保留最后一条。
+    """
+    conn.execute("DROP TABLE IF EXISTS temp.export_codes")
+    conn.execute("DROP TABLE IF EXISTS temp.export_reasons")
+    conn.execute("CREATE TEMP TABLE export_codes (reply_id INTEGER, code TEXT)")
+    conn.execute("CREATE TEMP TABLE export_reasons (reply_id INTEGER PRIMARY KEY, reason TEXT)")
+
+    condition = 'status = ?'
+    params = [PROMPT_DONE]
+    if since_seq is not None:
+        condition += ' AND coded_seq > ?'
+        params.append(since_seq)
+    total = conn.execute(f'SELECT COUNT(*) FROM prompt WHERE {condition}', params).fetchone()[0]
+
+    max_seq = since_seq
+    fail_count = 0
+    last_index = -1
+    staged = 0
+    while True:
+        rows = conn.execute(
+            f'SELECT "index", prompt_code, coded_seq FROM prompt WHERE {condition} AND "index" > ? ORDER BY "index" LIMIT ?',
+            params + [last_index, chunk_size]
+        ).fetchall()
+        if not rows:
+            break
+        last_index = rows[-1][0]
+        seqs = [row[2] for row in rows if row[2] is not None]
+        if seqs:
+            max_seq = max(seqs) if max_seq is None else max(max_seq, max(seqs))
+
+        codes_df, reasons_df, chunk_fail_count = flattenCodingResults(row[1] for row in rows)
+        fail_count += chunk_fail_count
+        conn.executemany("INSERT INTO temp.export_codes VALUES (?, ?)",
+                         zip(codes_df['reply_id'].tolist(), codes_df['code'].tolist()))
+        conn.executemany("INSERT OR REPLACE INTO temp.export_reasons VALUES (?, ?)",
+                         zip(reasons_df['reply_id'].tolist(), reasons_df['reason'].tolist()))
+        staged += len(rows)
+        progress(int(staged * STAGE_PROGRESS / max(total, 1)))
+
+    conn.execute("CREATE INDEX temp.idx_export_codes ON export_codes (reply_id)")
+    return max_seq, fail_count
+
+
+def replyColumnTypes(conn):
+    """回帖表各列在 Parquet / Feather 中的类型，按 SQLite 中声明的类型对应"""
+    column_types = {}
+    for row in conn.execute("PRAGMA table_info(replys)"):
+        declared = (row[2] or '').upper()
+        if 'INT' in declared:
+            column_types[row[1]] = 'int64'
+        elif any(name in declared for name in ('REAL', 'FLOA', 'DOUB')):
+            column_types[row[1]] = 'float64'
+        else:
+            column_types[row[1]] = 'string'
+    return column_types
+
+
+def exportColumns(conn, scheme_codes, has_null):
+    """导出文件的 (各列类型, 编码列)，列的顺序与 buildCodingMatrix 生成的回帖表一致"""
+    column_types = replyColumnTypes(conn)
+    columns = codeColumns(scheme_codes, has_null)
+    for column in columns:
+        column_types[column] = 'int8'
+    column_types['reason'] = 'string'
+    return column_types, columns
+
+
+def typedColumns(chunk_df, column_types):
+    """按列类型转换：未编码的回帖在编码列中为空值，整数列允许空值"""
+    typed = {}
+    for column, column_type in column_types.items():
+        values = chunk_df[column]
+        if column_type == 'string':
+            typed[column] = values.astype('string')
+        elif column_type == 'float64':
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('Float64')
+        else:
+            typed[column] = pd.to_numeric(values, errors='coerce').astype('Int64' if column_type == 'int64' else 'Int8')
+    return pd.DataFrame(typed, index=chunk_df.index)
+
+
+def importArrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("导出 Parquet / Feather 需要安装 pyarrow (pip install pyarrow)") from None
+    return pyarrow
+
+
+class CsvChunkWriter:
+    """与原来的导出结果相同：utf-8-sig 编码，第一列为 reply_id"""
+
+    def __init__(self, path, column_types):
+        self.file = open(path, 'w', encoding='utf-8-sig', newline='')
+        self.columns = list(column_types)
+        pd.DataFrame(columns=self.columns).rename_axis('reply_id').to_csv(self.file)
+
+    def write(self, chunk_df):
+        chunk_df = chunk_df[self.columns].set_axis(chunk_df['reply_id'].to_numpy()).rename_axis('reply_id')
+        chunk_df.to_csv(self.file, header=False)
+
+    def close(self):
+        self.file.close()
+
+
+class JsonLinesChunkWriter:
+    """每个回帖一行 JSON，编码列为 0 / 1，未编码时为 null"""
+
+    def __init__(self, path, column_types):
+        self.file = open(path, 'w', encoding='utf-8')
+        self.column_types = column_types
+
+    def write(self, chunk_df):
+        text = typedColumns(chunk_df, self.column_types).to_json(orient='records', lines=True, force_ascii=False)
+        if text and not text.endswith('\n'):
+            text += '\n'
+        self.file.write(text)
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowChunkWriter:
+    """Parquet / Feather：按列类型写入并压缩，每批数据写为一个 row group / record batch"""
+
+    def __init__(self, path, column_types, export_format):
+        pa = importArrow()
+        self.pa = pa
+        self.schema = pa.schema([(column, pa.type_for_alias(column_type)) for column, column_type in column_types.items()])
+        self.column_types = column_types
+        if export_format == 'parquet':
+            import pyarrow.parquet as pq
+            self.writer = pq.ParquetWriter(path, self.schema, compression=EXPORT_COMPRESSION)
+        else:
+            self.writer = pa.ipc.new_file(path, self.schema, options=pa.ipc.IpcWriteOptions(compression=EXPORT_COMPRESSION))
+
+    def write(self, chunk_df):
+        typed = typedColumns(chunk_df, self.column_types)
+        self.writer.write_table(self.pa.Table.from_pandas(typed, schema=self.schema, preserve_index=False))
+
+    def close(self):
+        self.writer.close()
+
+
+def createChunkWriter(path, column_types, export_format):
+    if export_format == 'csv':
+        return CsvChunkWriter(path, column_types)
+    if export_format == 'jsonl':
+        return JsonLinesChunkWriter(path, column_types)
+    return ArrowChunkWriter(path, column_types, export_format)
+
+
+def exportCodingResult(conn, save_path, progress=None, export_format=None, incremental=False, chunk_size=EXPORT_CHUNK_SIZE):
+    """分批读取编码结果并逐批写入文件，返回 (成功条数, 失败条数)
+
+    内存占用只与 chunk_size 有关。export_format 为 csv / jsonl / parquet / feather，不指定时按扩展名判断；
+    incremental 为 True 时只导出上次导出之后新编码的回帖。先写入临时文件，完成后再替换，
+    导出成功后记录检查点。progress(percent) 为可选的进度回调。
+    """
+    report = progress or (lambda percent: None)
+    export_format = exportFormat(save_path, export_format)
+    if export_format in ('parquet', 'feather'):
+        importArrow()
+    since_seq = readExportCheckpoint(conn) if incremental else None
+    scheme_codes = [row[0] for row in conn.execute('SELECT code FROM coding_scheme')]
+    temp_path = save_path + '.part'
+    try:
+        max_seq, fail_count = stageCodingResults(conn, since_seq, chunk_size, report)
+        has_null = conn.execute("SELECT 1 FROM temp.export_codes WHERE code = ? LIMIT 1", (NULL_CODE,)).fetchone() is not None
+        column_types, columns = exportColumns(conn, scheme_codes, has_null)
+
+        placeholders = ', '.join('?' * len(columns))
+        unknown_replies = conn.execute(
+            "SELECT COUNT(*) FROM temp.export_codes WHERE reply_id NOT IN (SELECT reply_id FROM replys)"
+        ).fetchone()[0]
+        unknown_codes = pd.Series(dict(conn.execute(
+            f"SELECT code, COUNT(*) FROM temp.export_codes WHERE code NOT IN ({placeholders}) GROUP BY code ORDER BY COUNT(*) DESC",
+            columns
+        ).fetchall()), dtype='int64')
+        reportUnknown(unknown_replies, unknown_codes)
+
+        # 增量导出只读取本次有编码结果的回帖（每个有标签的回帖都有一条理由）
+        condition = "reply_id IN (SELECT reply_id FROM temp.export_reasons) AND " if incremental else ""
+        total = conn.execute(f"SELECT COUNT(*) FROM replys WHERE {condition}1").fetchone()[0]
+
+        success_count = 0
+        exported = 0
+        last_rowid = 0
+        writer = createChunkWriter(temp_path, column_types, export_format)
+        try:
+            while True:
+                chunk_df = pd.read_sql(
+                    f"SELECT rowid AS _export_rowid, * FROM replys WHERE {condition}rowid > ? ORDER BY rowid LIMIT ?",
+                    conn, params=(last_rowid, chunk_size)
+                )
+                if chunk_df.empty:
+                    break
+                rowids = chunk_df.pop('_export_rowid')
+                first_rowid, last_rowid = int(rowids.iloc[0]), int(rowids.iloc[-1])
+                codes_df = pd.read_sql(
+                    "SELECT c.reply_id, c.code FROM replys r JOIN temp.export_codes c ON c.reply_id = r.reply_id "
+                    "WHERE r.rowid BETWEEN ? AND ?", conn, params=(first_rowid, last_rowid)
+                )
+                reasons_df = pd.read_sql(
+                    "SELECT e.reply_id, e.reason FROM replys r JOIN temp.export_reasons e ON e.reply_id = r.reply_id "
+                    "WHERE r.rowid BETWEEN ? AND ?", conn, params=(first_rowid, last_rowid)
+                )
+                chunk_df, chunk_success = buildCodingMatrix(chunk_df, codes_df, reasons_df, scheme_codes,
+                                                            columns=columns, report_unknown=False)
+                writer.write(chunk_df)
+                success_count += chunk_success
+                exported += len(chunk_df)
+                report(STAGE_PROGRESS + int(exported * (100 - STAGE_PROGRESS) / max(total, 1)))
+        finally:
+            writer.close()
+        os.replace(temp_path, save_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        conn.execute("DROP TABLE IF EXISTS temp.export_codes")
+        conn.execute("DROP TABLE IF EXISTS temp.export_reasons")
+        conn.commit()
+
+    # 升级前编码的结果没有 coded_seq，记为 0，之后的增量导出只包含新编码的结果
+    saveExportCheckpoint(conn, max_seq or 0)
+    log(f"编码结果导出完成: {exported} 条回帖, 成功: {success_count} 条, 失败: {fail_count} 条")
+    report(100)
+    return success_count, fail_count
+
+
+def exportMessages(success_count, fail_count, save_path, language):
+    """导出结果的日志信息"""
+    timestamp = arrow.now().format("YYYY-MM-DD HH:mm:ss")
+    if language == 'Chinese':
+        return ['[提示] [' + timestamp + "] [编码结果解析成功: {} 条成功, {} 条失败]".format(success_count, fail_count),
+                '[提示] [' + timestamp + "] [导出路径]: {}".format(save_path)]
+    return ["[Notice] [{}] [Coding results parsed successfully: {} succeeded, {} failed]".format(timestamp, success_count, fail_count),
+            "[Notice] [{}] [Export path]: {}".format(timestamp, save_path)]
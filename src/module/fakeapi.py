@@ -0,0 +1,97 @@
+import gzip
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.module.splitting import REPLY_LINE_PATTERN
+from src.module.tokens import estimate_tokens, estimate_messages_tokens
+
+
+class FakeCompletionHandler(BaseHTTPRequestHandler):
+    """兼容 OpenAI 接口的本地测试服务：不调用任何模型，为提示语中的每条回帖返回 NULL 编码
+
+    用于在一台机器上测试多进程、多节点编码和限流，把 AICO/base_url 设为 http://host:port 即可。
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            return self._reply(200, {'data': [{'id': 'fake-model', 'available': True}]})
+        self._reply(404, {'error': {'type': 'not_found', 'message': self.path}})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        # 与开启 Network/gzip_request 的客户端配合使用
+        if self.headers.get('Content-Encoding', '').lower() == 'gzip':
+            try:
+                body = gzip.decompress(body)
+            except OSError:
+                return self._reply(400, {'error': {'type': 'invalid_request', 'message': 'Invalid gzip body'}})
+            self.server.gzip_requests += 1
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._reply(404, {'error': {'type': 'not_found', 'message': self.path}})
+        if not self.server.admit():
+            self.server.rate_limited += 1
+            return self._reply(429, {'error': {'type': 'rate_limit', 'message': 'Too many requests'}}, {'Retry-After': '1'})
+
+        messages = json.loads(body or b'{}').get('messages', [])
+        prompt = messages[-1]['content'] if messages else ''
+        codes = [{'reply_id': reply_id.strip(), 'tags': ['NULL'], 'reason': ['fake']}
+                 for reply_id in REPLY_LINE_PATTERN.findall(prompt)]
+        content = json.dumps(codes, ensure_ascii=False)
+        time.sleep(self.server.latency * random.uniform(0.5, 1.5))
+        self.server.completed += 1
+        self._reply(200, {
+            'id': f'fake-{self.server.completed}',
+            'object': 'chat.completion',
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': estimate_messages_tokens(messages), 'completion_tokens': estimate_tokens(content)},
+        })
+
+    def _reply(self, status_code, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status_code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeCompletionServer(ThreadingHTTPServer):
+    """latency 为平均响应时间（秒），rpm 大于 0 时超过每分钟请求数返回 429"""
+
+    daemon_threads = True
+
+    def __init__(self, host, port, latency=0.5, rpm=0):
+        super().__init__((host, port), FakeCompletionHandler)
+        self.latency = latency
+        self.rpm = rpm
+        self.lock = threading.Lock()
+        self.window = []
+        self.completed = 0
+        self.rate_limited = 0
+        self.gzip_requests = 0
+
+    def admit(self):
+        if self.rpm <= 0:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            self.window = [moment for moment in self.window if now - moment < 60]
+            if len(self.window) >= self.rpm:
+                return False
+            self.window.append(now)
+            return True
@@ -1,5 +1,3 @@
-import requests
-
 from PySide6.QtCore import Qt, QRectF, QByteArray
 from PySide6.QtGui import QPixmap, QPainter, QPainterPath
 from PySide6.QtWidgets import QLabel
@@ -44,6 +42,8 @@ class RoundedWebLabel(QLabel):
         super().__init__()
         self.radius = 8
 
+        # 只有显示网络图片时才需要 requests，不在启动时导入
+        import requests
         response = requests.get(imagePath)
         image_data = QByteArray(response.content)
 
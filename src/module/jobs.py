@@ -0,0 +1,215 @@
+import time
+import sqlite3
+import threading
+from queue import Queue, Empty, Full
+from src.module.config import readConfig
+from src.module.localDB import (tuneConnection, PROMPT_PENDING, PROMPT_LEASED, PROMPT_FAILED)
+
+
+def createJobQueue(db_path, dead_letter=False):
+    """按配置创建任务队列"""
+    config = readConfig()
+    return JobQueue(
+        db_path,
+        lease_seconds=config.getfloat("Jobs", "lease_seconds", fallback=900),
+        max_attempts=config.getint("Jobs", "max_attempts", fallback=3),
+        dead_letter=dead_letter,
+    )
+
+
+class JobQueue:
+    """以 prompt 表作为任务表：领取时加租约，完成后由写入线程标记为 done
+
+    - pending：待处理；leased：已领取，租约到期（进程崩溃或被强制结束）后自动回到 pending
+    - 失败次数达到 max_attempts 后进入 failed（死信），dead_letter=True 时只领取 failed 的数据重新编码
+    """
+
+    def __init__(self, db_path, lease_seconds=900, max_attempts=3, dead_letter=False):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(max_attempts, 1)
+        self.dead_letter = dead_letter
+        self.source_status = PROMPT_FAILED if dead_letter else PROMPT_PENDING
+        self.lock = threading.Lock()
+        self.closed = False
+        self.reclaimed = 0
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        tuneConnection(self.conn)
+
+    def _transaction(self, work):
+        """在一个写事务中执行 work(conn)；关闭后不再写入，未归还的租约到期后自动回收"""
+        with self.lock:
+            if self.closed:
+                return None
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work(self.conn)
+                self.conn.execute("COMMIT")
+                return result
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+
+    def claim(self, limit):
+        """领取最多 limit 条数据并加租约，返回 [(id, prompt_content), ...]"""
+        if limit <= 0:
+            return []
+
+        def work(conn):
+            now = time.time()
+            if not self.dead_letter:
+                # 回收租约已过期的数据
+                self.reclaimed += conn.execute(
+                    "UPDATE prompt SET status = ?, lease_expires = NULL WHERE status = ? AND lease_expires < ?",
+                    (PROMPT_PENDING, PROMPT_LEASED, now)
+                ).rowcount
+            rows = conn.execute(
+                'SELECT "index", prompt_content FROM prompt WHERE status = ? ORDER BY "index" LIMIT ?',
+                (self.source_status, limit)
+            ).fetchall()
+            # 重新编码死信时重新计算失败次数
+            attempts = "1" if self.dead_letter else "attempts + 1"
+            conn.executemany(
+                f'UPDATE prompt SET status = ?, lease_expires = ?, attempts = {attempts} WHERE "index" = ?',
+                [(PROMPT_LEASED, now + self.lease_seconds, row[0]) for row in rows]
+            )
+            return rows
+
+        return self._transaction(work) or []
+
+    def release(self, prompt_ids):
+        """归还未处理（或被中断）的数据，不计入失败次数"""
+        prompt_ids = list(prompt_ids)
+        if not prompt_ids:
+            return
+
+        def work(conn):
+            conn.executemany(
+                'UPDATE prompt SET status = ?, lease_expires = NULL, attempts = MAX(attempts - 1, 0) WHERE "index" = ? AND status = ?',
+                [(self.source_status, prompt_id, PROMPT_LEASED) for prompt_id in prompt_ids]
+            )
+
+        self._transaction(work)
+
+    def fail(self, prompt_id, error=None):
+        """记录一次失败：未达到最大次数时回到待处理，否则进入死信，返回是否进入死信"""
+
+        def work(conn):
+            row = conn.execute('SELECT attempts, status FROM prompt WHERE "index" = ?', (prompt_id,)).fetchone()
+            if row is None or row[1] != PROMPT_LEASED:
+                return False
+            dead = self.dead_letter or row[0] >= self.max_attempts
+            conn.execute(
+                'UPDATE prompt SET status = ?, lease_expires = NULL, last_error = ? WHERE "index" = ?',
+                (PROMPT_FAILED if dead else PROMPT_PENDING, str(error) if error else None, prompt_id)
+            )
+            return dead
+
+        return bool(self._transaction(work))
+
+    def available(self):
+        """当前可以领取的数据条数（含租约已过期的数据），关闭后为 0"""
+        with self.lock:
+            if self.closed:
+                return 0
+            if self.dead_letter:
+                return self.conn.execute("SELECT COUNT(*) FROM prompt WHERE status = ?", (PROMPT_FAILED,)).fetchone()[0]
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM prompt WHERE status = ? OR (status = ? AND lease_expires < ?)",
+                (PROMPT_PENDING, PROMPT_LEASED, time.time())
+            ).fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.conn.close()
+
+
+def requeueFailed(db_path):
+    """把所有死信数据放回待处理，返回条数"""
+    conn = sqlite3.connect(db_path)
+    try:
+        count = conn.execute(
+            "UPDATE prompt SET status = ?, attempts = 0, last_error = NULL WHERE status = ?",
+            (PROMPT_PENDING, PROMPT_FAILED)
+        ).rowcount
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+
+class JobFeeder:
+    """有界预取：后台线程按批领取数据放入容量为 prefetch 的队列，工作线程从队列中取用
+
+    内存中最多只保留 prefetch 条提示语；停止时未被取走的数据归还到任务表。
+    """
+
+    def __init__(self, job_queue, stop_event, prefetch=16, batch_size=8, limit=-1, total=0):
+        self.job_queue = job_queue
+        self.total = total
+        self.stop_event = stop_event
+        self.batch_size = max(min(batch_size, prefetch), 1)
+        self.limit = limit
+        self.buffer = Queue(maxsize=max(prefetch, 1))
+        self.exhausted = threading.Event()
+        self.claimed = 0
+        self.thread = threading.Thread(target=self._run, name="aico-job-feeder", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                size = self.batch_size
+                if self.limit >= 0:
+                    size = min(size, self.limit - self.claimed)
+                records = self.job_queue.claim(size)
+                if not records:
+                    break
+                self.claimed += len(records)
+                for index, record in enumerate(records):
+                    if not self._put(record):
+                        self.job_queue.release(item[0] for item in records[index:])
+                        return
+        finally:
+            self.exhausted.set()
+
+    def _put(self, record):
+        """放入队列，队列已满时等待；收到停止信号时返回 False"""
+        while not self.stop_event.is_set():
+            try:
+                self.buffer.put(record, timeout=0.2)
+                return True
+            except Full:
+                continue
+        return False
+
+    def get(self, timeout=0.1):
+        """取出一条数据；暂时没有数据时返回 None，可通过 done() 判断是否全部取完"""
+        try:
+            return self.buffer.get(timeout=timeout)
+        except Empty:
+            return None
+
+    def done(self):
+        return self.exhausted.is_set() and self.buffer.empty()
+
+    def remaining(self):
+        """尚未开始处理的数据条数（估算）"""
+        return max(self.total - self.claimed, 0) + self.buffer.qsize()
+
+    def drain(self):
+        """停止后归还队列中未处理的数据"""
+        self.thread.join()
+        records = []
+        while True:
+            try:
+                records.append(self.buffer.get_nowait())
+            except Empty:
+                break
+        self.job_queue.release(record[0] for record in records)
+        return len(records)
@@ -1,43 +1,168 @@
-import pandas as pd
+import time
 import sqlite3
 from src.module.config import localDBFilePath
 
+# prompt 表中数据的编码状态
+PROMPT_PENDING = "pending"
+PROMPT_LEASED = "leased"    # 已被工作线程领取，租约到期后自动回到 pending
+PROMPT_DONE = "done"
+PROMPT_FAILED = "failed"    # 多次失败，需要单独重新编码
+
+# 后续版本为 prompt 表增加的列
+PROMPT_EXTRA_COLUMNS = {
+    'lease_expires': "REAL",
+    'attempts': "INTEGER NOT NULL DEFAULT 0",
+    'last_error': "TEXT",
+    'coded_seq': "INTEGER",
+}
+
+# 写入编码结果时为 coded_seq 取下一个序号；写事务串行执行，序号按提交顺序递增，用作增量导出的检查点
+NEXT_CODED_SEQ = "(SELECT COALESCE(MAX(coded_seq), 0) + 1 FROM prompt)"
+
+
+def tuneConnection(conn):
+    """写入连接使用 WAL 模式，读写互不阻塞，并减少每次提交的 fsync"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA cache_size=-65536")  # 64 MB
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    conn.execute("PRAGMA busy_timeout=5000")
+
+
+def createPromptTable(conn):
+    """创建 prompt 表：index 为整数主键，status 带索引，按 id 读写不再扫描整张表"""
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS 'prompt' (
+        'index' INTEGER PRIMARY KEY,
+        'prompt_content' TEXT,
+        'prompt_code' TEXT DEFAULT 'None',
+        'prompt_code_orign' TEXT DEFAULT 'None',
+        'status' TEXT NOT NULL DEFAULT 'pending',
+        'lease_expires' REAL,
+        'attempts' INTEGER NOT NULL DEFAULT 0,
+        'last_error' TEXT,
+        'coded_seq' INTEGER
+    )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_status ON prompt (status)")
+
+
+def addPromptColumns(conn):
+    """为已有的 prompt 表补充缺少的列"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(prompt)")}
+    for name, definition in PROMPT_EXTRA_COLUMNS.items():
+        if name not in columns:
+            conn.execute(f"ALTER TABLE prompt ADD COLUMN '{name}' {definition}")
+    # 写入结果时取 MAX(coded_seq)，需要索引；旧表补上列之后才能创建
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_prompt_coded_seq ON prompt (coded_seq)")
+    conn.commit()
+
+
+def recoverPromptTable(conn):
+    """恢复中断的迁移：旧版本的迁移不在同一事务中，中途退出时数据留在 prompt_old，新建的 prompt 表为空"""
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'prompt_old' not in tables:
+        return
+    if 'prompt' not in tables or not conn.execute("SELECT COUNT(*) FROM prompt").fetchone()[0]:
+        conn.execute("DROP TABLE IF EXISTS prompt")
+        conn.execute("ALTER TABLE prompt_old RENAME TO prompt")
+    else:
+        # prompt 中已有数据，保留 prompt_old 备查，换个名字避免后续迁移重名
+        conn.execute(f"ALTER TABLE prompt_old RENAME TO prompt_old_{int(time.time())}")
+
+
+def migratePromptTable(conn):
+    """把旧版（由 to_sql 生成、没有主键和状态列）的 prompt 表迁移到新结构，返回是否进行了迁移
+
+    整个迁移（包括恢复上次中断的迁移）在一个 BEGIN IMMEDIATE 事务中完成，中途退出时数据库保持原样。
+    """
+    isolation_level = conn.isolation_level
+    # sqlite3 默认只在 INSERT 等语句前开启事务，改为手动控制，使 ALTER / CREATE 也在事务中
+    conn.isolation_level = None
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            recoverPromptTable(conn)
+            migrated = migratePromptRows(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    finally:
+        conn.isolation_level = isolation_level
+    return migrated
+
+
+def migratePromptRows(conn):
+    """在调用方的事务中把旧结构的 prompt 表改写为新结构，不是旧结构时返回 False"""
+    columns = {row[1]: row[5] for row in conn.execute("PRAGMA table_info(prompt)")}
+    if not columns or (columns.get('index') and 'status' in columns):
+        return False
+
+    # 原有的 index 唯一时保留，便于与导出结果对应；否则重新编号
+    keep_index = 'index' in columns and conn.execute(
+        'SELECT COUNT(*) = COUNT(DISTINCT "index") FROM prompt'
+    ).fetchone()[0]
+    index_expr = '"index"' if keep_index else 'NULL'
+    conn.execute("ALTER TABLE prompt RENAME TO prompt_old")
+    createPromptTable(conn)
+    conn.execute(f"""
+    INSERT INTO prompt ('index', prompt_content, prompt_code, prompt_code_orign, status)
+    SELECT {index_expr}, prompt_content, COALESCE(prompt_code, 'None'), COALESCE(prompt_code_orign, 'None'),
+           CASE WHEN prompt_code IS NULL OR prompt_code = 'None' THEN '{PROMPT_PENDING}' ELSE '{PROMPT_DONE}' END
+    FROM prompt_old ORDER BY rowid
+    """)
+    conn.execute("DROP TABLE prompt_old")
+    return True
+
+
+def writePrompts(conn, prompt_contents):
+    """用新的提示语替换 prompt 表中的全部数据"""
+    createPromptTable(conn)
+    conn.execute("DELETE FROM prompt")
+    # 旧结果已清空，增量导出的检查点一并失效
+    conn.execute("DROP TABLE IF EXISTS export_checkpoint")
+    conn.executemany(
+        "INSERT INTO prompt ('index', prompt_content) VALUES (?, ?)",
+        enumerate(prompt_contents)
+    )
+    conn.commit()
+
+
 class localDB():
     def __init__(self) -> None:
         self.db_path = localDBFilePath()
         self.conn = sqlite3.connect(self.db_path)
 
-    # 检查数据库是否存在，不存在则创建数据库
+    # 检查数据库是否存在，不存在则创建数据库，旧版的 prompt 表迁移到新结构
     def checkDB(self):
-        try:
-            self.conn.execute("select * from prompt")
-            self.conn.commit()
-        except:
-            self.conn.execute("""
-            CREATE TABLE 'prompt' (
-                'index' INTEGER,
-                'prompt_content' TEXT,
-                'prompt_code' TEXT,
-                'prompt_code_orign' TEXT
-            )
-            """)
-            self.conn.execute("""
-            CREATE TABLE 'reply' (
-                'index' INTEGER,
-                'user_id' INTEGER,
-                'user_name' TEXT,
-                'reply_content' TEXT,
-                'topic_id' INTEGER,
-                'reply_id' INTEGER,
-                'to_reply_id' INTEGER,
-                'reason' TEXT
-            )
-            """)
-            self.conn.commit()
+        migratePromptTable(self.conn)
+        createPromptTable(self.conn)
+        addPromptColumns(self.conn)
+        self.conn.execute("""
+        CREATE TABLE IF NOT EXISTS 'reply' (
+            'index' INTEGER,
+            'user_id' INTEGER,
+            'user_name' TEXT,
+            'reply_content' TEXT,
+            'topic_id' INTEGER,
+            'reply_id' INTEGER,
+            'to_reply_id' INTEGER,
+            'reason' TEXT
+        )
+        """)
+        self.conn.commit()
+
+    def countPrompts(self, has_coding = False):
+        """已编码（或未编码）的数据条数，只计数，不读取提示语内容"""
+        if has_coding:
+            return self.conn.execute("SELECT COUNT(*) FROM prompt WHERE status = ?", (PROMPT_DONE,)).fetchone()[0]
+        return self.conn.execute("SELECT COUNT(*) FROM prompt WHERE status != ?", (PROMPT_DONE,)).fetchone()[0]
 
     def readPromptFromLocalDB(self, has_coding = False):
+        import pandas as pd
         if has_coding:
-            data = pd.read_sql('select * from prompt where prompt_code != "None"', self.conn)
+            data = pd.read_sql('select * from prompt where status = ?', self.conn, params=(PROMPT_DONE,))
         else:
-            data = pd.read_sql('select * from prompt where prompt_code = "None"', self.conn)
-        return data
\ No newline at end of file
+            data = pd.read_sql('select * from prompt where status != ?', self.conn, params=(PROMPT_DONE,))
+        return data
@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import uuid
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from src.module.config import getConfig, logFolder
+
+LOGGER_NAME = "aico"
+LOG_FILE_NAME = "aicoding.log"
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener = None
+_setup_lock = threading.Lock()
+_run_id = uuid.uuid4().hex[:12]
+
+
+def getRunId():
+    return _run_id
+
+
+def setRunId(run_id=None):
+    """开始新的一次编码时调用，之后的日志都带上这个编号；多进程、多节点时传入同一个编号"""
+    global _run_id
+    _run_id = run_id or uuid.uuid4().hex[:12]
+    return _run_id
+
+
+class RecordContextFilter(logging.Filter):
+    """在调用方线程中为日志记录补上编码批次和数据编号，只做属性赋值"""
+
+    def filter(self, record):
+        record.run_id = _run_id
+        if not hasattr(record, 'item_id'):
+            record.item_id = None
+        return True
+
+
+class ConsoleFilter(logging.Filter):
+    """终端只显示 log() 的内容和错误，各模块的明细日志只写入文件"""
+
+    def filter(self, record):
+        return record.name == LOGGER_NAME or record.levelno >= logging.ERROR
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条日志一行 JSON，便于用脚本按 run_id、item_id 筛选"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, TIME_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'run_id': getattr(record, 'run_id', None),
+            'item_id': getattr(record, 'item_id', None),
+            'thread': record.threadName,
+            'process': record.processName,
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ContextQueueHandler(QueueHandler):
+    """只合并消息参数，格式化交给后台线程，调用方不做字符串格式化以外的工作"""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def logConfig():
+    """读取日志配置：(级别, 格式, 单个文件最大字节数, 保留的旧文件数)"""
+    config = getConfig()
+    level = config.get("Log", "level", fallback="INFO").upper()
+    log_format = config.get("Log", "format", fallback="text").lower()
+    max_bytes = int(config.getfloat("Log", "max_size_mb", fallback=10) * 1024 * 1024)
+    backup_count = config.getint("Log", "backup_count", fallback=5)
+    return getattr(logging, level, logging.INFO), log_format, max_bytes, backup_count
+
+
+def createHandlers(log_format, max_bytes, backup_count):
+    """在后台线程中实际写出日志的处理器：按大小轮换的日志文件和终端"""
+    if log_format == "json":
+        formatter = JsonLineFormatter()
+    else:
+        formatter = logging.Formatter("[%(asctime)s] %(message)s", TIME_FORMAT)
+
+    file_handler = RotatingFileHandler(os.path.join(logFolder(), LOG_FILE_NAME), maxBytes=max_bytes,
+                                       backupCount=backup_count, encoding="utf-8", delay=True)
+    file_handler.setFormatter(formatter)
+    handlers = [file_handler]
+    # 打包后的图形界面程序没有终端
+    if sys.stdout is not None:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", TIME_FORMAT))
+        console_handler.addFilter(ConsoleFilter())
+        handlers.append(console_handler)
+    return handlers
+
+
+def setupLogging(log_queue=None, run_id=None):
+    """初始化日志（重复调用无效）
+
+    调用方只把日志记录放入无界队列，由 QueueListener 在后台线程中写文件和终端，记录日志不会阻塞工作线程或界面。
+    子进程传入主进程的 log_queue，日志交给主进程统一写入，避免多个进程同时轮换同一个文件。
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+    with _setup_lock:
+        if logger.handlers:
+            return logger
+        if run_id is not None:
+            setRunId(run_id)
+        level, log_format, max_bytes, backup_count = logConfig()
+        # 级别低于设置的日志在调用处直接丢弃，不会进入队列
+        logger.setLevel(level)
+        logger.propagate = False
+
+        if log_queue is None:
+            log_queue = queue.SimpleQueue()
+            _listener = QueueListener(log_queue, *createHandlers(log_format, max_bytes, backup_count),
+                                      respect_handler_level=True)
+            _listener.start()
+            # 退出前写完队列中剩余的日志
+            atexit.register(stopLogging)
+
+        handler = ContextQueueHandler(log_queue)
+        handler.addFilter(RecordContextFilter())
+        logger.addHandler(handler)
+    return logger
+
+
+def listenLogQueue(log_queue):
+    """把子进程放入 log_queue 的日志交给本进程的处理器写出，返回的监听器需在子进程结束后 stop()"""
+    setupLogging()
+    level, log_format, max_bytes, backup_count = logConfig()
+    handlers = _listener.handlers if _listener is not None else createHandlers(log_format, max_bytes, backup_count)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
+
+
+def stopLogging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def getLogger(name=None):
+    """返回日志记录器，首次调用时初始化；name 为子模块名，如 getLogger("coding")"""
+    setupLogging()
+    return logging.getLogger(f"{LOGGER_NAME}.{name}" if name else LOGGER_NAME)
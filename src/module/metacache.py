@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import threading
+
+# 各类远程信息的有效期（秒），按缓存键的前缀（冒号之前）匹配
+METADATA_TTL = {
+    'github_stats': 6 * 3600,
+    'latest_version': 24 * 3600,
+    'models': 3600,
+    'ping': 300,
+}
+DEFAULT_TTL = 3600
+
+_metadata_cache = None
+_metadata_cache_lock = threading.Lock()
+
+
+def metadataCacheFile():
+    # 延迟导入，config 模块依赖 version 模块，而 version 模块使用本缓存
+    from src.module.config import configPath
+    return os.path.join(configPath(), "metadata_cache.json")
+
+
+def getMetadataCache():
+    """获取全局共享的远程信息缓存"""
+    global _metadata_cache
+    with _metadata_cache_lock:
+        if _metadata_cache is None:
+            _metadata_cache = MetadataCache(metadataCacheFile())
+        return _metadata_cache
+
+
+def metadataTTL(key):
+    return METADATA_TTL.get(key.split(':', 1)[0], DEFAULT_TTL)
+
+
+class MetadataCache:
+    """保存在本地 JSON 文件中的远程信息（GitHub 统计、最新版本、模型列表等），每个键有各自的有效期
+
+    过期的值仍然可以读取（先显示旧值，再在后台刷新），联网失败时也继续使用旧值。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def _load(self):
+        if self.entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as content:
+                    self.entries = json.load(content)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as content:
+                json.dump(self.entries, content, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass
+
+    def get(self, key, ttl=None):
+        """返回 (值, 是否在有效期内)，没有缓存时返回 (None, False)"""
+        ttl = metadataTTL(key) if ttl is None else ttl
+        with self.lock:
+            entry = self._load().get(key)
+        if not isinstance(entry, dict) or 'value' not in entry:
+            return None, False
+        return entry['value'], time.time() - entry.get('updated_at', 0) < ttl
+
+    def put(self, key, value):
+        with self.lock:
+            self._load()[key] = {'value': value, 'updated_at': time.time()}
+            self._save()
+
+    def fetch(self, key, fetch, ttl=None, force=False):
+        """有效期内直接返回缓存，否则调用 fetch() 获取并保存；获取失败时返回旧值（没有时返回 None）"""
+        value, fresh = self.get(key, ttl)
+        if fresh and not force:
+            return value
+        try:
+            new_value = fetch()
+        except Exception:
+            return value
+        if new_value is None:
+            return value
+        self.put(key, new_value)
+        return new_value
@@ -0,0 +1,65 @@
+from src.module.config import getConfig, DEFAULT_PACK_TOKEN_BUDGET
+from src.module.tokens import estimate_tokens
+
+# 同一请求中不同线程之间的分隔
+THREAD_SEPARATOR = '\n\n'
+
+
+def getPackTokenBudget():
+    """读取每个请求的 token 预算，0 表示不合并（每个线程一个请求）"""
+    return getConfig().getint("Prompt", "pack_token_budget", fallback=DEFAULT_PACK_TOKEN_BUDGET)
+
+
+class PromptPacker:
+    """把同一话题下的多个回帖线程合并到一个请求中，共用编码表和话题部分
+
+    - 按原始顺序贪心合并，直到加入下一个线程会超出 token 预算
+    - 单个线程本身超出预算时单独成为一个请求
+    - 模型返回的 JSON 数组按 reply_id 逐条对应，导出时无需额外拆分
+    """
+
+    def __init__(self, token_budget=0):
+        self.token_budget = token_budget
+        self.thread_count = 0
+        self.request_count = 0
+        self.unpacked_tokens = 0
+        self.packed_tokens = 0
+
+    def pack(self, topic_prompt, threads):
+        """topic_prompt 为编码表和话题部分，threads 为各线程的回帖行列表，返回提示语列表"""
+        header_tokens = estimate_tokens(topic_prompt)
+        separator_tokens = estimate_tokens(THREAD_SEPARATOR)
+        prompts = []
+        batch = []
+        batch_tokens = header_tokens
+
+        for lines in threads:
+            text = '\n'.join(lines)
+            tokens = estimate_tokens(text)
+            self.thread_count += 1
+            self.unpacked_tokens += header_tokens + tokens
+
+            extra = tokens if not batch else tokens + separator_tokens
+            if batch and (self.token_budget <= 0 or batch_tokens + extra > self.token_budget):
+                prompts.append(topic_prompt + THREAD_SEPARATOR.join(batch) + '\n\n')
+                self.packed_tokens += batch_tokens
+                batch = []
+                batch_tokens = header_tokens
+                extra = tokens
+            batch.append(text)
+            batch_tokens += extra
+
+        if batch:
+            prompts.append(topic_prompt + THREAD_SEPARATOR.join(batch) + '\n\n')
+            self.packed_tokens += batch_tokens
+        self.request_count += len(prompts)
+        return prompts
+
+    def stats(self):
+        """与每个线程一个请求相比节省的请求数和 token 数"""
+        return {
+            'threads': self.thread_count,
+            'requests': self.request_count,
+            'saved_requests': self.thread_count - self.request_count,
+            'saved_tokens': self.unpacked_tokens - self.packed_tokens,
+        }
@@ -0,0 +1,280 @@
+import time
+import sqlite3
+import threading
+import statistics
+from src.module.config import readConfig
+from src.module.tokens import estimate_tokens, estimate_messages_tokens
+from src.module.splitting import REPLY_LINE_PATTERN, getMaxPromptTokens
+from src.module.localDB import PROMPT_PENDING
+from src.module.progress import formatDuration
+
+# 没有校准数据时使用的默认值
+DEFAULT_OUTPUT_TOKENS_PER_REPLY = 60   # 每条回帖的 JSON 结果（tag 与理由）
+DEFAULT_LATENCY_BASE = 2.0             # 每个请求的固定耗时（秒）
+DEFAULT_SECONDS_PER_OUTPUT_TOKEN = 0.02
+
+# 提示语长度分布的分组上限（token）
+HISTOGRAM_EDGES = [500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+# 校准时最多使用最近多少条记录
+CALIBRATION_SAMPLES = 200
+
+_latency_recorder = None
+_latency_recorder_lock = threading.Lock()
+
+
+def getLatencyRecorder():
+    """获取全局共享的请求耗时记录器"""
+    global _latency_recorder
+    with _latency_recorder_lock:
+        if _latency_recorder is None:
+            _latency_recorder = LatencyRecorder()
+        return _latency_recorder
+
+
+def countReplies(prompt_content):
+    """提示语中包含的回帖数"""
+    return max(len(REPLY_LINE_PATTERN.findall(prompt_content)), 1)
+
+
+class LatencyRecorder:
+    """记录实际请求的耗时和 token 用量，编码结束后写入本地数据库，用于校准预估"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = []
+
+    def add(self, latency, estimated_tokens, reply_count, response):
+        """记录一次成功的请求（不含缓存命中）"""
+        usage = response.get('usage') or {}
+        with self.lock:
+            self.samples.append((time.time(), latency, estimated_tokens, usage.get('prompt_tokens'),
+                                 usage.get('completion_tokens'), reply_count))
+
+    def drain(self):
+        """取出尚未保存的记录"""
+        with self.lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+    def save(self, db_path):
+        """把尚未保存的记录写入 coding_latency 表"""
+        saveLatencySamples(db_path, self.drain())
+
+
+def saveLatencySamples(db_path, samples):
+    if not samples:
+        return
+    conn = sqlite3.connect(db_path)
+    try:
+        createLatencyTable(conn)
+        conn.executemany(
+            "INSERT INTO coding_latency (recorded_at, latency, estimated_tokens, prompt_tokens, completion_tokens, reply_count) VALUES (?, ?, ?, ?, ?, ?)",
+            samples
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def createLatencyTable(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS coding_latency (
+        'recorded_at' REAL,
+        'latency' REAL,
+        'estimated_tokens' INTEGER,
+        'prompt_tokens' INTEGER,
+        'completion_tokens' INTEGER,
+        'reply_count' INTEGER
+    )
+    """)
+
+
+def loadLatencySamples(db_path, limit=CALIBRATION_SAMPLES):
+    """读取最近的请求记录"""
+    conn = sqlite3.connect(db_path)
+    try:
+        createLatencyTable(conn)
+        return conn.execute(
+            "SELECT latency, estimated_tokens, prompt_tokens, completion_tokens, reply_count FROM coding_latency ORDER BY recorded_at DESC LIMIT ?",
+            (limit,)
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+class Calibration:
+    """根据实际请求记录得到的修正系数；没有记录时使用默认值"""
+
+    def __init__(self, samples=()):
+        self.sample_count = len(samples)
+        self.input_ratio = 1.0
+        self.output_tokens_per_reply = DEFAULT_OUTPUT_TOKENS_PER_REPLY
+        self.latency_base = DEFAULT_LATENCY_BASE
+        self.seconds_per_output_token = DEFAULT_SECONDS_PER_OUTPUT_TOKEN
+        if samples:
+            self._fit(samples)
+
+    def _fit(self, samples):
+        with_usage = [row for row in samples if row[2] and row[3] is not None]
+        if with_usage:
+            # 本地估算与服务端计数的比例
+            self.input_ratio = sum(row[2] for row in with_usage) / max(sum(row[1] for row in with_usage), 1)
+            self.output_tokens_per_reply = sum(row[3] for row in with_usage) / max(sum(row[4] for row in with_usage), 1)
+
+        # 耗时 ≈ 固定耗时 + 每个输出 token 的耗时，样本不足或拟合结果不合理时按平均耗时计算
+        latencies = [row[0] for row in samples]
+        outputs = [row[3] if row[3] is not None else row[4] * self.output_tokens_per_reply for row in samples]
+        self.latency_base = statistics.mean(latencies)
+        self.seconds_per_output_token = 0.0
+        if len(samples) >= 3 and len(set(outputs)) > 1:
+            mean_output = statistics.mean(outputs)
+            slope = (sum((x - mean_output) * (y - self.latency_base) for x, y in zip(outputs, latencies))
+                     / sum((x - mean_output) ** 2 for x in outputs))
+            intercept = self.latency_base - slope * mean_output
+            if slope >= 0 and intercept >= 0:
+                self.latency_base = intercept
+                self.seconds_per_output_token = slope
+
+    def latency(self, output_tokens):
+        return self.latency_base + self.seconds_per_output_token * output_tokens
+
+
+def _histogram(values):
+    labels = []
+    counts = []
+    lower = 0
+    for edge in HISTOGRAM_EDGES + [None]:
+        if edge is None:
+            labels.append(f">{lower}")
+            counts.append(sum(1 for value in values if value > lower))
+        else:
+            labels.append(f"{lower}-{edge}")
+            counts.append(sum(1 for value in values if (value > lower or lower == 0) and value <= edge))
+            lower = edge
+    return list(zip(labels, counts))
+
+
+def _outliers(rows, limit=5):
+    """超过 Q3 + 3 × IQR 的提示语，按长度从大到小取前 limit 条"""
+    values = [tokens for _, tokens in rows]
+    if len(values) < 4:
+        return []
+    q1, _, q3 = statistics.quantiles(values, n=4)
+    threshold = q3 + 3 * (q3 - q1)
+    outliers = sorted((row for row in rows if row[1] > threshold), key=lambda row: row[1], reverse=True)
+    return outliers[:limit]
+
+
+def planCoding(db_path, limit=-1, concurrency=None, rpm=None, tpm=None):
+    """不发送任何请求，估算编码 prompt 表中未编码数据所需的请求数、token、费用和耗时"""
+    config = readConfig()
+    if concurrency is None:
+        mode = config.get("Engine", "mode", fallback="thread")
+        if mode == "process" and config.get("Engine", "process_engine", fallback="async") != "async":
+            # 延迟导入，避免与 coding 模块循环引用
+            from src.module.processes import getProcessCount
+            concurrency = config.getint("Thread", "thread_count", fallback=1) * getProcessCount()
+        elif mode in ("async", "process"):
+            concurrency = config.getint("Engine", "async_concurrency", fallback=100)
+        else:
+            concurrency = config.getint("Thread", "thread_count", fallback=1)
+    concurrency = max(concurrency, 1)
+    if rpm is None:
+        rpm = config.getint("RateLimit", "requests_per_minute", fallback=0)
+    if tpm is None:
+        tpm = config.getint("RateLimit", "tokens_per_minute", fallback=0)
+    input_price = config.getfloat("Pricing", "input_per_million", fallback=0.0)
+    output_price = config.getfloat("Pricing", "output_per_million", fallback=0.0)
+    max_prompt_tokens = getMaxPromptTokens()
+
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute(
+            'SELECT "index", prompt_content FROM prompt WHERE status = ? ORDER BY "index" LIMIT ?', (PROMPT_PENDING, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+    calibration = Calibration(loadLatencySamples(db_path))
+    # 延迟导入，避免与 coding 模块循环引用；系统提示语等固定开销只计算一次
+    from src.module.coding import build_messages
+    overhead_tokens = estimate_messages_tokens(build_messages(''))
+
+    prompt_tokens = []
+    input_tokens = 0
+    output_tokens = 0
+    latencies = []
+    for row_id, prompt_content in rows:
+        estimated = overhead_tokens + estimate_tokens(prompt_content)
+        output = countReplies(prompt_content) * calibration.output_tokens_per_reply
+        prompt_tokens.append((row_id, estimated))
+        input_tokens += estimated * calibration.input_ratio
+        output_tokens += output
+        latencies.append(calibration.latency(output))
+
+    # 并发上限：按最长的请求和总耗时 / 并发数估算；限流：按请求数和 token 数估算
+    wall_seconds = max(sum(latencies) / concurrency, max(latencies, default=0.0))
+    if rpm > 0:
+        wall_seconds = max(wall_seconds, len(rows) / rpm * 60)
+    if tpm > 0:
+        wall_seconds = max(wall_seconds, (input_tokens + output_tokens) / tpm * 60)
+
+    cost = None
+    if input_price > 0 or output_price > 0:
+        cost = (input_tokens * input_price + output_tokens * output_price) / 1000000
+
+    values = [tokens for _, tokens in prompt_tokens]
+    return {
+        'requests': len(rows),
+        'input_tokens': round(input_tokens),
+        'output_tokens': round(output_tokens),
+        'cost': cost,
+        'wall_seconds': wall_seconds,
+        'concurrency': concurrency,
+        'rpm': rpm,
+        'tpm': tpm,
+        'max_prompt': max(values, default=0),
+        'median_prompt': statistics.median(values) if values else 0,
+        'histogram': _histogram(values),
+        'outliers': _outliers(prompt_tokens),
+        'oversized': sum(1 for value in values if max_prompt_tokens > 0 and value > max_prompt_tokens),
+        'calibration_samples': calibration.sample_count,
+    }
+
+
+def formatPlan(plan, language="Chinese"):
+    """把估算结果格式化为日志行"""
+    lines = []
+    duration = formatDuration(plan['wall_seconds'])
+    rate = []
+    if plan['rpm'] > 0:
+        rate.append(f"{plan['rpm']} rpm")
+    if plan['tpm'] > 0:
+        rate.append(f"{plan['tpm']} tpm")
+    rate = ", ".join(rate)
+    histogram = ", ".join(f"{label}: {count}" for label, count in plan['histogram'] if count)
+    outliers = ", ".join(f"#{row_id} ({tokens})" for row_id, tokens in plan['outliers'])
+    if language == "Chinese":
+        lines.append(f"[预估] 请求 {plan['requests']} 个，输入约 {plan['input_tokens']} tokens，输出约 {plan['output_tokens']} tokens")
+        if plan['cost'] is not None:
+            lines.append(f"[预估] 费用约 {plan['cost']:.4f}")
+        lines.append(f"[预估] 并发 {plan['concurrency']}{'，限流 ' + rate if rate else ''}，预计耗时 {duration}"
+                     + (f"（根据 {plan['calibration_samples']} 次实际请求校准）" if plan['calibration_samples'] else "（未校准，可先运行测试编码）"))
+        lines.append(f"[预估] 提示语长度（tokens）中位数 {plan['median_prompt']}，最大 {plan['max_prompt']}；分布 {histogram or '-'}")
+        if outliers:
+            lines.append(f"[预估] 异常长的提示语：{outliers}")
+        if plan['oversized']:
+            lines.append(f"[预估] {plan['oversized']} 条提示语超过上限，将被拆分")
+    else:
+        lines.append(f"[Estimate] {plan['requests']} requests, about {plan['input_tokens']} input tokens and {plan['output_tokens']} output tokens")
+        if plan['cost'] is not None:
+            lines.append(f"[Estimate] Cost about {plan['cost']:.4f}")
+        lines.append(f"[Estimate] Concurrency {plan['concurrency']}{', rate limit ' + rate if rate else ''}, expected wall time {duration}"
+                     + (f" (calibrated from {plan['calibration_samples']} requests)" if plan['calibration_samples'] else " (not calibrated, run Test Coding first)"))
+        lines.append(f"[Estimate] Prompt length (tokens) median {plan['median_prompt']}, max {plan['max_prompt']}; distribution {histogram or '-'}")
+        if outliers:
+            lines.append(f"[Estimate] Unusually long prompts: {outliers}")
+        if plan['oversized']:
+            lines.append(f"[Estimate] {plan['oversized']} prompts exceed the limit and will be split")
+    return lines
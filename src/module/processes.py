@@ -0,0 +1,161 @@
+import os
+import arrow
+import threading
+import multiprocessing
+from queue import Empty
+from src.module.config import readConfig
+from src.module.localDB import PROMPT_PENDING, PROMPT_FAILED
+from src.module.coding import count_status, emit_statistics, language
+from src.module.logger import setupLogging, listenLogQueue, getRunId
+from src.module.progress import getProgressTracker, formatProgress
+
+# 子进程向主进程汇报进度的间隔（秒）
+PART_REPORT_INTERVAL = 1.0
+
+
+def getProcessCount():
+    """读取工作进程数，0 表示与 CPU 核数相同"""
+    count = readConfig().getint("Engine", "processes", fallback=0)
+    return count if count > 0 else (os.cpu_count() or 1)
+
+
+class QueueSignal:
+    """子进程中代替 Qt 信号，把日志放入队列交给主进程输出"""
+
+    def __init__(self, queue):
+        self.queue = queue
+
+    def emit(self, message):
+        self.queue.put(message)
+
+
+def report_progress(output_queue, part, stop):
+    """子进程定时把本进程的累计计数放入队列，由主进程汇总"""
+    tracker = getProgressTracker()
+    while not stop.wait(PART_REPORT_INTERVAL):
+        output_queue.put(('progress', part, tracker.counters()))
+    output_queue.put(('progress', part, tracker.counters()))
+
+
+def process_main(stop_event, output_queue, log_queue, run_id, part, engine, concurrency, share, db_path, table_name, label, limit, only_failed):
+    """工作进程入口：使用独立的连接池和限流器，只通过 prompt 表与其他进程协调"""
+    from src.module.ratelimit import setRateLimitShare
+    # 日志交给主进程写入，与主进程使用同一个编码批次编号
+    setupLogging(log_queue, run_id)
+    setRateLimitShare(share)
+    output_signal = QueueSignal(output_queue)
+    report_stop = threading.Event()
+    reporter = threading.Thread(target=report_progress, args=(output_queue, part, report_stop), daemon=True)
+    reporter.start()
+    try:
+        run_engine(stop_event, output_signal, engine, concurrency, db_path, table_name, label, limit, only_failed)
+    finally:
+        report_stop.set()
+        reporter.join()
+
+
+def run_engine(stop_event, output_signal, engine, concurrency, db_path, table_name, label, limit, only_failed):
+    if engine == "async":
+        from src.module.asynccoding import run_async_coding
+        run_async_coding(stop_event, output_signal, {}, concurrency, db_path, table_name, label, limit, "",
+                         only_failed, SHOW_STATISTICS=False, CONCURRENCY=concurrency)
+    else:
+        from src.module.coding import main_coding
+        main_coding(stop_event, output_signal, {}, concurrency, db_path, table_name, label, limit, "",
+                    only_failed, SHOW_STATISTICS=False)
+
+
+def split_limit(limit, count):
+    """把 limit 条数据分给 count 个进程，limit < 0 表示不限"""
+    if limit < 0:
+        return [limit] * count
+    return [limit // count + (1 if index < limit % count else 0) for index in range(count)]
+
+
+def run_process_coding(stop_event, output_signal, thread_results, THREAD_COUNT, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME, LIMIT, DEFAULT_NODE_RECOGNITION_PROMPT, ONLY_FAILED=False,
+                       PROCESS_COUNT=None):
+    """多进程编码引擎入口，参数与 main_coding 保持一致
+
+    启动 PROCESS_COUNT 个工作进程，每个进程运行一个完整的编码引擎（Engine/process_engine，默认异步），
+    进程之间只通过本地数据库中的任务表（租约）协调；当前进程负责转发日志、汇总进度和停止信号。
+    """
+    config = readConfig()
+    process_count = PROCESS_COUNT or getProcessCount()
+    engine = config.get("Engine", "process_engine", fallback="async")
+    if engine == "async":
+        concurrency = max(config.getint("Engine", "async_concurrency", fallback=100) // process_count, 1)
+    else:
+        concurrency = max(THREAD_COUNT, 1)
+    limits = [limit for limit in split_limit(LIMIT, process_count) if limit != 0]
+
+    # spawn 在各平台上行为一致，也不会把父进程中的线程和连接带入子进程
+    context = multiprocessing.get_context("spawn")
+    process_stop_event = context.Event()
+    output_queue = context.Queue()
+    log_queue = context.Queue()
+    log_listener = listenLogQueue(log_queue)
+    processes = [
+        context.Process(
+            target=process_main,
+            args=(process_stop_event, output_queue, log_queue, getRunId(), index, engine, concurrency, len(limits), DATABASE_PATH, TABLE_NAME,
+                  LABEL_COLUMN_NAME, limit, ONLY_FAILED),
+            name=f"aico-coding-{index}",
+            daemon=True,
+        )
+        for index, limit in enumerate(limits)
+    ]
+
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if language == "Chinese":
+        output_signal.emit(f"[提示] [{timestamp}] [多进程编码]：{len(processes)} 个进程，每个进程并发 {concurrency}")
+    else:
+        output_signal.emit(f"[Notice] [{timestamp}] [Multi-process coding]: {len(processes)} processes, concurrency {concurrency} each")
+
+    # 主进程的进度由各子进程汇报的计数汇总而成
+    total = count_status(DATABASE_PATH).get(PROMPT_FAILED if ONLY_FAILED else PROMPT_PENDING, 0)
+    tracker = getProgressTracker()
+    tracker.start(total if LIMIT < 0 else min(total, LIMIT))
+    for process in processes:
+        process.start()
+
+    while any(process.is_alive() for process in processes):
+        if stop_event.is_set() and not process_stop_event.is_set():
+            process_stop_event.set()
+        forward_output(output_queue, output_signal, timeout=0.2)
+
+    for process in processes:
+        process.join()
+    forward_output(output_queue, output_signal, timeout=0)
+    output_queue.close()
+    log_listener.stop()
+    log_queue.close()
+    tracker.finish()
+
+    if not stop_event.is_set():
+        emit_progress(output_signal, tracker)
+        emit_statistics(output_signal, DATABASE_PATH, TABLE_NAME, LABEL_COLUMN_NAME)
+
+
+def forward_output(output_queue, output_signal, timeout):
+    """把子进程的日志转发到界面或终端，进度计数交给 ProgressTracker 汇总"""
+    tracker = getProgressTracker()
+    try:
+        message = output_queue.get(timeout=timeout) if timeout else output_queue.get_nowait()
+        while True:
+            if isinstance(message, tuple):
+                _, part, counters = message
+                tracker.update_part(part, counters)
+            else:
+                output_signal.emit(message)
+            message = output_queue.get_nowait()
+    except Empty:
+        pass
+
+
+def emit_progress(output_signal, tracker):
+    """汇总所有进程的进度"""
+    timestamp = arrow.now().format('YYYY-MM-DD HH:mm:ss')
+    if language == "Chinese":
+        output_signal.emit(f"[提示] [{timestamp}] [编码进度]：{formatProgress(tracker.snapshot(), language)}")
+    else:
+        output_signal.emit(f"[Notice] [{timestamp}] [Coding progress]: {formatProgress(tracker.snapshot(), language)}")
@@ -0,0 +1,140 @@
+import time
+import threading
+from collections import deque
+
+# 计算速度使用的时间窗口（秒），反映最近的速度而不是整个运行期间的平均值
+RATE_WINDOW = 60
+
+# 终端输出进度的间隔（秒）
+PROGRESS_INTERVAL = 10
+
+_progress_tracker = None
+_progress_tracker_lock = threading.Lock()
+
+
+def getProgressTracker():
+    """获取全局共享的编码进度"""
+    global _progress_tracker
+    with _progress_tracker_lock:
+        if _progress_tracker is None:
+            _progress_tracker = ProgressTracker()
+        return _progress_tracker
+
+
+class ProgressTracker:
+    """编码进度：由编码引擎更新，界面和命令行定时读取 snapshot()
+
+    多进程编码时，各子进程的计数通过 update_part() 汇总到主进程。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.start(0)
+        self.running = False
+
+    def start(self, total):
+        with self.lock:
+            self.total = total
+            self.completed = 0
+            self.failed = 0
+            self.in_flight = 0
+            self.tokens = 0
+            self.parts = {}
+            self.started_at = time.monotonic()
+            self.history = deque()
+            self.running = True
+
+    def finish(self):
+        with self.lock:
+            self.running = False
+
+    def item_started(self):
+        with self.lock:
+            self.in_flight += 1
+
+    def item_finished(self, success):
+        with self.lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+            if success:
+                self.completed += 1
+            else:
+                self.failed += 1
+
+    def item_released(self):
+        """数据未完成就归还（收到停止信号，或失败后回到待处理等待重试），不计入成功或失败"""
+        with self.lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+
+    def add_usage(self, response):
+        """累计实际请求的 token 用量（缓存命中不计）"""
+        usage = response.get('usage') or {}
+        tokens = (usage.get('prompt_tokens') or 0) + (usage.get('completion_tokens') or 0)
+        if tokens:
+            with self.lock:
+                self.tokens += tokens
+
+    def update_part(self, key, counters):
+        """更新某个子进程的累计计数"""
+        with self.lock:
+            self.parts[key] = counters
+
+    def counters(self):
+        with self.lock:
+            return self._counters()
+
+    def _counters(self):
+        counters = {'completed': self.completed, 'failed': self.failed, 'in_flight': self.in_flight, 'tokens': self.tokens}
+        for part in self.parts.values():
+            for key in counters:
+                counters[key] += part.get(key, 0)
+        return counters
+
+    def snapshot(self):
+        """当前进度，速度为最近 RATE_WINDOW 秒的平均值，ETA 为秒数（无法估计时为 None）"""
+        now = time.monotonic()
+        with self.lock:
+            counters = self._counters()
+            self.history.append((now, counters['completed'], counters['tokens']))
+            # 保留一个窗口之前的点作为起点
+            while len(self.history) > 2 and now - self.history[1][0] >= RATE_WINDOW:
+                self.history.popleft()
+            first_at, first_completed, first_tokens = self.history[0]
+            if len(self.history) == 1:
+                first_at, first_completed, first_tokens = self.started_at, 0, 0
+            total = self.total
+            running = self.running
+            elapsed = now - self.started_at
+
+        span = now - first_at
+        items_per_minute = (counters['completed'] - first_completed) / span * 60 if span > 0 else 0.0
+        tokens_per_minute = (counters['tokens'] - first_tokens) / span * 60 if span > 0 else 0.0
+        remaining = max(total - counters['completed'] - counters['failed'], 0)
+        eta = remaining / items_per_minute * 60 if items_per_minute > 0 else None
+        return dict(counters, total=total, remaining=remaining, items_per_minute=items_per_minute,
+                    tokens_per_minute=tokens_per_minute, eta=eta, elapsed=elapsed, running=running)
+
+
+def formatDuration(seconds):
+    """格式化为 HH:MM:SS（四舍五入到秒），None 表示未知"""
+    if seconds is None:
+        return "--:--:--"
+    seconds = int(round(seconds))
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def progressPercent(snapshot):
+    if not snapshot['total']:
+        return 0
+    return min(int((snapshot['completed'] + snapshot['failed']) * 100 / snapshot['total']), 100)
+
+
+def formatProgress(snapshot, language):
+    """进度的一行文字说明"""
+    done = snapshot['completed'] + snapshot['failed']
+    if language == "Chinese":
+        return (f"{done}/{snapshot['total']} ({progressPercent(snapshot)}%)，成功 {snapshot['completed']}，"
+                f"失败 {snapshot['failed']}，进行中 {snapshot['in_flight']}，{snapshot['items_per_minute']:.1f} 项/分钟，"
+                f"{snapshot['tokens_per_minute']:,.0f} tokens/分钟，预计剩余 {formatDuration(snapshot['eta'])}")
+    return (f"{done}/{snapshot['total']} ({progressPercent(snapshot)}%), {snapshot['completed']} ok, "
+            f"{snapshot['failed']} failed, {snapshot['in_flight']} in flight, {snapshot['items_per_minute']:.1f} items/min, "
+            f"{snapshot['tokens_per_minute']:,.0f} tokens/min, ETA {formatDuration(snapshot['eta'])}")
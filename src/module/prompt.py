@@ -0,0 +1,95 @@
+import arrow
+import pandas as pd
+from src.module.replytree import ReplyTree, normalizeReplyId
+from src.module.packing import PromptPacker, getPackTokenBudget
+from src.module.localDB import writePrompts
+
+
+def readDataFiles(topic_path, reply_path, scheme_path):
+    """读取话题、回帖和编码表 CSV，并为每个编码在回帖表中增加一列"""
+    topics = pd.read_csv(topic_path, encoding='utf-8', index_col=0)
+    replys = pd.read_csv(reply_path, encoding='utf-8', index_col=0)
+    coding_scheme = pd.read_csv(scheme_path, encoding='utf-8')
+    for key in coding_scheme['code'].to_list():
+        replys[key] = ''
+    return topics, replys, coding_scheme
+
+
+def saveDataFiles(conn, topics, replys, coding_scheme):
+    """把读取的数据保存到本地数据库，供编码和导出使用"""
+    topics.to_sql('topics', conn, if_exists='replace', index=True)
+    replys.to_sql('replys', conn, if_exists='replace', index=True)
+    coding_scheme.to_sql('coding_scheme', conn, if_exists='replace')
+
+
+def loadDataFromDB(conn):
+    """从本地数据库读回上次加载的数据，第一列为原来的索引"""
+    frames = []
+    for table in ('topics', 'replys', 'coding_scheme'):
+        df = pd.read_sql(f'select * from {table}', conn)
+        frames.append(df.set_index(df.columns[0]))
+    return tuple(frames)
+
+
+def buildPrompts(topic_df, reply_df, coding_scheme_df, language, token_budget=None):
+    """按话题和回帖线程生成提示语，返回 (提示语列表, 合并统计)；token_budget 为 None 时读取配置"""
+    # 预先建立回帖树索引（任意深度），只遍历一次回帖表
+    reply_tree = ReplyTree.from_dataframe(reply_df)
+    roots_by_topic = reply_tree.roots_by_topic()
+    reply_desc_dict = {}
+    for reply_id, user_name, reply_content in zip(
+            reply_df['reply_id'], reply_df['user_name'], reply_df['reply_content']):
+        reply_desc_dict.setdefault(normalizeReplyId(reply_id), '- ' + user_name + '(reply_id:' + str(reply_id) + ')：' + reply_content)
+
+    # 编码表和提示语对所有话题相同，只生成一次
+    if language == 'Chinese':
+        prompt_header = r"""您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签“codes”（只有当编码表中没有合适的标签时才输出“NULL”），并以中文举例说明提取标签的理由，注意将理由翻译为中文列出。结果以JSON格式的数组输出：[{"reply_id":"1234","tags":[],"reason":[]},{"reply_id":"2345","tags":[],"reason":[]}]，注意只输出JSON，不要包括其他内容!tags和reason中的内容一一对应，请根据实际情况填写，不要直接复制粘贴。
+                    编码表：\n
+                    """
+    else:
+        prompt_header = r"""您将看到一组论坛中的话题和回帖，您的任务是优先根据下面的编码表中的含义解释对每个回帖提取一组标签“codes”（只有当编码表中没有合适的标签时才输出“NULL”），并以英文举例说明提取标签的理由，注意将理由翻译为英文列出。结果以JSON格式的数组输出：[{"reply_id":"1234","tags":[],"reason":[]},{"reply_id":"2345","tags":[],"reason":[]}]，注意只输出JSON，不要包括其他内容!tags和reason中的内容一一对应，请根据实际情况填写，不要直接复制粘贴。
+                    编码表：\n
+                    """
+    prompt_header += r"""
+                {encode_table_latex}
+                \n\n话题：\n
+                """.format(encode_table_latex=coding_scheme_df.to_latex(index=False))
+
+    prompt_dict = {
+        'prompt_content': [],
+    }
+
+    # 每个线程（根回帖及其全部子孙回帖）为一组，同一话题的线程按 token 预算合并为一条提示语，重复的话题只处理一次
+    packer = PromptPacker(getPackTokenBudget() if token_budget is None else token_budget)
+    has_process_topic_id_set = set()
+    for topic_id, topic_title, topic_content in zip(
+            topic_df['topic_id'], topic_df['topic_title'], topic_df['topic_content']):
+        topic_id = normalizeReplyId(topic_id)
+        if topic_id in has_process_topic_id_set:
+            continue
+        has_process_topic_id_set.add(topic_id)
+        topic_prompt = prompt_header + topic_title + topic_content + '\n\n回帖：\n'
+        threads = [[reply_desc_dict[node_id] for node_id, _ in reply_tree.iter_subtree(root_id)]
+                   for root_id in roots_by_topic.get(topic_id, [])]
+        prompt_dict['prompt_content'].extend(packer.pack(topic_prompt, threads))
+
+    return prompt_dict['prompt_content'], packer.stats()
+
+
+def preparePrompts(conn, topic_df, reply_df, coding_scheme_df, language):
+    """生成提示语并替换 prompt 表中的数据，返回合并统计"""
+    prompts, pack_stats = buildPrompts(topic_df, reply_df, coding_scheme_df, language)
+    writePrompts(conn, prompts)
+    return pack_stats
+
+
+def packingMessage(pack_stats, language):
+    """合并请求的统计信息，没有节省请求时返回 None"""
+    if pack_stats['saved_requests'] <= 0:
+        return None
+    timestamp = arrow.now().format("YYYY-MM-DD HH:mm:ss")
+    if language == 'Chinese':
+        return "[提示] [{}] [合并请求]: {} 个回帖线程合并为 {} 个请求，节省 {} 个请求、约 {} 个 token".format(
+            timestamp, pack_stats['threads'], pack_stats['requests'], pack_stats['saved_requests'], pack_stats['saved_tokens'])
+    return "[Notice] [{}] [Request packing]: {} reply threads packed into {} requests, saving {} requests and about {} tokens".format(
+        timestamp, pack_stats['threads'], pack_stats['requests'], pack_stats['saved_requests'], pack_stats['saved_tokens'])
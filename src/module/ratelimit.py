@@ -0,0 +1,241 @@
+import time
+import asyncio
+import threading
+from collections import deque
+from src.module.config import getConfig, onConfigChanged
+
+# 全局共享的限流器，所有工作线程（以及异步任务）共用同一份配额
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+# 创建当前限流器时的 (requests_per_minute, tokens_per_minute) 配置
+_rate_limit_config = None
+# 是否已注册配置变化的回调（首次创建限流器时注册）
+_rate_limit_listening = False
+
+# 多进程编码时每个进程只使用 1/_rate_limit_share 的配额
+_rate_limit_share = 1
+
+
+def getRateLimiter():
+    """获取全局共享的自适应限流器"""
+    global _rate_limiter, _rate_limit_config, _rate_limit_listening
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limit_config = rateLimitConfig(getConfig())
+            rpm, tpm = _rate_limit_config
+            _rate_limiter = AdaptiveRateLimiter(rpm=_share(rpm), tpm=_share(tpm))
+            # 创建限流器时才注册，只导入本模块不会读取或创建配置文件
+            if not _rate_limit_listening:
+                onConfigChanged(rateLimitConfigChanged)
+                _rate_limit_listening = True
+        return _rate_limiter
+
+
+def rateLimitConfig(config):
+    return (config.getint("RateLimit", "requests_per_minute", fallback=0),
+            config.getint("RateLimit", "tokens_per_minute", fallback=0))
+
+
+def _share(limit):
+    if limit <= 0:
+        return limit
+    return max(limit // _rate_limit_share, 1)
+
+
+def setRateLimitShare(share):
+    """多个进程共用同一份配额时，每个进程按 share 等分上限，并丢弃已有的限流器"""
+    global _rate_limiter, _rate_limit_share
+    with _rate_limiter_lock:
+        _rate_limit_share = max(int(share), 1)
+        _rate_limiter = None
+
+
+def resetRateLimiter():
+    """丢弃全局限流器，下次获取时按最新配置重新创建"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        _rate_limiter = None
+
+
+def rateLimitConfigChanged(config):
+    """修改 [RateLimit] 后丢弃全局限流器，下一次编码按新的配置创建；正在进行的编码继续使用原来的限流器"""
+    if _rate_limiter is not None and rateLimitConfig(config) != _rate_limit_config:
+        resetRateLimiter()
+
+
+class TokenBucket:
+    """令牌桶：按每分钟速率连续补充，允许短时间内的突发"""
+
+    def __init__(self, rate_per_minute, burst_seconds=10):
+        self.burst_seconds = burst_seconds
+        self.rate = None
+        self.capacity = 0
+        self.balance = 0
+        self.updated_at = time.monotonic()
+        self.set_rate(rate_per_minute)
+        self.balance = self.capacity
+
+    def set_rate(self, rate_per_minute):
+        """调整补充速率，None 表示不限速"""
+        self._refill(time.monotonic())
+        if not rate_per_minute:
+            self.rate = None
+            return
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(self.rate * self.burst_seconds, 1.0)
+        self.balance = min(self.balance, self.capacity)
+
+    def _refill(self, now):
+        if self.rate is not None:
+            self.balance = min(self.capacity, self.balance + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self, amount, now):
+        """预留配额并返回需要等待的秒数，余额允许为负（即预支后续配额）"""
+        if self.rate is None:
+            return 0.0
+        self._refill(now)
+        self.balance -= amount
+        if self.balance >= 0:
+            return 0.0
+        return -self.balance / self.rate
+
+    def refund(self, amount):
+        """归还（或追加扣除）配额，用于按实际用量修正预估"""
+        if self.rate is not None:
+            self.balance = min(self.capacity, self.balance + amount)
+
+
+class AdaptiveRateLimiter:
+    """按请求数和 token 数限流的自适应限流器（AIMD）
+
+    - 遇到 429 时乘性减速，并在 Retry-After 指定的时间内暂停所有请求
+    - 请求成功时按时间线性加速，直至配置的上限
+    - 上限为 0 表示未知，此时在首次 429 之前不限速
+    """
+
+    def __init__(self, rpm=0, tpm=0, decrease=0.5, increase_per_minute=0.1, min_rpm=1):
+        self.lock = threading.Lock()
+        self.rpm_limit = rpm or None
+        self.tpm_limit = tpm or None
+        self.decrease = decrease
+        self.increase_per_minute = increase_per_minute
+        self.min_rpm = min_rpm
+
+        self.current_rpm = self.rpm_limit
+        self.current_tpm = self.tpm_limit
+        # 上限未知时，以触发 429 时的速率作为加速的参考值
+        self.reference_rpm = self.rpm_limit
+        self.reference_tpm = self.tpm_limit
+
+        self.request_bucket = TokenBucket(self.current_rpm)
+        self.token_bucket = TokenBucket(self.current_tpm)
+        self.pause_until = 0.0
+        self.last_adjust = time.monotonic()
+
+        # 最近一分钟的请求记录，用于估算实际速率
+        self.history = deque()
+        self.rate_limited_count = 0
+
+    def _observe(self, now, tokens):
+        self.history.append((now, tokens))
+        while self.history and now - self.history[0][0] > 60:
+            self.history.popleft()
+
+    def _observed_rates(self, now):
+        """按最近一分钟的记录换算出每分钟的请求数和 token 数"""
+        if not self.history:
+            return self.min_rpm, 1
+        span_minutes = max(now - self.history[0][0], 1.0) / 60.0
+        requests = len(self.history) / span_minutes
+        tokens = sum(item[1] for item in self.history) / span_minutes
+        return max(requests, self.min_rpm), max(tokens, 1)
+
+    def reserve(self, tokens=0):
+        """非阻塞地预留一次请求的配额，返回需要等待的秒数"""
+        with self.lock:
+            now = time.monotonic()
+            self._observe(now, tokens)
+            wait = max(self.pause_until - now, 0.0)
+            wait = max(wait, self.request_bucket.reserve(1, now))
+            wait = max(wait, self.token_bucket.reserve(tokens, now))
+            return wait
+
+    def _remaining(self, deadline):
+        return max(deadline, self.pause_until) - time.monotonic()
+
+    def acquire(self, tokens=0, stop_event=None):
+        """阻塞等待直到配额可用，收到停止信号时返回 False"""
+        deadline = time.monotonic() + self.reserve(tokens)
+        remaining = self._remaining(deadline)
+        while remaining > 0:
+            if stop_event is not None:
+                if stop_event.wait(min(remaining, 0.5)):
+                    return False
+            else:
+                time.sleep(min(remaining, 0.5))
+            remaining = self._remaining(deadline)
+        return True
+
+    async def acquire_async(self, tokens=0, stop_event=None):
+        """acquire 的异步版本"""
+        deadline = time.monotonic() + self.reserve(tokens)
+        remaining = self._remaining(deadline)
+        while remaining > 0:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            await asyncio.sleep(min(remaining, 0.5))
+            remaining = self._remaining(deadline)
+        return True
+
+    def on_success(self, reserved_tokens=0, used_tokens=None):
+        """请求成功：按实际用量修正 token 配额，并线性提升速率"""
+        with self.lock:
+            if used_tokens is not None:
+                self.token_bucket.refund(reserved_tokens - used_tokens)
+            now = time.monotonic()
+            elapsed_minutes = (now - self.last_adjust) / 60.0
+            self.last_adjust = now
+            if self.current_rpm is not None and self.reference_rpm is not None:
+                self.current_rpm = self._increase(self.current_rpm, self.reference_rpm, self.rpm_limit, elapsed_minutes)
+                self.request_bucket.set_rate(self.current_rpm)
+            if self.current_tpm is not None and self.reference_tpm is not None:
+                self.current_tpm = self._increase(self.current_tpm, self.reference_tpm, self.tpm_limit, elapsed_minutes)
+                self.token_bucket.set_rate(self.current_tpm)
+
+    def _increase(self, current, reference, limit, elapsed_minutes):
+        value = current + reference * self.increase_per_minute * elapsed_minutes
+        return min(value, limit) if limit is not None else value
+
+    def on_rate_limited(self, retry_after=None):
+        """收到 429：乘性减速，并按 Retry-After 暂停所有请求"""
+        with self.lock:
+            now = time.monotonic()
+            self.rate_limited_count += 1
+            observed_rpm, observed_tpm = self._observed_rates(now)
+
+            base_rpm = min(self.current_rpm, observed_rpm) if self.current_rpm is not None else observed_rpm
+            self.current_rpm = max(base_rpm * self.decrease, self.min_rpm)
+            if self.reference_rpm is None or self.rpm_limit is None:
+                self.reference_rpm = base_rpm
+            self.request_bucket.set_rate(self.current_rpm)
+
+            # 无法区分触发的是请求数限制还是 token 数限制，两者同时减速
+            base_tpm = min(self.current_tpm, observed_tpm) if self.current_tpm is not None else observed_tpm
+            self.current_tpm = max(base_tpm * self.decrease, 1)
+            if self.reference_tpm is None or self.tpm_limit is None:
+                self.reference_tpm = base_tpm
+            self.token_bucket.set_rate(self.current_tpm)
+
+            if retry_after:
+                self.pause_until = max(self.pause_until, now + retry_after)
+            self.last_adjust = now
+
+    def stats(self):
+        """当前限流状态，用于日志输出"""
+        with self.lock:
+            return {
+                'current_rpm': round(self.current_rpm, 1) if self.current_rpm is not None else None,
+                'current_tpm': round(self.current_tpm) if self.current_tpm is not None else None,
+                'rate_limited_count': self.rate_limited_count,
+            }
@@ -0,0 +1,148 @@
+import numbers
+
+
+def normalizeReplyId(value):
+    """统一回帖 ID 的类型：空值返回 None，整数值的浮点数（pandas 读取含空值的列）转为 int"""
+    value_type = type(value)
+    if value_type is int:
+        return value
+    if value_type is float:
+        return int(value) if value.is_integer() else (None if value != value else value)
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if value == '':
+            return None
+        try:
+            return int(value)
+        except ValueError:
+            return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    if isinstance(value, numbers.Real):
+        if value != value:  # NaN
+            return None
+        if float(value).is_integer():
+            return int(value)
+    return value
+
+
+class ReplyTree:
+    """回帖树索引：根据 reply_id / to_reply_id 一次性（O(n)）建立任意深度的回复关系
+
+    - 父回帖不存在（或属于其他话题）的回帖视为孤立回帖，作为所在话题中一棵树的根
+    - 回复关系中出现环时，在环上选择一个回帖断开，作为新的根
+    - 重复的 reply_id 只保留第一次出现的记录
+    """
+
+    def __init__(self, reply_ids, to_reply_ids, topic_ids=None):
+        self.order = []
+        self.parent = {}
+        self.children = {}
+        self.topic = {}
+        self.orphans = []
+        self.cycles = []
+
+        if topic_ids is None:
+            topic_ids = [None] * len(reply_ids)
+
+        declared_parent = {}
+        for reply_id, to_reply_id, topic_id in zip(reply_ids, to_reply_ids, topic_ids):
+            reply_id = normalizeReplyId(reply_id)
+            if reply_id is None or reply_id in declared_parent:
+                continue
+            self.order.append(reply_id)
+            declared_parent[reply_id] = normalizeReplyId(to_reply_id)
+            self.topic[reply_id] = normalizeReplyId(topic_id)
+            self.children[reply_id] = []
+
+        for reply_id in self.order:
+            parent_id = declared_parent[reply_id]
+            if parent_id is None or parent_id == reply_id:
+                self.parent[reply_id] = None
+            elif parent_id not in self.children or self.topic[parent_id] != self.topic[reply_id]:
+                self.parent[reply_id] = None
+                self.orphans.append(reply_id)
+            else:
+                self.parent[reply_id] = parent_id
+                self.children[parent_id].append(reply_id)
+
+        self.root = {}
+        for reply_id in self.order:
+            self._resolve_root(reply_id)
+        self.roots = [reply_id for reply_id in self.order if self.parent[reply_id] is None]
+
+    @classmethod
+    def from_dataframe(cls, reply_df):
+        """从包含 reply_id、to_reply_id、topic_id 列的 DataFrame 建立索引"""
+        topic_ids = reply_df['topic_id'].to_list() if 'topic_id' in reply_df else None
+        return cls(reply_df['reply_id'].to_list(), reply_df['to_reply_id'].to_list(), topic_ids)
+
+    def _resolve_root(self, reply_id):
+        """沿父回帖向上查找根，同时检测并断开环"""
+        path = []
+        path_set = set()
+        current = reply_id
+        while current not in self.root:
+            if current in path_set:
+                # 出现环：断开 current 与父回帖的关系，使其成为根
+                parent_id = self.parent[current]
+                self.children[parent_id].remove(current)
+                self.parent[current] = None
+                self.root[current] = current
+                self.cycles.append(current)
+                break
+            path.append(current)
+            path_set.add(current)
+            if self.parent[current] is None:
+                break
+            current = self.parent[current]
+
+        for node in reversed(path):
+            parent_id = self.parent[node]
+            self.root[node] = node if parent_id is None else self.root[parent_id]
+
+    def __contains__(self, reply_id):
+        return normalizeReplyId(reply_id) in self.parent
+
+    def __len__(self):
+        return len(self.order)
+
+    def thread_root(self, reply_id):
+        """回帖所在线程的根回帖"""
+        return self.root[normalizeReplyId(reply_id)]
+
+    def topic_roots(self, topic_id):
+        """某个话题下所有线程的根回帖，按原始顺序排列"""
+        topic_id = normalizeReplyId(topic_id)
+        return [reply_id for reply_id in self.roots if self.topic[reply_id] == topic_id]
+
+    def roots_by_topic(self):
+        """话题 -> 根回帖列表"""
+        result = {}
+        for reply_id in self.roots:
+            result.setdefault(self.topic[reply_id], []).append(reply_id)
+        return result
+
+    def iter_subtree(self, reply_id):
+        """先序遍历子树，依次返回 (reply_id, depth)，根的深度为 0"""
+        stack = [(normalizeReplyId(reply_id), 0)]
+        while stack:
+            current, depth = stack.pop()
+            yield current, depth
+            for child_id in reversed(self.children[current]):
+                stack.append((child_id, depth + 1))
+
+    def subtree_ids(self, reply_id):
+        """子树中所有回帖的 ID（含自身），按先序排列"""
+        return [node for node, _ in self.iter_subtree(reply_id)]
+
+    def depth(self, reply_id):
+        """回帖在线程中的深度"""
+        depth = 0
+        current = self.parent[normalizeReplyId(reply_id)]
+        while current is not None:
+            depth += 1
+            current = self.parent[current]
+        return depth
@@ -0,0 +1,202 @@
+import time
+import random
+import asyncio
+import threading
+from src.module.config import getConfig
+
+# 错误类别
+NETWORK_ERROR = "network"       # 网络错误、超时：可重试
+SERVER_ERROR = "server"         # 5xx：可重试
+RATE_LIMIT_ERROR = "rate_limit" # 429：按 Retry-After 重试
+CLIENT_ERROR = "client"         # 其他 4xx：重试也不会成功
+CANCELLED = "cancelled"         # 收到停止信号
+UNKNOWN_ERROR = "unknown"
+
+
+def classifyError(error):
+    """根据 APIError 的状态码和类型对错误分类"""
+    if error.error_type == 'cancelled':
+        return CANCELLED
+    if error.status_code == 0:
+        return NETWORK_ERROR if error.error_type == 'network_error' else UNKNOWN_ERROR
+    if error.status_code == 429:
+        return RATE_LIMIT_ERROR
+    if error.status_code >= 500:
+        return SERVER_ERROR
+    if 400 <= error.status_code < 500:
+        return CLIENT_ERROR
+    return UNKNOWN_ERROR
+
+
+def createRetryComponents(on_state_change=None):
+    """按配置创建一次编码任务使用的重试策略和熔断器"""
+    config = getConfig()
+    policy = RetryPolicy(
+        max_retries=config.getint("Retry", "max_retries", fallback=3),
+        base_delay=config.getfloat("Retry", "base_delay", fallback=1.0),
+        max_delay=config.getfloat("Retry", "max_delay", fallback=60.0),
+    )
+    breaker = CircuitBreaker(
+        failure_threshold=config.getint("Retry", "breaker_threshold", fallback=5),
+        reset_timeout=config.getfloat("Retry", "breaker_timeout", fallback=30.0),
+        on_state_change=on_state_change,
+    )
+    return policy, breaker
+
+
+class RetryPolicy:
+    """按错误类别决定是否重试，退避时间为带完全抖动的指数退避"""
+
+    RETRYABLE = (NETWORK_ERROR, SERVER_ERROR, RATE_LIMIT_ERROR)
+
+    def __init__(self, max_retries=3, base_delay=1.0, max_delay=60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.retry_counts = {}
+
+    def next_delay(self, error, attempt):
+        """返回第 attempt 次失败后的等待秒数，不应重试时返回 None"""
+        error_class = classifyError(error)
+        if error_class not in self.RETRYABLE or attempt >= self.max_retries:
+            return None
+        with self.lock:
+            self.retry_counts[error_class] = self.retry_counts.get(error_class, 0) + 1
+
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        if error_class == RATE_LIMIT_ERROR and error.retry_after:
+            delay = max(delay, error.retry_after)
+        return delay
+
+    def stats(self):
+        """各类错误的重试次数"""
+        with self.lock:
+            return dict(self.retry_counts)
+
+
+class CircuitBreaker:
+    """熔断器：连续失败达到阈值后暂停所有请求，冷却后放行一个探测请求
+
+    只有网络错误和 5xx 计入失败，429 由限流器处理，其余 4xx 与服务可用性无关。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    COUNTED = (NETWORK_ERROR, SERVER_ERROR)
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, on_state_change=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.on_state_change = on_state_change
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.retry_at = 0.0
+        self.probe_in_flight = False
+        self.open_count = 0
+        self.open_seconds = 0.0
+
+    def _transition(self, state, now):
+        """切换状态，返回需要在锁外触发的回调参数"""
+        if self.state == state:
+            return None
+        if state == self.OPEN:
+            self.retry_at = now + self.reset_timeout
+            if self.state == self.CLOSED:
+                self.opened_at = now
+                self.open_count += 1
+        elif state == self.CLOSED:
+            # 从熔断到恢复的整段时间（含半开探测）计入熔断时长
+            self.open_seconds += now - self.opened_at
+        self.state = state
+        return state
+
+    def _notify(self, state):
+        if state is not None and self.on_state_change is not None:
+            self.on_state_change(state, self.reset_timeout)
+
+    def allow(self):
+        """非阻塞检查：返回 0 表示可以发送请求，否则返回建议等待的秒数"""
+        changed = None
+        with self.lock:
+            now = time.monotonic()
+            if self.state == self.CLOSED:
+                return 0.0
+            if self.state == self.OPEN:
+                remaining = self.retry_at - now
+                if remaining > 0:
+                    return remaining
+                changed = self._transition(self.HALF_OPEN, now)
+            if self.probe_in_flight:
+                wait = 0.2
+            else:
+                self.probe_in_flight = True
+                wait = 0.0
+        self._notify(changed)
+        return wait
+
+    def wait(self, stop_event=None):
+        """阻塞等待熔断器放行，收到停止信号时返回 False"""
+        wait = self.allow()
+        while wait > 0:
+            if stop_event is not None:
+                if stop_event.wait(min(wait, 0.5)):
+                    return False
+            else:
+                time.sleep(min(wait, 0.5))
+            wait = self.allow()
+        return True
+
+    async def wait_async(self, stop_event=None):
+        """wait 的异步版本"""
+        wait = self.allow()
+        while wait > 0:
+            if stop_event is not None and stop_event.is_set():
+                return False
+            await asyncio.sleep(min(wait, 0.5))
+            wait = self.allow()
+        return True
+
+    def record_success(self):
+        changed = None
+        with self.lock:
+            self.consecutive_failures = 0
+            self.probe_in_flight = False
+            changed = self._transition(self.CLOSED, time.monotonic())
+        self._notify(changed)
+
+    def record_failure(self, error):
+        changed = None
+        with self.lock:
+            now = time.monotonic()
+            error_class = classifyError(error)
+            if error_class in (CANCELLED, UNKNOWN_ERROR):
+                # 与服务可用性无关，只释放探测名额
+                if self.state == self.HALF_OPEN:
+                    self.probe_in_flight = False
+            elif error_class not in self.COUNTED:
+                # 服务端给出了明确响应（4xx、429），说明服务可达
+                self.consecutive_failures = 0
+                if self.state == self.HALF_OPEN:
+                    self.probe_in_flight = False
+                    changed = self._transition(self.CLOSED, now)
+            else:
+                self.consecutive_failures += 1
+                if self.state == self.HALF_OPEN:
+                    self.probe_in_flight = False
+                    changed = self._transition(self.OPEN, now)
+                elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+                    changed = self._transition(self.OPEN, now)
+        self._notify(changed)
+
+    def stats(self):
+        """熔断次数与累计熔断时长（秒）"""
+        with self.lock:
+            open_seconds = self.open_seconds
+            if self.state != self.CLOSED:
+                open_seconds += time.monotonic() - self.opened_at
+            return {'open_count': self.open_count, 'open_seconds': round(open_seconds, 1)}
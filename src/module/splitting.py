@@ -0,0 +1,153 @@
+import re
+import json
+from src.module.config import getConfig
+from src.module.tokens import estimate_tokens
+
+# prepare_prompt 生成的提示语中，回帖部分的起始标记
+REPLY_MARKER = '\n\n回帖：\n'
+
+# 每条回帖以 "- 用户名(reply_id:xxx)：" 开头
+REPLY_LINE_PATTERN = re.compile(r'^- [^\n]*?\(reply_id:([^)\n]*)\)：', re.M)
+
+CONTEXT_HEADER = '（以下回帖仅作为上下文，无需编码）\n'
+CODING_HEADER = '\n\n（以下为需要编码的回帖）\n'
+TRUNCATED_SUFFIX = '……（内容过长，已截断）'
+
+# 服务端返回的上下文超长错误信息中常见的关键字
+CONTEXT_OVERFLOW_PATTERN = re.compile(
+    r'context[ _]length|maximum context|context window|too many tokens|token limit|prompt is too long|reduce the length',
+    re.I
+)
+
+
+def getMaxPromptTokens():
+    """读取单个请求允许的最大输入 token 数，0 表示不在发送前检查"""
+    return getConfig().getint("Prompt", "max_prompt_tokens", fallback=0)
+
+
+def isContextOverflow(response):
+    """判断接口返回的错误是否为请求体过大或超出模型上下文"""
+    status_code = response.get('status_code')
+    if status_code == 413:
+        return True
+    return status_code == 400 and bool(CONTEXT_OVERFLOW_PATTERN.search(str(response.get('error', ''))))
+
+
+def parse_prompt(prompt_content):
+    """拆出提示语的公共部分（编码表和话题）和各条回帖
+
+    返回 (head, replies)，replies 为 (reply_id, text, thread_start) 列表，
+    thread_start 表示该回帖是否为一个线程的第一条回帖；无法识别时返回 (prompt_content, [])
+    """
+    position = prompt_content.find(REPLY_MARKER)
+    if position == -1:
+        return prompt_content, []
+    body_start = position + len(REPLY_MARKER)
+    head = prompt_content[:body_start]
+    body = prompt_content[body_start:]
+
+    matches = list(REPLY_LINE_PATTERN.finditer(body))
+    replies = []
+    thread_start = True
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(body)
+        raw = body[match.start():end]
+        replies.append((match.group(1).strip(), raw.strip('\n'), thread_start))
+        # 线程之间以空行分隔
+        thread_start = raw.endswith('\n\n')
+    return head, replies
+
+
+def truncate_text(text, max_tokens):
+    """按估算的 token 数截断文本"""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    keep = max(int(len(text) * max_tokens / tokens) - len(TRUNCATED_SUFFIX), 1)
+    while keep > 1 and estimate_tokens(text[:keep] + TRUNCATED_SUFFIX) > max_tokens:
+        keep = int(keep * 0.9)
+    return text[:keep] + TRUNCATED_SUFFIX
+
+
+def split_prompt(prompt_content, max_tokens, overlap=1):
+    """将超长提示语拆分为多段，返回 [(chunk_prompt, coded_reply_ids), ...]
+
+    每段都保留编码表和话题，并附带所在线程的第一条回帖以及前 overlap 条回帖作为上下文；
+    单条回帖本身超出预算时截断该回帖。无法识别回帖结构时返回空列表。
+    """
+    head, replies = parse_prompt(prompt_content)
+    if not replies:
+        return []
+
+    # 每条回帖所在线程的第一条回帖
+    thread_first = []
+    for index, (_, _, thread_start) in enumerate(replies):
+        thread_first.append(index if thread_start or index == 0 else thread_first[index - 1])
+
+    head_tokens = estimate_tokens(head) + estimate_tokens(CONTEXT_HEADER) + estimate_tokens(CODING_HEADER)
+    chunks = []
+    start = 0
+    while start < len(replies):
+        context = []
+        if thread_first[start] < start:
+            context.append(thread_first[start])
+            context.extend(i for i in range(max(start - overlap, thread_first[start] + 1), start))
+        context_lines = [replies[i][1] for i in context]
+        # 上下文占用过多时只保留线程的第一条回帖，并截断到预算的一半以内
+        budget = max_tokens - head_tokens
+        context_tokens = sum(estimate_tokens(line) + 1 for line in context_lines)
+        if context_tokens > budget // 2:
+            context_lines = [truncate_text(context_lines[0], budget // 4)] if context_lines else []
+            context_tokens = sum(estimate_tokens(line) + 1 for line in context_lines)
+        budget -= context_tokens
+
+        lines = []
+        ids = []
+        end = start
+        while end < len(replies):
+            reply_id, text, _ = replies[end]
+            tokens = estimate_tokens(text) + 1
+            if lines and tokens > budget:
+                break
+            if not lines and tokens > budget:
+                text = truncate_text(text, max(budget - 1, 1))
+                tokens = budget
+            lines.append(text)
+            ids.append(reply_id)
+            budget -= tokens
+            end += 1
+
+        if context_lines:
+            chunk = head + CONTEXT_HEADER + '\n'.join(context_lines) + CODING_HEADER + '\n'.join(lines) + '\n\n'
+        else:
+            chunk = head + '\n'.join(lines) + '\n\n'
+        chunks.append((chunk, ids))
+        start = end
+    return chunks
+
+
+def _load_code_list(prompt_code):
+    """从模型输出中取出 JSON 数组"""
+    start = prompt_code.find('[')
+    end = prompt_code.rfind(']')
+    if start == -1 or end < start:
+        raise ValueError("no JSON array in response")
+    return json.loads(prompt_code[start:end + 1])
+
+
+def merge_codes(chunk_codes):
+    """合并各段的编码结果，只保留每段中需要编码的回帖，重复的回帖以先出现的为准
+
+    chunk_codes 为 [(prompt_code, coded_reply_ids), ...]，返回合并后的 JSON 数组字符串
+    """
+    merged = []
+    seen = set()
+    for prompt_code, coded_ids in chunk_codes:
+        coded_ids = set(str(reply_id) for reply_id in coded_ids)
+        for item in _load_code_list(prompt_code):
+            reply_id = str(item.get('reply_id', '')).strip() if isinstance(item, dict) else ''
+            if reply_id not in coded_ids or reply_id in seen:
+                continue
+            seen.add(reply_id)
+            merged.append(item)
+    return json.dumps(merged, ensure_ascii=False)
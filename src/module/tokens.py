@@ -0,0 +1,26 @@
+import re
+import math
+
+# 中日韩字符大致按每字一个 token 计算，其余字符按每 4 个字符一个 token 估算
+CJK_PATTERN = re.compile(r'[　-〿぀-ヿ㐀-䶿一-鿿가-힯＀-￯]')
+
+# 每条消息的格式开销（role、分隔符等）
+MESSAGE_OVERHEAD = 4
+
+# 未指定 max_tokens 时，为模型输出预留的 token 数
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+def estimate_tokens(text):
+    """在本地粗略估算文本的 token 数，不依赖网络和分词器"""
+    if not text:
+        return 0
+    text = str(text)
+    cjk_count = len(CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + math.ceil(other_count / 4)
+
+
+def estimate_messages_tokens(messages):
+    """估算消息列表的输入 token 数"""
+    return sum(estimate_tokens(message.get("content", "")) + MESSAGE_OVERHEAD for message in messages) + 2
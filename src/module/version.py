@@ -1,5 +1,10 @@
 import re
-import requests
+
+VERSION_URL = "https://raw.githubusercontent.com/etShaw-zh/AICodingAssistant-Pro/main/build.spec"
+
+# 检查新版本的超时（连接, 读取）和结果的有效期（秒）
+VERSION_TIMEOUT = (3, 5)
+VERSION_CACHE_TTL = 24 * 3600
 
 
 def currentVersion():
@@ -7,9 +12,10 @@ def currentVersion():
     return current_version
 
 
-def latestVersion():
-    url = "https://raw.githubusercontent.com/etShaw-zh/AICodingAssistant-Pro/main/build.spec"
-    response = requests.get(url)
+def latestVersion(timeout=VERSION_TIMEOUT):
+    import requests
+    response = requests.get(VERSION_URL, timeout=timeout)
+    response.raise_for_status()
     response_text = response.text.split('\n')
 
     version_raw = response_text[-3].strip()
@@ -19,11 +25,12 @@ def latestVersion():
     return latest_version
 
 
-def newVersion():
-    current_version = currentVersion()
-    latest_version = latestVersion()
+def checkLatestVersion(ttl=VERSION_CACHE_TTL):
+    """获取最新版本号：有效期内直接使用本地缓存，否则联网检查；检查失败时返回缓存的旧值（没有时返回 None）"""
+    from src.module.metacache import getMetadataCache
+    return getMetadataCache().fetch('latest_version', latestVersion, ttl)
 
-    if current_version != latest_version:
-        return True
-    else:
-        return False
+
+def newVersion():
+    latest_version = checkLatestVersion()
+    return latest_version is not None and latest_version != currentVersion()
@@ -0,0 +1,48 @@
+from PySide6.QtWidgets import QDialog
+from PySide6.QtCore import Signal
+
+from src.gui.setting import SettingWindow
+from src.function import openFolder
+from src.module.config import localDBFilePath, logFolder, readConfig, writeConfig
+
+class MySettingWindow(QDialog, SettingWindow):
+    save_notice = Signal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.setupUI(self)
+        self.initConnect()
+        self.config = readConfig()
+        self.loadConfig()
+
+    def initConnect(self):
+        self.localDBButton.clicked.connect(self.openLocalDBFilePath)
+        self.logFolderButton.clicked.connect(self.openLogFolder)
+        self.applyButton.clicked.connect(self.saveConfig)  # 保存配置
+        self.cancelButton.clicked.connect(lambda: self.close())  # 关闭窗口
+
+    def loadConfig(self):
+        self.modelType.setText(self.config.get("AICO", "model"))
+        self.modelApiKey.setText(self.config.get("APIkey", "api_key"))
+        self.language.setText(self.config.get("Language", "language"))
+        self.threadCount.setText(self.config.get("Thread", "thread_count"))
+
+    def saveConfig(self):
+        self.config.set("AICO", "model", self.modelType.currentText())
+        self.config.set("APIkey", "api_key", self.modelApiKey.text())
+        self.config.set("Language", "language", self.language.currentText())
+        self.config.set("Thread", "thread_count", self.threadCount.text())
+
+        writeConfig(self.config)
+
+        if self.language.currentText() == 'Chinese':
+            self.save_notice.emit("配置保存成功")
+        else:
+            self.save_notice.emit("Configuration saved successfully")
+        self.close()
+
+    def openLocalDBFilePath(self):
+        openFolder(localDBFilePath())
+
+    def openLogFolder(self):
+        openFolder(logFolder())
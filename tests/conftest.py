@@ -0,0 +1,66 @@
+import os
+import sys
+import sqlite3
+import tempfile
+import threading
+
+import pytest
+
+# 配置文件、数据库和日志写到临时目录，不影响本机的 AICO 配置
+_home = tempfile.mkdtemp(prefix="aico-test-")
+os.environ["HOME"] = _home
+os.environ["APPDATA"] = _home
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.module.config import getConfig, updateConfig  # noqa: E402
+from src.module.fakeapi import FakeCompletionServer  # noqa: E402
+from src.module.localDB import createPromptTable  # noqa: E402
+
+
+@pytest.fixture
+def prompt_db(tmp_path):
+    """带有 prompt 表的临时数据库，返回 (路径, 写入 n 条待处理提示语的函数)"""
+    db_path = str(tmp_path / "aico.db")
+    conn = sqlite3.connect(db_path)
+    createPromptTable(conn)
+    conn.commit()
+    conn.close()
+
+    def add_prompts(count):
+        conn = sqlite3.connect(db_path)
+        conn.executemany(
+            "INSERT INTO prompt (prompt_content) VALUES (?)",
+            [(f"prompt {index}",) for index in range(count)]
+        )
+        conn.commit()
+        conn.close()
+
+    return db_path, add_prompts
+
+
+@pytest.fixture
+def config_option():
+    """临时修改配置项，测试结束后恢复"""
+    original = []
+
+    def set_option(section, option, value):
+        original.append((section, option, getConfig().get(section, option, fallback="")))
+        updateConfig(section, option, str(value))
+
+    yield set_option
+    for section, option, value in reversed(original):
+        updateConfig(section, option, value)
+
+
+@pytest.fixture
+def fake_server(config_option):
+    """在随机端口启动本地兼容 OpenAI 的测试服务，并把 AICO/base_url 指向它"""
+    server = FakeCompletionServer("127.0.0.1", 0, latency=0.01)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    config_option("AICO", "base_url", f"http://127.0.0.1:{server.server_address[1]}/v1")
+    config_option("AICO", "model", "fake-model")
+    yield server
+    server.shutdown()
+    server.server_close()
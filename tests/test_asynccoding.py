@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.module.asynccoding import run_async_coding
+from src.module.aihubmix import aiohttp
+from src.module.localDB import PROMPT_DONE, PROMPT_PENDING
+
+pytestmark = pytest.mark.skipif(aiohttp is None, reason="aiohttp is not installed")
+
+
+class Output:
+    """收集日志输出，代替界面的 output_signal"""
+
+    def __init__(self):
+        self.lines = []
+
+    def emit(self, line):
+        self.lines.append(line)
+
+
+def statuses(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT status, attempts FROM prompt ORDER BY "index"').fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def async_engine(fake_server, config_option):
+    config_option("Engine", "mode", "async")
+    config_option("Cache", "bypass", "True")
+    return fake_server
+
+
+def test_worker_thread_codes_every_row(prompt_db, async_engine):
+    from src.gui.worker import AICodingWorkerThread
+
+    db_path, add_prompts = prompt_db
+    add_prompts(20)
+    worker = AICodingWorkerThread(-1)
+    worker.DATABASE_PATH = db_path
+    output, running = [], []
+    worker.output_signal.connect(output.append)
+    worker.running_signal.connect(running.append)
+
+    worker.run()
+
+    assert running == [True, False]
+    assert statuses(db_path) == [(PROMPT_DONE, 1)] * 20
+    assert async_engine.completed == 20
+    assert any("剩余 0 项" in line or "0 items remaining" in line for line in output)
+
+
+def test_stop_returns_in_flight_rows(prompt_db, async_engine, config_option):
+    config_option("Engine", "async_concurrency", "4")
+    async_engine.latency = 0.5
+    db_path, add_prompts = prompt_db
+    add_prompts(20)
+    stop_event = threading.Event()
+    output = Output()
+    thread = threading.Thread(target=run_async_coding, args=(
+        stop_event, output, {}, 1, db_path, "prompt", "prompt_code", -1, ""))
+    thread.start()
+
+    # 等到有请求正在进行时停止
+    deadline = time.monotonic() + 10
+    while async_engine.completed < 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stop_event.set()
+    thread.join(timeout=30)
+    assert not thread.is_alive()
+
+    rows = statuses(db_path)
+    done = [row for row in rows if row[0] == PROMPT_DONE]
+    pending = [row for row in rows if row[0] == PROMPT_PENDING]
+    assert len(done) + len(pending) == 20
+    assert done and pending
+    # 被取消的请求归还后不计入尝试次数
+    assert all(attempts == 0 for _, attempts in pending)
@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import threading
+
+from src.module.config import ConfigStore, initConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_modules_does_not_touch_config(tmp_path):
+    env = dict(os.environ, HOME=str(tmp_path), APPDATA=str(tmp_path))
+    result = subprocess.run(
+        [sys.executable, "-c", "import src.module.cache, src.module.ratelimit, src.module.retry, src.module.jobs"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    assert os.listdir(tmp_path) == []
+
+
+def test_listeners_run_on_the_updating_thread(tmp_path):
+    path = str(tmp_path / "config.ini")
+    initConfig(path)
+    store = ConfigStore(path)
+    calls = []
+    store.subscribe(lambda config: calls.append((threading.current_thread().name, config.get("Thread", "thread_count"))))
+
+    thread = threading.Thread(target=store.update, args=("Thread", "thread_count", "8"), name="coding-worker")
+    thread.start()
+    thread.join()
+    store.flush()
+
+    assert calls == [("coding-worker", "8")]
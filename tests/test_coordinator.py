@@ -0,0 +1,112 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+import requests
+
+from src.module.config import getConfigStore
+from src.module.coordinator import createCoordinatorServer
+from src.module.localDB import PROMPT_DONE, PROMPT_LEASED
+from src.module.ratelimit import getRateLimiter, resetRateLimiter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def coordinator(prompt_db, config_option):
+    """在随机端口运行的协调服务，返回 (服务, 地址, 数据库路径, 写入提示语的函数)"""
+    db_path, add_prompts = prompt_db
+    server = createCoordinatorServer(db_path, "127.0.0.1", 0, token="secret", max_lease=5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}", db_path, add_prompts
+    server.shutdown()
+    server.server_close()
+    server.coordinator.close()
+    resetRateLimiter()
+
+
+def post(url, endpoint, payload, token="secret"):
+    return requests.post(f"{url}/{endpoint}", json=payload, headers={'Authorization': f'Bearer {token}'}, timeout=5)
+
+
+def test_lease_is_clamped_to_max_lease(coordinator):
+    server, url, db_path, add_prompts = coordinator
+    add_prompts(12)
+    response = post(url, "lease", {'size': 1000})
+    assert response.status_code == 200
+    assert [job[0] for job in response.json()['jobs']] == [1, 2, 3, 4, 5]
+    assert post(url, "status", {}).json()['available'] == 7
+
+
+@pytest.mark.parametrize("payload", [{'size': "all"}, {'size': 0}, {'size': -3}, {'size': 1.5}, {'size': True}, [1]])
+def test_invalid_lease_is_rejected(coordinator, payload):
+    server, url, db_path, add_prompts = coordinator
+    add_prompts(2)
+    response = post(url, "lease", payload)
+    assert response.status_code == 400
+    assert post(url, "status", {}).json()['available'] == 2
+
+
+def test_invalid_body_and_token(coordinator):
+    server, url, db_path, add_prompts = coordinator
+    response = requests.post(f"{url}/lease", data=b"{not json", headers={'Authorization': 'Bearer secret'}, timeout=5)
+    assert response.status_code == 400
+    assert post(url, "lease", {'size': 1}, token="wrong").status_code == 401
+
+
+def test_lease_after_close_returns_no_jobs(coordinator):
+    server, url, db_path, add_prompts = coordinator
+    add_prompts(2)
+    server.coordinator.job_queue.close()
+    assert server.coordinator.lease({'size': 2}) == {'jobs': []}
+
+
+def test_workers_share_queue_and_rate_limit(coordinator, fake_server, config_option):
+    server, url, db_path, add_prompts = coordinator
+    count = 16
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        "INSERT INTO prompt (prompt_content) VALUES (?)",
+        [(f"回帖：\n- user(reply_id:{index})：{uuid.uuid4()}\n\n",) for index in range(count)]
+    )
+    conn.commit()
+    conn.close()
+
+    # 每分钟 60 个请求：令牌桶可突发 10 个，之后每秒 1 个。
+    # 两个节点若各自限流，16 个请求不需要等待；共用协调服务的配额时至少需要约 6 秒
+    config_option("RateLimit", "requests_per_minute", "60")
+    config_option("Cache", "bypass", "True")
+    resetRateLimiter()
+    server.coordinator.rate_limiter = getRateLimiter()
+    getConfigStore().flush()
+
+    started = time.monotonic()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "cli.py"), "worker", "--coordinator", url, "--token", "secret", "--threads", "4"],
+            cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+        )
+        for _ in range(2)
+    ]
+    outputs = [worker.communicate(timeout=120)[0].decode("utf-8", "replace") for worker in workers]
+    elapsed = time.monotonic() - started
+
+    assert [worker.returncode for worker in workers] == [0, 0], outputs
+    server.coordinator.db_writer.flush()
+    conn = sqlite3.connect(db_path)
+    statuses = [row[0] for row in conn.execute("SELECT status FROM prompt")]
+    conn.close()
+    assert statuses == [PROMPT_DONE] * count
+    assert fake_server.completed == count
+
+    # 两个节点都连接了协调服务，所有请求都经过协调服务的同一个限流器
+    assert len(server.coordinator.workers) == 2
+    assert len(server.coordinator.rate_limiter.history) == count
+    assert elapsed >= 5
+    assert PROMPT_LEASED not in statuses
@@ -0,0 +1,158 @@
+import sqlite3
+import time
+
+import pytest
+
+from src.module import dbwriter
+from src.module.dbwriter import DBWriter, ResultWriteError
+from src.module.localDB import PROMPT_DONE, PROMPT_LEASED, PROMPT_PENDING
+
+
+@pytest.fixture
+def leased_db(prompt_db):
+    """10 条已被领取（租约中）的数据"""
+    db_path, add_prompts = prompt_db
+    add_prompts(10)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE prompt SET status = ?, attempts = 1", (PROMPT_LEASED,))
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def done_ids(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[0] for row in conn.execute('SELECT "index" FROM prompt WHERE status = ? ORDER BY "index"', (PROMPT_DONE,))]
+    finally:
+        conn.close()
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.02)
+    return condition()
+
+
+def test_commits_when_batch_is_full(leased_db):
+    writer = DBWriter(leased_db, batch_size=3, flush_interval=60)
+    try:
+        for prompt_id in (1, 2, 3, 4):
+            writer.submit("[]", "{}", prompt_id)
+        assert wait_for(lambda: done_ids(leased_db) == [1, 2, 3])
+        # 不足一批且未到时间的结果暂不提交
+        time.sleep(0.2)
+        assert done_ids(leased_db) == [1, 2, 3]
+    finally:
+        writer.close()
+    assert done_ids(leased_db) == [1, 2, 3, 4]
+    assert writer.written == 4
+
+
+def test_commits_after_flush_interval(leased_db):
+    writer = DBWriter(leased_db, batch_size=100, flush_interval=0.2)
+    try:
+        started = time.monotonic()
+        writer.submit("[]", "{}", 1)
+        assert wait_for(lambda: done_ids(leased_db) == [1])
+        assert time.monotonic() - started >= 0.15
+    finally:
+        writer.close()
+
+
+def test_flush_waits_for_pending_results(leased_db):
+    writer = DBWriter(leased_db, batch_size=100, flush_interval=60)
+    try:
+        writer.submit("[]", "{}", 5)
+        assert writer.flush() is True
+        assert done_ids(leased_db) == [5]
+    finally:
+        writer.close()
+
+
+def test_results_get_increasing_coded_seq(leased_db):
+    writer = DBWriter(leased_db, batch_size=100, flush_interval=60)
+    for prompt_id in (3, 1, 2):
+        writer.submit("[]", "{}", prompt_id)
+        writer.flush()
+    writer.close()
+    conn = sqlite3.connect(leased_db)
+    seqs = dict(conn.execute('SELECT "index", coded_seq FROM prompt WHERE coded_seq IS NOT NULL'))
+    conn.close()
+    assert seqs == {3: 1, 1: 2, 2: 3}
+
+
+def test_late_result_does_not_overwrite_reclaimed_row(leased_db):
+    conn = sqlite3.connect(leased_db)
+    # 第 1 条租约过期后回到待处理，第 2 条已由其他工作线程完成
+    conn.execute('UPDATE prompt SET status = ? WHERE "index" = 1', (PROMPT_PENDING,))
+    conn.execute('UPDATE prompt SET status = ?, prompt_code = ?, coded_seq = 7 WHERE "index" = 2', (PROMPT_DONE, "other"))
+    conn.commit()
+
+    writer = DBWriter(leased_db)
+    for prompt_id in (1, 2, 3):
+        writer.submit("late", "{}", prompt_id)
+    writer.close()
+
+    rows = conn.execute('SELECT status, prompt_code, coded_seq FROM prompt WHERE "index" <= 3 ORDER BY "index"').fetchall()
+    conn.close()
+    assert rows == [(PROMPT_PENDING, "None", None), (PROMPT_DONE, "other", 7), (PROMPT_DONE, "late", 8)]
+    assert writer.written == 1
+    assert writer.skipped == 2
+
+
+def test_failed_batch_is_retried(leased_db, monkeypatch):
+    monkeypatch.setattr(dbwriter, "RETRY_INTERVAL", 0.05)
+    errors = []
+    writer = DBWriter(leased_db, batch_size=100, flush_interval=60, on_error=errors.append)
+    write = writer._write
+    calls = []
+
+    def flaky_write(batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return write(batch)
+
+    writer._write = flaky_write
+    try:
+        writer.submit("[]", "{}", 1)
+        assert writer.flush() is False
+        assert writer.unwritten and done_ids(leased_db) == []
+        assert [type(error) for error in errors] == [sqlite3.OperationalError]
+
+        # 重试时连同新提交的结果一起写入
+        writer.submit("[]", "{}", 2)
+        time.sleep(0.1)
+        assert writer.flush() is True
+        assert done_ids(leased_db) == [1, 2]
+        assert calls == [1, 2]
+    finally:
+        writer.close()
+
+
+def test_close_raises_for_unwritten_results(leased_db, monkeypatch):
+    monkeypatch.setattr(dbwriter, "RETRY_INTERVAL", 0.05)
+    writer = DBWriter(leased_db, batch_size=100, flush_interval=60, on_error=lambda error: None)
+
+    def broken_write(batch):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    writer._write = broken_write
+    writer.submit("[]", "{}", 1)
+    writer.submit("[]", "{}", 2)
+
+    with pytest.raises(ResultWriteError) as raised:
+        writer.close()
+    assert [result[3] for result in raised.value.results] == [1, 2]
+    assert done_ids(leased_db) == []
+    # 再次调用 close 不会重复抛出
+    writer.close()
+
+
+def test_submit_after_close_writes_directly(leased_db):
+    writer = DBWriter(leased_db)
+    writer.close()
+    writer.submit("[]", "{}", 4)
+    assert done_ids(leased_db) == [4]
@@ -0,0 +1,32 @@
+import json
+
+from src.module.aihubmix import AiHubMixAPI, GZIP_MIN_SIZE
+
+PROMPT = "回帖：\n" + "\n".join(f"- user(reply_id:{index})：{'reply content ' * 10}" for index in range(1, 11))
+
+
+def chat(prompt):
+    api = AiHubMixAPI()
+    return api, api.chat_completion("fake-model", [{"role": "user", "content": prompt}])
+
+
+def test_completion_codes_every_reply(fake_server):
+    _, response = chat(PROMPT)
+    codes = json.loads(response['choices'][0]['message']['content'])
+    assert [item['reply_id'] for item in codes] == [str(index) for index in range(1, 11)]
+    assert fake_server.gzip_requests == 0
+
+
+def test_gzip_request_body_is_decoded(fake_server, config_option):
+    config_option("Network", "gzip_request", "True")
+    assert len(PROMPT.encode('utf-8')) >= GZIP_MIN_SIZE
+
+    api, response = chat(PROMPT)
+    assert api.gzip_request
+    codes = json.loads(response['choices'][0]['message']['content'])
+    assert len(codes) == 10
+    assert fake_server.gzip_requests == 1
+
+    # 小于 GZIP_MIN_SIZE 的请求体不压缩
+    chat("回帖：\n- user(reply_id:1)：short")
+    assert fake_server.gzip_requests == 1
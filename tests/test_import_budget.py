@@ -0,0 +1,68 @@
+"""检查启动时的导入耗时和导入的模块
+
+启动界面只需要 src.core，pandas、requests 以及手动编码、关于、设置窗口都应在首次使用时才导入。
+预算默认为 3 秒，可通过环境变量 IMPORT_BUDGET_SECONDS 调整。
+"""
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+STARTUP_MODULE = "src.core"
+
+# 启动时不应导入的模块
+DEFERRED_MODULES = (
+    "pandas",
+    "requests",
+    "aiohttp",
+    "pyarrow",
+    "src.mainwindow",
+    "src.aboutwindow",
+    "src.settingwindow",
+    "src.gui.about",
+    "src.gui.setting",
+    "src.gui.mainwindow",
+    "src.module.coding",
+    "src.module.aihubmix",
+)
+
+# python -X importtime 输出：import time: self [us] | cumulative | imported package
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def imported():
+    """在新的解释器中导入 src.core，返回 {模块名: 累计导入耗时（微秒）}"""
+    pytest.importorskip("PySide6")
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {STARTUP_MODULE}"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2))
+    return modules
+
+
+def slowest(modules, count=15):
+    return "\n".join(f"{cumulative / 1e6:8.3f}s  {name}"
+                     for name, cumulative in sorted(modules.items(), key=lambda item: item[1], reverse=True)[:count])
+
+
+def test_deferred_modules_are_not_imported_at_startup(imported):
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+    assert not eager, f"imported at startup but should load on first use: {', '.join(eager)}"
+
+
+def test_startup_import_time_within_budget(imported):
+    budget = float(os.environ.get("IMPORT_BUDGET_SECONDS", 3.0))
+    total = imported[STARTUP_MODULE] / 1e6
+    assert total <= budget, f"import {STARTUP_MODULE}: {total:.3f}s exceeds the {budget:.3f}s budget\n{slowest(imported)}"
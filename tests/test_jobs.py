@@ -0,0 +1,203 @@
+import sqlite3
+import threading
+import time
+
+from src.module.jobs import JobQueue, JobFeeder, requeueFailed
+from src.module.localDB import PROMPT_PENDING, PROMPT_LEASED, PROMPT_FAILED
+
+
+def statuses(db_path):
+    """按 index 顺序返回 [(status, attempts), ...]"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT status, attempts FROM prompt ORDER BY "index"').fetchall()
+    finally:
+        conn.close()
+
+
+def test_claim_leases_rows_in_order(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(5)
+    queue = JobQueue(db_path)
+    try:
+        first = queue.claim(3)
+        second = queue.claim(3)
+        assert [row[0] for row in first] == [1, 2, 3]
+        assert [row[1] for row in first] == ["prompt 0", "prompt 1", "prompt 2"]
+        assert [row[0] for row in second] == [4, 5]
+        assert queue.claim(3) == []
+        assert queue.available() == 0
+        assert statuses(db_path) == [(PROMPT_LEASED, 1)] * 5
+    finally:
+        queue.close()
+
+
+def test_release_returns_rows_without_counting_attempt(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(2)
+    queue = JobQueue(db_path)
+    try:
+        queue.release(row[0] for row in queue.claim(2))
+        assert statuses(db_path) == [(PROMPT_PENDING, 0)] * 2
+        assert queue.available() == 2
+    finally:
+        queue.close()
+
+
+def test_expired_lease_is_reclaimed(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(2)
+    crashed = JobQueue(db_path, lease_seconds=-1)
+    crashed.claim(2)
+    crashed.close()
+
+    queue = JobQueue(db_path)
+    try:
+        assert queue.available() == 2
+        assert [row[0] for row in queue.claim(5)] == [1, 2]
+        assert queue.reclaimed == 2
+        assert statuses(db_path) == [(PROMPT_LEASED, 2)] * 2
+    finally:
+        queue.close()
+
+
+def test_unexpired_lease_is_not_reclaimed(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(1)
+    other = JobQueue(db_path)
+    other.claim(1)
+    queue = JobQueue(db_path)
+    try:
+        assert queue.claim(1) == []
+        assert queue.reclaimed == 0
+    finally:
+        queue.close()
+        other.close()
+
+
+def test_fail_moves_to_dead_letter_after_max_attempts(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(1)
+    queue = JobQueue(db_path, max_attempts=2)
+    try:
+        (prompt_id, _), = queue.claim(1)
+        assert queue.fail(prompt_id, "timeout") is False
+        assert statuses(db_path) == [(PROMPT_PENDING, 1)]
+
+        (prompt_id, _), = queue.claim(1)
+        assert queue.fail(prompt_id, "timeout") is True
+        assert statuses(db_path) == [(PROMPT_FAILED, 2)]
+        assert queue.claim(1) == []
+        # 不是本队列领取的数据不会被标记
+        assert queue.fail(prompt_id, "timeout") is False
+    finally:
+        queue.close()
+
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT last_error FROM prompt").fetchone()[0] == "timeout"
+    conn.close()
+
+
+def test_dead_letter_queue_claims_only_failed_rows(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(2)
+    queue = JobQueue(db_path, max_attempts=1)
+    try:
+        (prompt_id, _), _ = queue.claim(2)
+        assert queue.fail(prompt_id) is True
+    finally:
+        queue.close()
+
+    dead_letter = JobQueue(db_path, dead_letter=True)
+    try:
+        assert dead_letter.available() == 1
+        assert [row[0] for row in dead_letter.claim(5)] == [prompt_id]
+        # 重新编码死信时失败一次即回到死信
+        assert dead_letter.fail(prompt_id) is True
+        assert statuses(db_path)[0] == (PROMPT_FAILED, 1)
+    finally:
+        dead_letter.close()
+
+
+def test_requeue_failed(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(3)
+    queue = JobQueue(db_path, max_attempts=1)
+    try:
+        for prompt_id, _ in queue.claim(2):
+            queue.fail(prompt_id, "bad request")
+    finally:
+        queue.close()
+
+    assert requeueFailed(db_path) == 2
+    assert requeueFailed(db_path) == 0
+    assert statuses(db_path) == [(PROMPT_PENDING, 0)] * 3
+
+
+def test_closed_queue_claims_nothing(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(1)
+    queue = JobQueue(db_path)
+    queue.close()
+    assert queue.claim(1) == []
+    assert queue.available() == 0
+    queue.release([1])
+    assert statuses(db_path) == [(PROMPT_PENDING, 0)]
+
+
+def test_feeder_delivers_every_row_once(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(10)
+    queue = JobQueue(db_path)
+    feeder = JobFeeder(queue, threading.Event(), prefetch=4, batch_size=3, total=10).start()
+    try:
+        records = []
+        deadline = time.monotonic() + 10
+        while not feeder.done() and time.monotonic() < deadline:
+            record = feeder.get()
+            if record is not None:
+                records.append(record)
+        assert sorted(record[0] for record in records) == list(range(1, 11))
+        assert feeder.remaining() == 0
+    finally:
+        queue.close()
+
+
+def test_feeder_respects_limit(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(10)
+    queue = JobQueue(db_path)
+    stop_event = threading.Event()
+    feeder = JobFeeder(queue, stop_event, prefetch=16, batch_size=4, limit=6).start()
+    try:
+        feeder.thread.join(timeout=10)
+        assert feeder.claimed == 6
+        assert feeder.buffer.qsize() == 6
+        stop_event.set()
+        assert feeder.drain() == 6
+    finally:
+        queue.close()
+
+
+def test_feeder_drain_releases_unprocessed_rows(prompt_db):
+    db_path, add_prompts = prompt_db
+    add_prompts(10)
+    queue = JobQueue(db_path)
+    stop_event = threading.Event()
+    feeder = JobFeeder(queue, stop_event, prefetch=4, batch_size=2, total=10).start()
+    try:
+        deadline = time.monotonic() + 10
+        while feeder.buffer.qsize() < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        taken = feeder.get()
+        assert taken is not None
+        stop_event.set()
+
+        # 队列中剩余的数据由 drain 归还，已领取但未放入队列的数据由预取线程归还
+        assert feeder.drain() >= 3
+        rows = statuses(db_path)
+        assert rows[taken[0] - 1] == (PROMPT_LEASED, 1)
+        assert sum(status == PROMPT_LEASED for status, _ in rows) == 1
+        assert queue.available() == 9
+    finally:
+        queue.close()
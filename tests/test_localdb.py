@@ -0,0 +1,106 @@
+import sqlite3
+
+import pytest
+
+from src.module import localDB
+from src.module.localDB import migratePromptTable, PROMPT_PENDING, PROMPT_DONE
+
+BASELINE_ROWS = [
+    (0, "prompt 0", "None", "None"),
+    (1, "prompt 1", '[{"reply_id": "1"}]', '{"id": "x"}'),
+    (2, "prompt 2", None, None),
+]
+
+
+def baseline_table(conn, rows=BASELINE_ROWS, name="prompt"):
+    """旧版由 to_sql 生成的 prompt 表：没有主键和状态列，未编码的数据 prompt_code 为 'None'"""
+    conn.execute(f"""
+    CREATE TABLE '{name}' (
+        'index' INTEGER,
+        'prompt_content' TEXT,
+        'prompt_code' TEXT,
+        'prompt_code_orign' TEXT
+    )
+    """)
+    conn.executemany(f"INSERT INTO '{name}' VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+
+
+def tables(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def rows(conn):
+    return conn.execute(
+        'SELECT "index", prompt_content, prompt_code, status, attempts, coded_seq FROM prompt ORDER BY "index"'
+    ).fetchall()
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "aico.db"))
+    yield conn
+    conn.close()
+
+
+def test_migrates_baseline_rows(conn):
+    baseline_table(conn)
+    assert migratePromptTable(conn) is True
+
+    assert rows(conn) == [
+        (0, "prompt 0", "None", PROMPT_PENDING, 0, None),
+        (1, "prompt 1", '[{"reply_id": "1"}]', PROMPT_DONE, 0, None),
+        (2, "prompt 2", "None", PROMPT_PENDING, 0, None),
+    ]
+    assert tables(conn) == {"prompt"}
+    assert conn.isolation_level == ""
+
+
+def test_second_migration_is_noop(conn):
+    baseline_table(conn)
+    migratePromptTable(conn)
+    conn.execute("UPDATE prompt SET attempts = 2 WHERE \"index\" = 0")
+    conn.commit()
+    before = rows(conn)
+
+    assert migratePromptTable(conn) is False
+    assert rows(conn) == before
+
+
+def test_duplicate_index_is_renumbered(conn):
+    baseline_table(conn, [(0, "a", "None", "None"), (0, "b", "None", "None")])
+    migratePromptTable(conn)
+    assert [row[:2] for row in rows(conn)] == [(1, "a"), (2, "b")]
+
+
+def test_failure_rolls_back(conn, monkeypatch):
+    baseline_table(conn)
+
+    def fail(conn):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    monkeypatch.setattr(localDB, "createPromptTable", fail)
+    with pytest.raises(sqlite3.OperationalError):
+        migratePromptTable(conn)
+
+    # 表名、结构和数据都保持原样
+    assert tables(conn) == {"prompt"}
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(prompt)")]
+    assert columns == ["index", "prompt_content", "prompt_code", "prompt_code_orign"]
+    assert conn.execute('SELECT * FROM prompt ORDER BY "index"').fetchall() == BASELINE_ROWS
+    assert not conn.in_transaction
+
+    monkeypatch.undo()
+    assert migratePromptTable(conn) is True
+    assert len(rows(conn)) == 3
+
+
+def test_recovers_interrupted_migration(conn):
+    # 旧版本的迁移在改名、建表之后退出：数据留在 prompt_old，prompt 为空
+    baseline_table(conn, name="prompt_old")
+    localDB.createPromptTable(conn)
+    conn.commit()
+
+    assert migratePromptTable(conn) is True
+    assert tables(conn) == {"prompt"}
+    assert [row[3] for row in rows(conn)] == [PROMPT_PENDING, PROMPT_DONE, PROMPT_PENDING]
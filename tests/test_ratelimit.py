@@ -0,0 +1,94 @@
+import threading
+
+import pytest
+
+from src.module.ratelimit import AdaptiveRateLimiter, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_waits():
+    bucket = TokenBucket(60, burst_seconds=10)
+    now = bucket.updated_at
+    assert all(bucket.reserve(1, now) == 0 for _ in range(10))
+    assert bucket.reserve(1, now) == pytest.approx(1.0)
+    assert bucket.reserve(1, now + 1) == pytest.approx(1.0)
+
+
+def test_unlimited_until_first_rate_limit():
+    limiter = AdaptiveRateLimiter()
+    assert all(limiter.reserve(100) == 0 for _ in range(50))
+    assert limiter.stats()['current_rpm'] is None
+
+
+def test_backoff_halves_rate_and_pauses():
+    limiter = AdaptiveRateLimiter(rpm=60, tpm=100000)
+    for _ in range(10):
+        limiter.reserve(10)
+    limiter.on_rate_limited(retry_after=5)
+
+    assert limiter.current_rpm == pytest.approx(30)
+    # 实际用量（一秒内 100 个 token，折合 6000/分钟）低于上限时，从实际速率减半
+    assert limiter.current_tpm == pytest.approx(3000)
+    assert limiter.rate_limited_count == 1
+    # Retry-After 期间所有请求都要等待
+    assert limiter.reserve(10) >= 4.9
+
+
+def test_backoff_does_not_go_below_min_rpm():
+    limiter = AdaptiveRateLimiter(rpm=4, min_rpm=1)
+    for _ in range(5):
+        limiter.on_rate_limited()
+    assert limiter.current_rpm == 1
+
+
+def test_backoff_with_unknown_limit_uses_observed_rate():
+    limiter = AdaptiveRateLimiter()
+    for _ in range(20):
+        limiter.reserve(0)
+    limiter.on_rate_limited()
+
+    # 一秒内 20 次请求折合 1200 次/分钟
+    assert limiter.reference_rpm == pytest.approx(1200)
+    assert limiter.current_rpm == pytest.approx(600)
+
+
+def test_ramp_up_is_linear_and_capped():
+    limiter = AdaptiveRateLimiter(rpm=60, increase_per_minute=0.1)
+    for _ in range(10):
+        limiter.reserve()
+    limiter.on_rate_limited()
+    assert limiter.current_rpm == pytest.approx(30)
+
+    limiter.last_adjust -= 120
+    limiter.on_success()
+    assert limiter.current_rpm == pytest.approx(42, abs=0.1)
+
+    limiter.last_adjust -= 6000
+    limiter.on_success()
+    assert limiter.current_rpm == 60
+
+
+def test_ramp_up_with_unknown_limit_has_no_cap():
+    limiter = AdaptiveRateLimiter(increase_per_minute=0.1)
+    for _ in range(20):
+        limiter.reserve()
+    limiter.on_rate_limited()
+
+    limiter.last_adjust -= 6000
+    limiter.on_success()
+    assert limiter.current_rpm == pytest.approx(600 + 1200 * 0.1 * 100, rel=0.01)
+
+
+def test_success_refunds_unused_tokens():
+    limiter = AdaptiveRateLimiter(tpm=600)
+    assert limiter.reserve(100) == 0
+    limiter.on_success(reserved_tokens=100, used_tokens=40)
+    assert limiter.reserve(60) == 0
+    assert limiter.reserve(10) > 0
+
+
+def test_acquire_stops_during_pause():
+    limiter = AdaptiveRateLimiter(rpm=60)
+    limiter.on_rate_limited(retry_after=30)
+    stop_event = threading.Event()
+    threading.Timer(0.1, stop_event.set).start()
+    assert limiter.acquire(stop_event=stop_event) is False
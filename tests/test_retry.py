@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from src.module.aihubmix import APIError
+from src.module.retry import CircuitBreaker, RetryPolicy
+
+NETWORK = APIError(0, 'network_error', "connection reset")
+SERVER = APIError(503, 'service_unavailable', "overloaded")
+RATE_LIMITED = APIError(429, 'rate_limit', "slow down", retry_after=2)
+BAD_REQUEST = APIError(400, 'invalid_request', "bad request")
+CANCELLED = APIError(0, 'cancelled', "stopped")
+
+
+@pytest.fixture
+def changes():
+    return []
+
+
+@pytest.fixture
+def breaker(changes):
+    return CircuitBreaker(failure_threshold=2, reset_timeout=0.05,
+                          on_state_change=lambda state, timeout: changes.append(state))
+
+
+def test_opens_after_consecutive_failures(breaker, changes):
+    breaker.record_failure(NETWORK)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() == 0
+
+    breaker.record_failure(SERVER)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert 0 < breaker.allow() <= 0.05
+    assert changes == [CircuitBreaker.OPEN]
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure(NETWORK)
+    breaker.record_success()
+    breaker.record_failure(NETWORK)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limit_and_client_errors_do_not_open(breaker):
+    for error in (RATE_LIMITED, BAD_REQUEST, CANCELLED, RATE_LIMITED):
+        breaker.record_failure(error)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_half_open_allows_single_probe(breaker, changes):
+    breaker.record_failure(NETWORK)
+    breaker.record_failure(NETWORK)
+    time.sleep(0.06)
+
+    assert breaker.allow() == 0
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # 探测请求未返回前，其他请求继续等待
+    assert breaker.allow() > 0
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() == 0
+    assert changes == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.CLOSED]
+    assert breaker.stats()['open_count'] == 1
+
+
+def test_failed_probe_reopens(breaker, changes):
+    breaker.record_failure(NETWORK)
+    breaker.record_failure(NETWORK)
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+
+    breaker.record_failure(SERVER)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow() > 0
+    assert changes == [CircuitBreaker.OPEN, CircuitBreaker.HALF_OPEN, CircuitBreaker.OPEN]
+
+
+def test_client_error_on_probe_closes(breaker):
+    breaker.record_failure(NETWORK)
+    breaker.record_failure(NETWORK)
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+
+    breaker.record_failure(BAD_REQUEST)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_cancelled_probe_frees_the_slot(breaker):
+    breaker.record_failure(NETWORK)
+    breaker.record_failure(NETWORK)
+    time.sleep(0.06)
+    assert breaker.allow() == 0
+
+    breaker.record_failure(CANCELLED)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow() == 0
+
+
+def test_wait_blocks_until_half_open(breaker):
+    breaker.record_failure(NETWORK)
+    breaker.record_failure(NETWORK)
+    started = time.monotonic()
+    assert breaker.wait() is True
+    assert time.monotonic() - started >= 0.04
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_retry_policy_classifies_errors():
+    policy = RetryPolicy(max_retries=2, base_delay=0.1, max_delay=1.0)
+    assert policy.next_delay(BAD_REQUEST, 0) is None
+    assert 0 <= policy.next_delay(NETWORK, 1) <= 0.2
+    assert policy.next_delay(RATE_LIMITED, 0) >= 2
+    assert policy.next_delay(SERVER, 2) is None
+    assert policy.stats() == {'network': 1, 'rate_limit': 1}
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from src.module.splitting import (split_prompt, merge_codes, parse_prompt, REPLY_MARKER, CONTEXT_HEADER,
+                                  TRUNCATED_SUFFIX)
+from src.module.tokens import estimate_tokens
+
+HEAD = "编码表：\nA: first\nB: second\n\n话题：topic title" + REPLY_MARKER
+
+
+def reply_line(reply_id, text="reply content " * 5):
+    return f"- user{reply_id}(reply_id:{reply_id})：{text}"
+
+
+def build_prompt(threads):
+    """threads 为每个线程的 reply_id 列表，线程之间以空行分隔"""
+    return HEAD + "\n\n".join("\n".join(reply_line(reply_id) for reply_id in thread) for thread in threads) + "\n\n"
+
+
+def test_parse_prompt_marks_thread_starts():
+    head, replies = parse_prompt(build_prompt([[1, 2], [3]]))
+    assert head == HEAD
+    assert [(reply_id, thread_start) for reply_id, _, thread_start in replies] == [
+        ("1", True), ("2", False), ("3", True)
+    ]
+
+
+def test_split_prompt_codes_every_reply_once():
+    prompt = build_prompt([[1, 2, 3, 4, 5], [6, 7, 8]])
+    max_tokens = estimate_tokens(HEAD) + 80
+    chunks = split_prompt(prompt, max_tokens)
+
+    assert len(chunks) > 1
+    coded = [reply_id for _, ids in chunks for reply_id in ids]
+    assert coded == [str(reply_id) for reply_id in range(1, 9)]
+    for chunk, _ in chunks:
+        assert chunk.startswith(HEAD)
+        assert estimate_tokens(chunk) <= max_tokens + 10
+
+
+def test_split_prompt_keeps_thread_context():
+    prompt = build_prompt([[1, 2, 3, 4, 5, 6]])
+    chunks = split_prompt(prompt, estimate_tokens(HEAD) + 150, overlap=1)
+
+    assert len(chunks) > 1
+    for chunk, ids in chunks[1:]:
+        context = chunk[len(HEAD):].split(CONTEXT_HEADER, 1)[1].split("需要编码的回帖")[0]
+        # 上下文包含线程的第一条回帖和前一条回帖
+        assert "(reply_id:1)" in context
+        assert f"(reply_id:{int(ids[0]) - 1})" in context
+
+
+def test_split_prompt_truncates_oversized_reply():
+    prompt = HEAD + reply_line(1, "x" * 4000) + "\n" + reply_line(2) + "\n\n"
+    chunks = split_prompt(prompt, estimate_tokens(HEAD) + 200)
+
+    assert [ids for _, ids in chunks] == [["1"], ["2"]]
+    assert TRUNCATED_SUFFIX in chunks[0][0]
+
+
+def test_split_prompt_without_replies():
+    assert split_prompt("no reply section", 100) == []
+
+
+def test_merge_codes_keeps_coded_replies_once():
+    chunk_codes = [
+        ('结果如下：[{"reply_id": "1", "code": "A"}, {"reply_id": "2", "code": "B"}]', ["1", "2"]),
+        # 第二段把第 2 条作为上下文，模型仍然输出了它的编码
+        ('[{"reply_id": "2", "code": "A"}, {"reply_id": 3, "code": "B"}]', ["2", 3]),
+        ('[{"reply_id": "1", "code": "B"}, "not a dict"]', ["4"]),
+    ]
+    merged = json.loads(merge_codes(chunk_codes))
+    assert merged == [
+        {"reply_id": "1", "code": "A"},
+        {"reply_id": "2", "code": "B"},
+        {"reply_id": 3, "code": "B"},
+    ]
+
+
+def test_merge_codes_rejects_response_without_array():
+    with pytest.raises(ValueError):
+        merge_codes([("no json here", ["1"])])